@@ -1,6 +1,5 @@
 # app.py
 # Di app.py
-from app.video_utils import extract_audio, is_video_file
 import streamlit as st
 import os
 import uuid
@@ -8,6 +7,7 @@ import time
 import json
 import sys
 import logging
+import threading
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -20,9 +20,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 # Muat konfigurasi dari .env
 from app.config import Config
 # Muat fungsi utilitas
-from app.stt_utils import transcribe_with_whisper
-from app.video_utils import extract_audio, is_video_file
-from app.byteplus_mom_utils import generate_mom_with_byteplus, format_mom_to_text
+from app.byteplus_mom_utils import format_mom_to_text
+from app.upload_utils import copy_stream_hashed
+from app.job_store import MemoryJobStore
+from app.job_queue import JobScheduler, QueueFullError
+from app.stt_utils import warm_up_models
+from app.pipeline import MOM_PIPELINE, JobContext, StageError
 
 # --- Setup dan Konfigurasi ---
 st.set_page_config(page_title="MoMs Generator", layout="centered")
@@ -32,147 +35,210 @@ def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'mp3', 'wav', 'ogg', 'm4a', 'flac', 'mp4', 'avi', 'mov', 'mkv', 'webm', 'm4v'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def is_video_file_local(filename):
-    VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'm4v'}
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in VIDEO_EXTENSIONS
-
-# Fungsi format lokal untuk Whisper (disalin untuk independensi)
-def format_whisper_result_local(whisper_result):
-    if not whisper_result or isinstance(whisper_result, str):
-        return whisper_result if isinstance(whisper_result, str) else "Tidak ada hasil transkripsi."
-    formatted_text = ""
-    segments = whisper_result.get("segments", [])
-    if segments:
-        for segment in segments:
-            start_sec = segment.get("start", 0)
-            end_sec = segment.get("end", 0)
-            text = segment.get("text", "").strip()
-            if text:
-                formatted_text += f"[{start_sec:.2f} - {end_sec:.2f}] {text}\n"
-        return formatted_text
-    else:
-        full_text = whisper_result.get("text", "").strip()
-        if full_text:
-             return full_text
-        else:
-             return "Tidak ada teks yang dikenali dalam audio."
+# --- Runner Job Bersama ---
+class StreamlitJobRunner:
+    """
+    Job store, penjadwal job, dan model Whisper yang dibagi semua sesi Streamlit dalam satu proses
+    (dibuat sekali lewat `get_job_runner`).
 
-# --- Fungsi Utama untuk Memproses File ---
-def process_file(uploaded_file, progress_bar, status_text):
-    """Fungsi utama untuk memproses file audio/video dan menghasilkan MoM."""
-    try:
-        # 1. Simpan file yang diupload
-        original_filename = uploaded_file.name
-        unique_id = str(uuid.uuid4())
-        base_name = f"{unique_id}_{os.path.splitext(original_filename)[0]}"
-        file_extension = os.path.splitext(original_filename)[1]
-
-        # Pastikan direktori upload ada
-        upload_folder = Config.UPLOAD_FOLDER
-        os.makedirs(upload_folder, exist_ok=True)
-
-        # Simpan file
-        file_path = os.path.join(upload_folder, f"{base_name}{file_extension}")
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        logger.info(f"File diupload dan disimpan sementara di: {file_path}")
-        status_text.text("File berhasil diupload.")
-
-        # 2. Ekstraksi Audio (jika video)
-        audio_file_path = file_path
-        if is_video_file_local(original_filename):
-            status_text.text("Mengekstrak audio dari video...")
-            progress_bar.progress(10)
-            extracted_audio_filename = f"{base_name}_extracted_audio.wav"
-            extracted_audio_path = os.path.join(upload_folder, extracted_audio_filename)
-            
-            success = extract_audio(file_path, extracted_audio_path)
-            
-            if success:
-                status_text.text("Audio berhasil diekstrak.")
-                progress_bar.progress(20)
-                audio_file_path = extracted_audio_path
-                # Opsional: Hapus file video asli
-                # os.remove(file_path)
-            else:
-                st.error("Gagal mengekstrak audio dari video.")
-                return None
-
-        # 3. Transkripsi dengan Whisper
-        status_text.text("Melakukan transkripsi dengan Whisper...")
-        progress_bar.progress(30)
-        whisper_result = transcribe_with_whisper(audio_file_path)
-        
-        if isinstance(whisper_result, str) and "Terjadi kesalahan" in whisper_result:
-            st.error(f"Transkripsi gagal: {whisper_result}")
-            return None
+    Job dijalankan worker latar belakang (JobScheduler yang sama dengan server Flask), sehingga
+    script run sesi tidak terblokir selama transkripsi dan sesi lain tetap responsif. Worker tidak
+    pernah memanggil `st.*`: progres ditulis ke job store dan halaman proses membacanya berkala.
+    """
 
-        transcription_text = format_whisper_result_local(whisper_result)
-        if not transcription_text or "Tidak ada teks" in transcription_text:
-            st.error("Transkripsi tidak menghasilkan teks.")
-            return None
+    def __init__(self):
+        self.job_store = MemoryJobStore(Config.JOB_TTL_SECONDS)
+        self.scheduler = JobScheduler(
+            stt_handler=self._run_stt,
+            llm_handler=self._run_llm,
+            stt_workers=Config.STT_WORKERS,
+            llm_workers=Config.LLM_WORKERS,
+            max_queue_size=Config.JOB_QUEUE_MAXSIZE,
+            retry_after=Config.JOB_RETRY_AFTER_SECONDS
+        )
+        self.scheduler.start()
+        threading.Thread(target=self._evict_expired_forever, name="job-store-evictor", daemon=True).start()
+        # Model dimuat sekali per proses di latar belakang; semua sesi memakai model yang sama
+        threading.Thread(target=warm_up_models, name="whisper-warmup", daemon=True).start()
+
+    def _evict_expired_forever(self):
+        # Job store dibagi semua sesi dan hidup selama proses, jadi job lama harus dibuang berkala
+        while True:
+            time.sleep(Config.JOB_EVICT_INTERVAL_SECONDS)
+            self.job_store.evict_expired()
+
+    def _run(self, job_id, payload, queue):
+        """
+        Menjalankan tahap pipeline milik worker `queue`.
 
-        status_text.text("Transkripsi selesai.")
-        progress_bar.progress(60)
-        
-        # Simpan transkripsi ke file
-        transcript_filename = f"{base_name}_transcription.txt"
-        transcript_path = os.path.join(upload_folder, transcript_filename)
-        with open(transcript_path, 'w', encoding='utf-8') as f:
-            f.write(transcription_text)
-        logger.info(f"Transkripsi disimpan ke: {transcript_path}")
-
-        # 4. Buat MoM dengan BytePlus LLM
-        status_text.text("Membuat Minutes of Meeting (MoM) dengan BytePlus LLM...")
-        progress_bar.progress(70)
-        mom_result = generate_mom_with_byteplus(transcription_text)
-
-        if isinstance(mom_result, str) and ("Error" in mom_result or "BYTEPLUS" in mom_result):
-            st.error(f"Pembuatan MoM gagal: {mom_result}")
+        :return: True jika job selesai, False jika berhenti di batas worker, None jika gagal.
+        """
+        def report(message, progress, **fields):
+            # Field tambahan (mis. partial_mom, transcript_file) ikut disimpan agar bisa ditampilkan halaman proses
+            self.job_store.update(job_id, status="processing", message=message, progress=progress, **fields)
+
+        ctx = JobContext(job_id, payload, write_artifact=_write_artifact(payload["upload_folder"]), report=report)
+        try:
+            finished = MOM_PIPELINE.run(ctx, self.job_store, queue=queue)
+        except StageError as e:
+            self.job_store.update(job_id, status="error", message=str(e))
+            return None
+        except Exception as e:
+            logger.error(f"Terjadi kesalahan dalam job {job_id}: {e}")
+            logger.exception("Traceback:")
+            self.job_store.update(job_id, status="error", message=f"Terjadi kesalahan: {str(e)}")
             return None
 
-        if isinstance(mom_result, dict) and "error" in mom_result:
-            st.error(f"Pembuatan MoM gagal: {mom_result['error']}")
+        if finished:
+            self.job_store.update(job_id, status="completed", message="Semua proses selesai!", progress=100)
+        else:
+            self.job_store.update(job_id, message="Transkripsi selesai, menunggu worker LLM...", progress=65)
+        return finished
+
+    def _run_stt(self, job_id, payload):
+        # Transisi atomik: job yang sudah dikerjakan di tempat lain tidak diproses ulang
+        if not self.job_store.transition(job_id, ("queued",),
+                                         {"status": "started", "message": "Proses dimulai...", "progress": 0}):
             return None
+        return payload if self._run(job_id, payload, "stt") is False else None
+
+    def _run_llm(self, job_id, payload):
+        self._run(job_id, payload, "llm")
+
+    def submit(self, job_id):
+        """
+        Menjalankan job yang baru diupload, atau melanjutkan job yang gagal dari tahap pertama yang
+        belum selesai (tanpa transkripsi ulang jika transkripsinya sudah ada).
+
+        :return: False jika job tidak ada atau sedang/sudah berjalan, True jika masuk antrean.
+        :raises QueueFullError: Jika job perlu masuk antrean STT yang sedang penuh.
+        """
+        record = self.job_store.get_record(job_id)
+        if record is None:
+            return False
+        previous = record["status"]
+        stage = MOM_PIPELINE.resume_stage(self.job_store, job_id)
+        if stage is None or stage.queue != "stt":
+            status = {"status": "processing", "message": "Melanjutkan pembuatan MoM...", "progress": 65}
+        else:
+            status = {"status": "queued", "message": "Menunggu giliran di antrean...", "progress": 0}
+        # Hanya job yang belum berjalan yang bisa dikirim, agar klik ganda tidak menjalankannya dua kali
+        if not self.job_store.transition(job_id, ("uploaded", "error"), status):
+            return False
+        if status["status"] == "processing":
+            self.scheduler.submit_llm(job_id, record["payload"])
+            return True
+        try:
+            self.scheduler.submit(job_id, record["payload"])
+        except QueueFullError:
+            self.job_store.set(job_id, previous)
+            raise
+        return True
 
-        status_text.text("MoM berhasil dibuat.")
-        progress_bar.progress(90)
-
-        # Simpan hasil MoM
-        mom_json_filename = f"{base_name}_mom_byteplus.json"
-        mom_json_path = os.path.join(upload_folder, mom_json_filename)
-        with open(mom_json_path, 'w', encoding='utf-8') as f:
-            json.dump(mom_result, f, indent=2, ensure_ascii=False)
-        logger.info(f"MoM JSON disimpan ke: {mom_json_path}")
-        
-        mom_text_result = format_mom_to_text(mom_result)
-        mom_txt_filename = f"{base_name}_mom_byteplus.txt"
-        mom_txt_path = os.path.join(upload_folder, mom_txt_filename)
-        with open(mom_txt_path, 'w', encoding='utf-8') as f:
-            f.write(mom_text_result)
-        logger.info(f"MoM TXT disimpan ke: {mom_txt_path}")
-        
-        # 5. Selesai
-        status_text.text("Semua proses selesai!")
-        progress_bar.progress(100)
-        
-        # Kembalikan path file hasil
+    def result(self, job_id):
+        """Path file dan teks hasil job yang sudah selesai (dari checkpoint), atau None."""
+        record = self.job_store.get_record(job_id)
+        checkpoints = self.job_store.load_checkpoints(job_id)
+        if record is None or "render" not in checkpoints:
+            return None
+        upload_folder = record["payload"]["upload_folder"]
+        transcript = checkpoints["transcribe"]
+        files = checkpoints["render"]
         return {
-            "transcript_path": transcript_path,
-            "transcript_filename": transcript_filename,
-            "mom_json_path": mom_json_path,
-            "mom_json_filename": mom_json_filename,
-            "mom_txt_path": mom_txt_path,
-            "mom_txt_filename": mom_txt_filename,
-            "transcription_text": transcription_text,
-            "mom_text": mom_text_result
+            "transcript_path": os.path.join(upload_folder, transcript["transcript_filename"]),
+            "transcript_filename": transcript["transcript_filename"],
+            "mom_json_path": os.path.join(upload_folder, files["mom_json_file"]),
+            "mom_json_filename": files["mom_json_file"],
+            "mom_txt_path": os.path.join(upload_folder, files["mom_txt_file"]),
+            "mom_txt_filename": files["mom_txt_file"],
+            "transcription_text": transcript["transcription_text"],
+            "mom_text": format_mom_to_text(checkpoints["llm"]["mom"])
         }
 
-    except Exception as e:
-        logger.error(f"Terjadi kesalahan dalam process_file: {e}")
-        logger.exception("Traceback:")
-        st.error(f"Terjadi kesalahan: {str(e)}")
-        return None
+
+@st.cache_resource
+def get_job_runner():
+    """Satu runner per proses Streamlit, dibagi semua sesi (bukan dibuat ulang di setiap rerun)."""
+    return StreamlitJobRunner()
+
+# --- Fungsi Utama untuk Memproses File ---
+def _write_artifact(upload_folder):
+    def write(filename, content, kind):
+        path = os.path.join(upload_folder, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        logger.info(f"File {kind} disimpan ke: {path}")
+        return os.path.getsize(path)
+    return write
+
+def save_uploaded_file(uploaded_file):
+    """Menyimpan file upload ke folder upload dan membuat job-nya; mengembalikan ID job."""
+    original_filename = uploaded_file.name
+    unique_id = str(uuid.uuid4())
+    base_name = f"{unique_id}_{os.path.splitext(original_filename)[0]}"
+    file_extension = os.path.splitext(original_filename)[1]
+
+    # Pastikan direktori upload ada
+    upload_folder = Config.UPLOAD_FOLDER
+    os.makedirs(upload_folder, exist_ok=True)
+
+    # Simpan file per blok sambil menghitung hash-nya (untuk cache transkripsi)
+    file_path = os.path.join(upload_folder, f"{base_name}{file_extension}")
+    uploaded_file.seek(0)
+    with open(file_path, "wb") as f:
+        _, digest = copy_stream_hashed(uploaded_file, f)
+    logger.info(f"File diupload dan disimpan sementara di: {file_path}")
+
+    payload = {"file_path": file_path, "original_filename": original_filename, "upload_folder": upload_folder,
+               "content_hash": digest.hexdigest()}
+    get_job_runner().job_store.create(unique_id, {"status": "uploaded", "message": "File diupload.", "progress": 0},
+                                      payload=payload)
+    return unique_id
+
+def submit_job(job_id):
+    """Mengirim job ke runner bersama; menampilkan pesan jika antrean penuh."""
+    try:
+        get_job_runner().submit(job_id)
+    except QueueFullError as e:
+        st.error(f"Server sedang sibuk. {e}")
+
+def _show_job_progress(job_id):
+    """
+    Menampilkan progres job dari job store. Saat job selesai atau gagal, seluruh halaman di-rerun
+    agar hasil atau tombol "Coba Lagi" ditampilkan.
+    """
+    runner = get_job_runner()
+    status = runner.job_store.get(job_id) or {}
+    if status.get("status") not in ("queued", "started", "processing"):
+        st.rerun()
+
+    position = runner.scheduler.queue_position(job_id)
+    message = status.get("message") or "Memproses..."
+    if position is not None:
+        message = f"{message} (posisi antrean: {position})"
+    st.progress(int(status.get("progress") or 0))
+    st.text(message)
+    _show_partial_mom(status.get("partial_mom"))
+
+def _show_partial_mom(mom):
+    """Menampilkan agenda MoM yang sudah lengkap selama LLM masih menulis sisanya."""
+    if not mom or not mom.get("agenda"):
+        return
+    st.subheader(f"📋 {mom.get('judul_rapat') or 'Minutes of Meeting'} (sementara)")
+    for i, item in enumerate(mom["agenda"], 1):
+        item = item or {}
+        lines = [f"**{i}. {item.get('poin_agenda') or '-'}**"]
+        if item.get("pembahasan"):
+            lines.append(f"- Pembahasan: {item['pembahasan']}")
+        if item.get("keputusan"):
+            lines.append(f"- Keputusan: {item['keputusan']}")
+        for j, tl in enumerate(item.get("tindak_lanjut") or [], 1):
+            lines.append(f"- Tindak lanjut {j}: {tl.get('deskripsi') or '-'} (PJ: {tl.get('penanggung_jawab') or '-'})")
+        st.markdown("\n".join(lines))
+
+# Progres diperbarui per fragment (tanpa rerun seluruh halaman) jika versi Streamlit mendukungnya
+if hasattr(st, "fragment"):
+    _show_job_progress = st.fragment(run_every=Config.STREAMLIT_POLL_SECONDS)(_show_job_progress)
 
 # --- Halaman Utama (Upload) ---
 def main_page():
@@ -201,35 +267,46 @@ def processing_page():
     if uploaded_file:
         st.write(f"Memproses file: `{uploaded_file.name}`")
     
-    # Buat elemen progress bar dan status
-    progress_bar = st.progress(0)
-    status_text = st.empty() # Placeholder untuk pesan status
-    
     # Tombol untuk kembali
     if st.button("Kembali"):
         st.session_state['page'] = 'main'
         st.session_state.pop('uploaded_file', None) # Hapus file dari session
+        # Upload berikutnya adalah job baru; job yang sedang berjalan tetap diselesaikan worker
+        st.session_state.pop('processing_job_id', None)
         st.rerun()
 
-    # Jalankan proses ketika halaman dimuat
-    # Gunakan st.spinner atau elemen lain untuk menunjukkan aktivitas
-    if 'processing_started' not in st.session_state:
-        st.session_state['processing_started'] = True
-        
-        # Jalankan fungsi pemrosesan
-        result = process_file(uploaded_file, progress_bar, status_text)
-        
-        if result:
-            # Simpan hasil ke session state
-            st.session_state['processing_result'] = result
-            # Pindah ke halaman hasil
-            st.session_state['page'] = 'results'
-            st.rerun()
+    # File disimpan dan job dikirim ke worker latar belakang sekali; script run tidak menunggu job selesai
+    if 'processing_job_id' not in st.session_state:
+        if uploaded_file is None:
+            st.warning("Tidak ada file untuk diproses.")
+            return
+        st.session_state['processing_job_id'] = save_uploaded_file(uploaded_file)
+        submit_job(st.session_state['processing_job_id'])
+    job_id = st.session_state['processing_job_id']
+
+    status = get_job_runner().job_store.get(job_id)
+    if status is None:
+        st.error("Job tidak ditemukan atau sudah kedaluwarsa. Silakan upload ulang.")
+    elif status.get("status") == "completed":
+        # Simpan hasil ke session state lalu pindah ke halaman hasil
+        st.session_state['processing_result'] = get_job_runner().result(job_id)
+        st.session_state['page'] = 'results'
+        st.rerun()
+    elif status.get("status") in ("uploaded", "error"):
+        if status.get("status") == "error":
+            st.error(f"Proses gagal: {status.get('message')}")
         else:
-            # Jika gagal, tetap di halaman ini atau kembali ke utama
-            # Bisa menampilkan pesan error dan tombol coba lagi
-            st.error("Proses gagal. Silakan coba lagi.")
-            # Opsional: Tambahkan tombol 'Coba Lagi'
+            st.warning("Job belum masuk antrean karena server sedang sibuk.")
+        # Job dilanjutkan dari tahap yang gagal (mis. LLM), tanpa upload dan transkripsi ulang
+        if st.button("Coba Lagi"):
+            submit_job(job_id)
+            st.rerun()
+    else:
+        _show_job_progress(job_id)
+        if not hasattr(st, "fragment"):
+            # Streamlit lama tanpa fragment: rerun halaman secara berkala untuk memperbarui progres
+            time.sleep(Config.STREAMLIT_POLL_SECONDS)
+            st.rerun()
 
 # --- Halaman Hasil ---
 def results_page():
@@ -9,4 +9,10 @@ def create_app():
     from app.routes import init_routes
     init_routes(app)
 
+    # Warm-up model Whisper di latar belakang agar startup tidak terblokir
+    if app.config.get('WHISPER_PRELOAD_MODELS'):
+        import threading
+        from app.stt_utils import warm_up_models
+        threading.Thread(target=warm_up_models, daemon=True).start()
+
     return app
\ No newline at end of file
@@ -0,0 +1,304 @@
+# app/artifact_store.py
+import os
+import gzip
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_SIZE = 1024 * 1024
+
+# Jenis artefak di folder upload, dikenali dari akhiran nama file (urutan penting: akhiran
+# yang lebih spesifik diperiksa lebih dulu)
+_KIND_SUFFIXES = (
+    ("_extracted_audio.wav", "audio"),
+    ("_transcription.txt", "transcript"),
+    ("_mom_byteplus.json", "mom_json"),
+    ("_mom_byteplus.txt", "mom_txt"),
+)
+SOURCE_EXTENSIONS = {'mp3', 'wav', 'ogg', 'm4a', 'flac', 'mp4', 'avi', 'mov', 'mkv', 'webm', 'm4v'}
+
+
+def artifact_kind(filename):
+    """Jenis artefak ('source', 'audio', 'transcript', 'mom_json', 'mom_txt') dari nama file, atau None."""
+    for suffix, kind in _KIND_SUFFIXES:
+        if filename.endswith(suffix):
+            return kind
+    if '.' in filename and filename.rsplit('.', 1)[1].lower() in SOURCE_EXTENSIONS:
+        return "source"
+    return None
+
+
+class RetentionPolicy:
+    """
+    Aturan penyimpanan untuk satu jenis artefak.
+
+    :param retention_seconds: Umur artefak sebelum dihapus, dihitung sejak artefak tidak lagi
+        dipakai job (dilepas). 0 = dihapus begitu dilepas; negatif = disimpan sampai kuota penuh.
+    :param compress: Simpan dengan gzip (hanya untuk artefak teks yang ditulis lewat `write_text`).
+    """
+
+    def __init__(self, retention_seconds, compress=False):
+        self.retention_seconds = retention_seconds
+        self.compress = compress
+
+
+class ArtifactStore:
+    """
+    Pengelola file di folder upload: media sumber, audio perantara, transkripsi, dan MoM.
+
+    File disimpan di `<root>/<xx>/<yy>/<nama>` dengan `xxyy` diambil dari SHA-1 nama file, sehingga
+    setiap direktori tetap kecil walaupun ada ratusan ribu file, dan path bisa dihitung dari nama
+    saja. Setiap artefak dicatat di indeks SQLite (WAL, bisa dipakai bersama oleh beberapa proses)
+    berisi jenis, ukuran di disk, dan waktu kedaluwarsa.
+
+    Artefak yang masih dipakai job (`pinned`, mis. media sumber yang menunggu transkripsi) tidak
+    pernah dihapus. `sweep()` menghapus artefak yang melewati retensinya, lalu artefak terlama
+    sampai total ukuran di bawah `quota_bytes`.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            name       TEXT PRIMARY KEY,
+            kind       TEXT NOT NULL,
+            path       TEXT NOT NULL,
+            size       INTEGER NOT NULL,
+            compressed INTEGER NOT NULL DEFAULT 0,
+            pinned     INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            expires_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_artifacts_created_at ON artifacts (pinned, created_at);
+        CREATE INDEX IF NOT EXISTS idx_artifacts_expires_at ON artifacts (expires_at);
+    """
+
+    def __init__(self, root, index_path, policies, quota_bytes=0):
+        self.root = root
+        self.index_path = index_path
+        self.policies = policies
+        self.quota_bytes = quota_bytes
+        self._local = threading.local()
+        os.makedirs(root, exist_ok=True)
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self._SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _policy(self, kind):
+        return self.policies.get(kind) or RetentionPolicy(-1)
+
+    def _expires_at(self, kind, now):
+        retention = self._policy(kind).retention_seconds
+        return None if retention < 0 else now + retention
+
+    # --- Lokasi file ---
+    def path_for(self, name, create_dirs=False):
+        """Path shard untuk file bernama `name` (tanpa akhiran .gz)."""
+        name = os.path.basename(name)
+        digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.root, digest[:2], digest[2:4])
+        if create_dirs:
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    # --- Pencatatan ---
+    def register(self, path, kind=None, pinned=False, created_at=None):
+        """
+        Mencatat file yang sudah ada di disk sebagai artefak.
+
+        :param pinned: True jika file masih dipakai job (tidak dihapus sampai `release`).
+        :return: Ukuran file (byte).
+        """
+        name = os.path.basename(path)
+        if name.endswith('.gz'):
+            name = name[:-len('.gz')]
+        kind = kind or artifact_kind(name) or "source"
+        size = os.path.getsize(path)
+        now = created_at or time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO artifacts (name, kind, path, size, compressed, pinned, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, kind, path, size, int(path.endswith('.gz')), int(pinned), now,
+             None if pinned else self._expires_at(kind, now))
+        )
+        return size
+
+    def write_text(self, name, content, kind=None):
+        """
+        Menulis artefak teks (transkripsi, MoM) ke path shard-nya, dikompresi gzip jika kebijakan
+        jenisnya meminta, lalu mencatatnya.
+
+        :return: Jumlah byte yang ditulis ke disk.
+        """
+        kind = kind or artifact_kind(name) or "source"
+        path = self.path_for(name, create_dirs=True)
+        data = content.encode('utf-8')
+        if self._policy(kind).compress:
+            path += '.gz'
+            data = gzip.compress(data, compresslevel=6)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return self.register(path, kind)
+
+    def lookup(self, name):
+        """Dict berisi path, kind, size, compressed untuk artefak `name`, atau None."""
+        row = self._connection().execute(
+            "SELECT * FROM artifacts WHERE name = ?", (os.path.basename(name),)
+        ).fetchone()
+        if row is None or not os.path.exists(row["path"]):
+            return None
+        return {"name": row["name"], "path": row["path"], "kind": row["kind"],
+                "size": row["size"], "compressed": bool(row["compressed"])}
+
+    def read_text(self, name):
+        """Isi artefak teks (sudah didekompresi), atau None jika tidak ada."""
+        record = self.lookup(name)
+        if record is None:
+            return None
+        opener = gzip.open if record["compressed"] else open
+        with opener(record["path"], 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def iter_decompressed(self, path):
+        """Generator blok isi file gzip yang sudah didekompresi (untuk klien tanpa dukungan gzip)."""
+        with gzip.open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+                yield block
+
+    def pin(self, path):
+        """Menandai artefak masih dipakai job (mis. job yang dilanjutkan setelah restart)."""
+        self._connection().execute(
+            "UPDATE artifacts SET pinned = 1, expires_at = NULL WHERE name = ?", (os.path.basename(path),)
+        )
+
+    def release(self, path):
+        """
+        Melepas artefak yang tidak lagi dibutuhkan job: retensinya mulai dihitung sekarang, dan
+        artefak dengan retensi 0 (mis. audio perantara) langsung dihapus.
+        """
+        name = os.path.basename(path)
+        row = self._connection().execute("SELECT kind FROM artifacts WHERE name = ?", (name,)).fetchone()
+        kind = row["kind"] if row else (artifact_kind(name) or "source")
+        if self._policy(kind).retention_seconds == 0:
+            self.delete(name, path if row is None else None)
+            return
+        if row is None:
+            return
+        self._connection().execute(
+            "UPDATE artifacts SET pinned = 0, expires_at = ? WHERE name = ?", (self._expires_at(kind, time.time()), name)
+        )
+
+    def delete(self, name, path=None):
+        """Menghapus artefak dari disk dan indeks."""
+        conn = self._connection()
+        row = conn.execute("SELECT path FROM artifacts WHERE name = ?", (name,)).fetchone()
+        conn.execute("DELETE FROM artifacts WHERE name = ?", (name,))
+        for candidate in {path, row["path"] if row else None} - {None}:
+            try:
+                os.remove(candidate)
+            except FileNotFoundError:
+                pass
+
+    def adopt_flat_files(self, directory):
+        """
+        Mencatat file lama yang masih berada langsung di `directory` (sebelum ada layout shard),
+        agar retensi dan kuota juga berlaku untuknya. File dibiarkan di tempatnya.
+
+        :return: Jumlah file yang baru dicatat.
+        """
+        conn = self._connection()
+        adopted = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                name = entry.name[:-len('.gz')] if entry.name.endswith('.gz') else entry.name
+                kind = artifact_kind(name)
+                if kind is None:
+                    continue
+                if conn.execute("SELECT 1 FROM artifacts WHERE name = ?", (name,)).fetchone():
+                    continue
+                self.register(entry.path, kind, created_at=entry.stat().st_mtime)
+                adopted += 1
+        return adopted
+
+    def total_bytes(self):
+        row = self._connection().execute("SELECT COALESCE(SUM(size), 0) AS total FROM artifacts").fetchone()
+        return row["total"]
+
+    def sweep(self):
+        """
+        Menghapus artefak kedaluwarsa, lalu artefak terlama (yang tidak di-pin) sampai total ukuran
+        di bawah kuota.
+
+        :return: List (nama, jenis, alasan) artefak yang dihapus; alasan 'expired' atau 'quota'.
+        """
+        conn = self._connection()
+        removed = []
+        now = time.time()
+        expired = conn.execute(
+            "SELECT name, kind, path FROM artifacts WHERE pinned = 0 AND expires_at IS NOT NULL AND expires_at < ?", (now,)
+        ).fetchall()
+        for row in expired:
+            self.delete(row["name"], row["path"])
+            removed.append((row["name"], row["kind"], "expired"))
+
+        if self.quota_bytes:
+            excess = self.total_bytes() - self.quota_bytes
+            if excess > 0:
+                for row in conn.execute(
+                    "SELECT name, kind, path, size FROM artifacts WHERE pinned = 0 ORDER BY created_at"
+                ).fetchall():
+                    if excess <= 0:
+                        break
+                    self.delete(row["name"], row["path"])
+                    removed.append((row["name"], row["kind"], "quota"))
+                    excess -= row["size"]
+                if excess > 0:
+                    logger.warning(f"Kuota artefak terlampaui {excess} byte oleh file yang masih dipakai job.")
+        return removed
+
+
+def create_artifact_store(config):
+    """
+    Membuat ArtifactStore dari konfigurasi (`ARTIFACT_*`), dengan root `<UPLOAD_FOLDER>/artifacts` dan
+    indeks di `<DATA_FOLDER>/artifacts.sqlite3` (di luar folder yang dilayani /download).
+
+    :param config: Mapping konfigurasi (misalnya `app.config`).
+    """
+    upload_folder = config.get('UPLOAD_FOLDER', 'uploads')
+    compress = config.get('ARTIFACT_COMPRESS', True)
+    policies = {
+        "source": RetentionPolicy(config.get('ARTIFACT_SOURCE_RETENTION_SECONDS', 24 * 3600)),
+        "audio": RetentionPolicy(config.get('ARTIFACT_AUDIO_RETENTION_SECONDS', 0)),
+        "transcript": RetentionPolicy(config.get('ARTIFACT_TRANSCRIPT_RETENTION_SECONDS', 30 * 24 * 3600), compress),
+        "mom_json": RetentionPolicy(config.get('ARTIFACT_MOM_RETENTION_SECONDS', 30 * 24 * 3600), compress),
+        "mom_txt": RetentionPolicy(config.get('ARTIFACT_MOM_RETENTION_SECONDS', 30 * 24 * 3600), compress),
+    }
+    index_path = config.get('ARTIFACT_INDEX_PATH') or os.path.join(config.get('DATA_FOLDER', 'instance'), 'artifacts.sqlite3')
+    legacy_path = os.path.join(upload_folder, 'artifacts.sqlite3')
+    if not config.get('ARTIFACT_INDEX_PATH') and os.path.exists(legacy_path) and not os.path.exists(index_path):
+        logger.warning(f"Indeks artefak lama ditemukan di {legacy_path} dan tidak dipakai lagi; "
+                       f"pindahkan ke {index_path} (atau atur ARTIFACT_INDEX_PATH) untuk mempertahankan retensinya.")
+    return ArtifactStore(
+        os.path.join(upload_folder, 'artifacts'),
+        index_path,
+        policies,
+        quota_bytes=int(config.get('ARTIFACT_DISK_QUOTA_MB', 0) * 1024 * 1024)
+    )
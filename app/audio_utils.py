@@ -0,0 +1,384 @@
+# app/audio_utils.py
+import os
+import time
+import subprocess
+import logging
+import threading
+
+import numpy as np
+
+from app.metrics import FFMPEG_DECODE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Whisper bekerja pada audio mono 16 kHz
+SAMPLE_RATE = 16000
+
+
+def _decode_command(source, sample_rate):
+    return [
+        'ffmpeg',
+        '-nostdin',
+        '-threads', '0',
+        '-i', source,
+        '-vn', # Abaikan stream video
+        '-f', 's16le', # Output PCM mentah ke stdout
+        '-acodec', 'pcm_s16le',
+        '-ac', '1',
+        '-ar', str(sample_rate),
+        '-'
+    ]
+
+
+def _pcm_to_float32(pcm):
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(file_path, sample_rate=SAMPLE_RATE):
+    """
+    Mendekode file audio atau video menjadi array float32 mono dengan satu proses ffmpeg.
+
+    PCM 16-bit dibaca langsung dari stdout ffmpeg, sehingga tidak ada file WAV sementara
+    dan array bisa langsung diberikan ke `model.transcribe()`. Jika file ini sudah didekode
+    selama upload (lihat PrefixDecoder), hasil itu dipakai dan ffmpeg tidak dijalankan lagi.
+
+    :param file_path: Path ke file audio/video.
+    :param sample_rate: Sample rate output (Whisper membutuhkan 16 kHz).
+    :return: numpy.ndarray float32 dengan nilai di rentang [-1, 1].
+    :raises RuntimeError: Jika ffmpeg gagal atau tidak ditemukan.
+    """
+    decoder = take_predecoded(file_path)
+    if decoder is not None and decoder.sample_rate == sample_rate:
+        audio = decoder.result()
+        if audio is not None:
+            logger.info(f"Audio {file_path} diambil dari dekode selama upload: {len(audio) / sample_rate:.1f} detik.")
+            return audio
+
+    command = _decode_command(file_path, sample_rate)
+    try:
+        with FFMPEG_DECODE_SECONDS.time():
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except FileNotFoundError as e:
+        raise RuntimeError("ffmpeg tidak ditemukan. Pastikan ffmpeg sudah terinstal dan ditambahkan ke PATH sistem.") from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg gagal mendekode audio: {e.stderr.decode(errors='replace')}") from e
+
+    audio = _pcm_to_float32(result.stdout)
+    logger.info(f"Audio didekode dari {file_path}: {len(audio) / sample_rate:.1f} detik.")
+    return audio
+
+
+# Format yang bisa didekode ffmpeg dari pipe secara berurutan. MP4/MOV/M4A tidak termasuk karena
+# indeksnya (atom moov) sering berada di akhir file, sehingga dekode baru bisa dimulai setelah upload selesai.
+STREAMABLE_EXTENSIONS = {'wav', 'mp3', 'ogg', 'flac', 'webm', 'mkv'}
+
+
+class PrefixDecoder:
+    """
+    Mendekode file yang masih di-upload: bagian yang sudah diterima diteruskan ke stdin ffmpeg
+    sambil file bertambah, sehingga dekode audio berjalan bersamaan dengan upload.
+
+    Thread pengumpan membaca `path` dari awal dan menunggu data baru sampai `finish(total_size)`
+    dipanggil (atau tidak ada data baru selama `idle_timeout` detik, lalu dekode dibatalkan).
+    Jika ffmpeg gagal (mis. format tidak bisa dibaca dari pipe), `result()` mengembalikan None dan
+    pemanggil mendekode ulang file lengkapnya seperti biasa.
+
+    PCM yang ditahan semua PrefixDecoder di proses ini dibatasi `max_total_bytes`: decoder yang membuat
+    totalnya melewati batas dibatalkan dan buffernya dilepas (file didekode ulang dengan ffmpeg nanti).
+    """
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE, idle_timeout=600, poll_seconds=0.2, max_total_bytes=None):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.idle_timeout = idle_timeout
+        self.poll_seconds = poll_seconds
+        self.max_total_bytes = max_total_bytes
+        self._total_size = None
+        self._finished = threading.Event()
+        self._aborted = threading.Event()
+        self._done = threading.Event()
+        self._pcm = bytearray()
+        self._failed = False
+        self._process = None
+
+    def start(self):
+        """Menjalankan ffmpeg dan thread pengumpan/pembaca. Mengembalikan self."""
+        # Dibuka sekarang agar pengumpan tetap membaca file yang sama walaupun file dipindahkan (rename)
+        source = open(self.path, 'rb')
+        try:
+            self._process = subprocess.Popen(
+                _decode_command('pipe:0', self.sample_rate),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            logger.warning("ffmpeg tidak ditemukan, dekode selama upload dilewati.")
+            source.close()
+            self._failed = True
+            self._done.set()
+            return self
+        self._started_at = time.perf_counter()
+        with _decoders_lock:
+            _decoders.add(self)
+        threading.Thread(target=self._feed, args=(source,), name="prefix-decoder-feed", daemon=True).start()
+        threading.Thread(target=self._collect, name="prefix-decoder-read", daemon=True).start()
+        return self
+
+    def finish(self, total_size):
+        """Menandai upload selesai dengan ukuran akhir `total_size` byte."""
+        self._total_size = total_size
+        self._finished.set()
+
+    def abort(self):
+        """Membatalkan dekode (upload dibatalkan atau gagal) dan melepas PCM yang sudah terkumpul."""
+        self._aborted.set()
+        self._finished.set()
+        self._release()
+
+    @property
+    def pcm_bytes(self):
+        """Jumlah byte PCM yang sedang ditahan decoder ini."""
+        return len(self._pcm)
+
+    def _release(self):
+        self._pcm = bytearray()
+        with _decoders_lock:
+            _decoders.discard(self)
+
+    def _feed(self, source):
+        fed = 0
+        last_data = time.monotonic()
+        try:
+            with source:
+                while not self._aborted.is_set():
+                    block = source.read(1024 * 1024)
+                    if block:
+                        self._process.stdin.write(block)
+                        fed += len(block)
+                        last_data = time.monotonic()
+                        continue
+                    if self._finished.is_set() and self._total_size is not None and fed >= self._total_size:
+                        break
+                    if time.monotonic() - last_data > self.idle_timeout:
+                        logger.info(f"Upload {self.path} tidak bertambah, dekode selama upload dibatalkan.")
+                        self._aborted.set()
+                        break
+                    self._finished.wait(self.poll_seconds)
+        except (OSError, ValueError) as e:
+            # BrokenPipe: ffmpeg berhenti lebih awal (format tidak didukung dari pipe)
+            logger.info(f"Dekode selama upload untuk {self.path} berhenti: {e}")
+            self._aborted.set()
+        finally:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            if self._aborted.is_set():
+                self._process.kill()
+
+    def _collect(self):
+        try:
+            for block in iter(lambda: self._process.stdout.read(1024 * 1024), b''):
+                if self._aborted.is_set():
+                    continue  # dibaca sampai habis agar ffmpeg tidak tertahan pada pipe yang penuh
+                self._pcm.extend(block)
+                if self.max_total_bytes is not None and predecoded_bytes() > self.max_total_bytes:
+                    logger.info(f"Batas memori dekode selama upload tercapai, dekode {self.path} dibatalkan.")
+                    self.abort()
+            returncode = self._process.wait()
+            self._failed = returncode != 0 or self._aborted.is_set()
+            if not self._failed:
+                FFMPEG_DECODE_SECONDS.observe(time.perf_counter() - self._started_at)
+        finally:
+            self._done.set()
+
+    def result(self, timeout=None):
+        """
+        Menunggu dekode selesai dan mengembalikan array float32, atau None jika gagal/dibatalkan.
+        """
+        if not self._finished.is_set():
+            return None
+        if not self._done.wait(timeout):
+            return None
+        audio = None if self._failed or not self._pcm else _pcm_to_float32(self._pcm)
+        self._release()  # astype() sudah menyalin; buffer PCM tidak dibutuhkan lagi
+        return audio
+
+
+class StreamDecoder:
+    """
+    Mendekode audio yang diterima bertahap (mis. dari rapat yang sedang berlangsung) menjadi
+    potongan float32 mono yang diberikan ke `on_audio(array)` begitu tersedia.
+
+    Format 'pcm_s16le' (PCM 16-bit mono dengan `sample_rate` yang sama) dikonversi langsung tanpa
+    ffmpeg. Format lain (mis. webm/ogg dari MediaRecorder browser) diteruskan ke stdin satu proses
+    ffmpeg yang berjalan sepanjang sesi, karena potongan kontainer seperti itu tidak bisa didekode
+    sendiri-sendiri.
+    """
+
+    def __init__(self, on_audio, audio_format='pcm_s16le', sample_rate=SAMPLE_RATE):
+        self.on_audio = on_audio
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self._remainder = b''
+        self._process = None
+        self._reader = None
+
+    def start(self):
+        """Menjalankan ffmpeg (jika formatnya bukan PCM mentah). Mengembalikan self."""
+        if self.audio_format == 'pcm_s16le':
+            return self
+        try:
+            self._process = subprocess.Popen(
+                _decode_command('pipe:0', self.sample_rate),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError as e:
+            raise RuntimeError("ffmpeg tidak ditemukan. Pastikan ffmpeg sudah terinstal dan ditambahkan ke PATH sistem.") from e
+        self._reader = threading.Thread(target=self._collect, name="stream-decoder-read", daemon=True)
+        self._reader.start()
+        return self
+
+    def write(self, data):
+        """Menambahkan potongan audio berikutnya.
+
+        :raises RuntimeError: Jika ffmpeg sudah berhenti (mis. format tidak dikenali).
+        """
+        if self._process is None:
+            self._emit(data)
+            return
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"ffmpeg berhenti saat mendekode audio: {e}") from e
+
+    def close(self):
+        """Menutup input dan menunggu sisa audio selesai didekode."""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._reader.join()
+        self._process.wait()
+
+    def abort(self):
+        if self._process is not None:
+            self._process.kill()
+
+    def _collect(self):
+        # read1() mengembalikan data yang sudah tersedia tanpa menunggu buffer penuh
+        for block in iter(lambda: self._process.stdout.read1(64 * 1024), b''):
+            self._emit(block)
+
+    def _emit(self, pcm):
+        # Potongan bisa terpotong di tengah sampel 16-bit; sisa byte disimpan untuk potongan berikutnya
+        pcm = self._remainder + bytes(pcm)
+        usable = len(pcm) - len(pcm) % 2
+        self._remainder = pcm[usable:]
+        if usable:
+            self.on_audio(_pcm_to_float32(pcm[:usable]))
+
+
+# PrefixDecoder yang sedang berjalan atau menunggu diambil dan masih menahan PCM
+_decoders = set()
+_decoders_lock = threading.Lock()
+
+
+def predecoded_bytes():
+    """Total byte PCM yang ditahan semua PrefixDecoder di proses ini."""
+    with _decoders_lock:
+        decoders = list(_decoders)
+    return sum(decoder.pcm_bytes for decoder in decoders)
+
+
+# path file akhir -> PrefixDecoder yang sudah selesai menerima seluruh upload
+_predecoded = {}
+_predecoded_lock = threading.Lock()
+
+
+def register_predecoded(file_path, decoder):
+    """Mendaftarkan hasil PrefixDecoder agar `decode_audio(file_path)` tidak menjalankan ffmpeg lagi."""
+    with _predecoded_lock:
+        _predecoded[os.path.abspath(file_path)] = decoder
+
+
+def take_predecoded(file_path):
+    """Mengambil (dan melepas) PrefixDecoder untuk `file_path`, atau None."""
+    with _predecoded_lock:
+        return _predecoded.pop(os.path.abspath(file_path), None)
+
+
+def discard_predecoded(file_path):
+    """Membatalkan dan melepas hasil dekode selama upload (mis. job ditolak karena antrean penuh)."""
+    decoder = take_predecoded(file_path)
+    if decoder is not None:
+        decoder.abort()
+
+
+def probe_duration(file_path):
+    """
+    Membaca durasi file audio/video (detik) dari metadata dengan ffprobe, tanpa mendekode audio.
+
+    :return: Durasi dalam detik, atau None jika ffprobe gagal atau tidak ditemukan.
+    """
+    command = [
+        'ffprobe',
+        '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        file_path
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=30)
+        return float(result.stdout.decode().strip())
+    except (OSError, ValueError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Durasi {file_path} tidak bisa dibaca dengan ffprobe: {e}")
+        return None
+
+
+def frame_energy_db(audio, frame_length):
+    """
+    Menghitung energi RMS (dalam dB) per frame secara vektorisasi.
+
+    :param audio: Array float32 mono.
+    :param frame_length: Jumlah sampel per frame.
+    :return: Array energi dB dengan panjang `len(audio) // frame_length`.
+    """
+    n_frames = len(audio) // frame_length
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def find_silence_split_points(audio, chunk_seconds, search_seconds=30.0, sample_rate=SAMPLE_RATE, frame_seconds=0.1):
+    """
+    Mencari titik potong audio di bagian paling sunyi di sekitar setiap batas chunk.
+
+    Untuk setiap kelipatan `chunk_seconds`, dicari frame dengan energi terendah
+    dalam jendela +/- `search_seconds`, sehingga potongan tidak jatuh di tengah kalimat.
+
+    :return: List indeks sampel (naik) tempat audio dipotong, tidak termasuk 0 dan len(audio).
+    """
+    frame_length = max(1, int(frame_seconds * sample_rate))
+    energy = frame_energy_db(audio, frame_length)
+    n_frames = len(energy)
+    chunk_frames = max(1, int(chunk_seconds / frame_seconds))
+    search_frames = max(1, int(search_seconds / frame_seconds))
+
+    split_points = []
+    last_frame = 0
+    target = chunk_frames
+    while target < n_frames - search_frames:
+        lo = max(last_frame + 1, target - search_frames)
+        hi = min(n_frames, target + search_frames)
+        if lo >= hi:
+            break
+        best = lo + int(np.argmin(energy[lo:hi]))
+        split_points.append(best * frame_length)
+        last_frame = best
+        target = best + chunk_frames
+    return split_points
@@ -1,76 +1,607 @@
 # app/byteplus_mom_utils.py
 import openai
+import httpx
 import os
 import json
+import time
+import random
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.config import Config
+from app.cache_utils import get_mom_cache, hash_text, make_cache_key
+from app.mom_json_utils import parse_partial_mom, repair_mom_json, validate_mom
+from app.metrics import (LLM_REQUEST_SECONDS, LLM_FIRST_TOKEN_SECONDS, LLM_TOKENS_TOTAL, LLM_RETRIES_TOTAL,
+                         LLM_PROMPT_TOKENS_SAVED_TOTAL, MOM_JSON_REPAIRS_TOTAL)
+from app.transcript_utils import compact_transcript
 
 # Konfigurasi logging - pastikan levelnya INFO atau DEBUG untuk detail
 logging.basicConfig(level=logging.DEBUG) # Ubah ke DEBUG untuk log lebih detail
 logger = logging.getLogger(__name__)
 
+# Client dibagi oleh semua job agar koneksi (keep-alive/TLS) ke BytePlus dipakai ulang
+_client = None
+_client_lock = threading.Lock()
+
+# Membatasi jumlah permintaan LLM yang berjalan bersamaan di proses ini (semua job digabung)
+_llm_semaphore = threading.BoundedSemaphore(max(1, Config.BYTEPLUS_MAX_CONCURRENCY))
+
 def get_byteplus_client():
-    """Membuat dan mengembalikan instance OpenAI client yang dikonfigurasi untuk BytePlus."""
-    logger.debug("Mencoba membuat client BytePlus...")
+    """
+    Mengembalikan instance OpenAI client bersama yang dikonfigurasi untuk BytePlus.
+
+    Client dibuat sekali lalu dipakai ulang, sehingga pool koneksi HTTP-nya juga dipakai ulang.
+    Retry bawaan library dimatikan karena retry ditangani oleh `_call_with_retries`.
+    """
+    global _client
     if not Config.ARK_API_KEY:
         error_msg = "ARK_API_KEY tidak ditemukan di konfigurasi. Pastikan sudah diatur di .env"
         logger.error(error_msg)
         raise ValueError(error_msg)
-    
-    base_url = Config.BYTEPLUS_BASE_URL or 'https://ark.cn-beijing.bytedanceapi.com/api/v3' # Default jika tidak diatur
-    logger.info(f"Menggunakan BYTEPLUS_BASE_URL: {base_url}")
-    
-    client = openai.OpenAI(
-        base_url=base_url,
-        api_key=Config.ARK_API_KEY, # Library openai akan mencari OS environment variable 'ARK_API_KEY'
-    )
-    logger.debug("Client BytePlus berhasil dibuat.")
-    return client
 
-def create_mom_prompt(transcription_text):
+    with _client_lock:
+        if _client is None:
+            logger.debug("Mencoba membuat client BytePlus...")
+            base_url = Config.BYTEPLUS_BASE_URL or 'https://ark.cn-beijing.bytedanceapi.com/api/v3' # Default jika tidak diatur
+            logger.info(f"Menggunakan BYTEPLUS_BASE_URL: {base_url}")
+
+            _client = openai.OpenAI(
+                base_url=base_url,
+                api_key=Config.ARK_API_KEY, # Library openai akan mencari OS environment variable 'ARK_API_KEY'
+                timeout=openai.Timeout(Config.BYTEPLUS_TIMEOUT_SECONDS, connect=Config.BYTEPLUS_CONNECT_TIMEOUT_SECONDS),
+                max_retries=0,
+            )
+            logger.debug("Client BytePlus berhasil dibuat.")
+        return _client
+
+
+def _is_retryable(error):
     """
-    Membuat prompt yang diberikan ke model LLM BytePlus untuk membuat MoM.
+    True untuk error sementara: rate limit (429), error server (5xx), timeout, dan error koneksi.
+
+    Stream yang terputus di tengah jalan (`httpx.ReadTimeout`, `httpx.RemoteProtocolError`, ...) tidak
+    dibungkus jadi `openai.APIError`, jadi error transport httpx juga di-retry, kecuali jika MoM
+    parsial sudah diteruskan ke pengguna (`partial_output_sent`).
     """
-    prompt = f"""
-Berdasarkan transkripsi rapat berikut, buatlah Minutes of Meeting (MoM) dalam format JSON yang terstruktur.
+    if getattr(error, "partial_output_sent", False):
+        return False
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
 
-Transkripsi:
-{transcription_text}
 
-Instruksi:
-1. Analisis transkripsi di atas.
-2. Identifikasi poin-poin penting, keputusan, dan tindakan yang perlu dilakukan.
-3. Hasilkan MoM dalam format JSON yang valid dengan struktur berikut:
+def _retry_delay(attempt, error):
+    """
+    Lama menunggu sebelum percobaan ke-`attempt + 1`: header Retry-After jika ada,
+    selain itu exponential backoff dengan full jitter.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+            return min(Config.BYTEPLUS_RETRY_MAX_SECONDS, max(0.0, retry_after))
+        except (TypeError, ValueError):
+            pass
+    cap = min(Config.BYTEPLUS_RETRY_MAX_SECONDS, Config.BYTEPLUS_RETRY_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def _call_with_retries(request_fn):
+    """
+    Menjalankan `request_fn()` dengan batas konkurensi dan retry untuk error sementara.
+
+    Slot semaphore dilepas selama menunggu backoff agar permintaan lain tetap bisa berjalan.
+
+    :raises: Error terakhir dari `request_fn` jika semua percobaan gagal atau error tidak bisa di-retry.
+    """
+    max_retries = max(0, Config.BYTEPLUS_MAX_RETRIES)
+    for attempt in range(max_retries + 1):
+        try:
+            with _llm_semaphore:
+                return request_fn()
+        except (openai.APIError, httpx.TransportError) as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = _retry_delay(attempt, e)
+            LLM_RETRIES_TOTAL.inc(error=type(e).__name__)
+            logger.warning(f"Permintaan ke BytePlus gagal ({type(e).__name__}), percobaan ulang "
+                           f"{attempt + 1}/{max_retries} dalam {delay:.1f} detik...")
+            time.sleep(delay)
 
-{{
+# Naikkan versi ini setiap kali isi prompt MoM diubah agar cache MoM lama tidak dipakai lagi
+MOM_PROMPT_VERSION = "1"
+
+SYSTEM_PROMPT = "Anda adalah asisten yang ahli dalam membuat Minutes of Meeting (MoM) yang terstruktur dari transkripsi rapat."
+
+# Struktur JSON MoM yang diminta dari LLM (dipakai oleh semua prompt agar skemanya sama)
+MOM_JSON_SCHEMA = """{
   "judul_rapat": "Judul Rapat",
   "tanggal": "Tanggal Rapat (jika disebutkan)",
   "pemimpin_rapat": "Nama Pemimpin Rapat (jika disebutkan)",
   "daftar_hadir": ["Nama Peserta 1", "Nama Peserta 2", "..."],
   "agenda": [
-    {{
+    {
       "poin_agenda": "Deskripsi singkat agenda",
       "pembahasan": "Ringkasan pembahasan terkait agenda ini",
       "keputusan": "Keputusan yang diambil (jika ada)",
       "tindak_lanjut": [
-        {{
+        {
           "deskripsi": "Deskripsi tindakan",
           "penanggung_jawab": "Nama Penanggung Jawab",
           "tenggat_waktu": "Tanggal Tenggat Waktu (jika disebutkan)"
-        }}
+        }
       ]
-    }}
+    }
   ],
   "kesimpulan": "Ringkasan keseluruhan rapat"
-}}
+}"""
+
+# Perkiraan kasar jumlah karakter per token untuk teks Bahasa Indonesia
+CHARS_PER_TOKEN = 3.5
+
+
+class MomResponseError(Exception):
+    """Dilempar saat respons BytePlus API tidak bisa dipakai (tanpa choices, konten kosong, dll)."""
+
+
+def estimate_tokens(text):
+    """Perkiraan jumlah token dari panjang teks (tanpa tokenizer, cukup untuk menentukan budget)."""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def chunk_transcript(transcription_text, max_tokens):
+    """
+    Memecah transkripsi menjadi beberapa bagian yang masing-masing di bawah `max_tokens`.
+
+    Pemotongan dilakukan per baris (satu baris = satu segmen Whisper) agar kalimat tidak terpotong;
+    baris yang sendirian sudah melebihi budget dipotong per kata.
+
+    :return: List potongan teks transkripsi.
+    """
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    lines = []
+    for line in transcription_text.splitlines():
+        while len(line) > max_chars:
+            cut = line.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            lines.append(line[:cut])
+            line = line[cut:].lstrip()
+        if line.strip():
+            lines.append(line)
+
+    chunks = []
+    current, current_len = [], 0
+    for line in lines:
+        if current and current_len + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def encode_transcript_for_prompt(transcription_text, stats=None):
+    """
+    Menyiapkan teks transkripsi untuk prompt sesuai MOM_PROMPT_ENCODING.
+
+    File transkripsi yang bisa diunduh tetap berisi timestamp lengkap; hanya teks yang
+    dikirim ke LLM yang diringkas.
+
+    :param stats: Dict opsional yang diisi perkiraan token sebelum/sesudah encoding.
+    """
+    full_tokens = estimate_tokens(transcription_text)
+    if Config.MOM_PROMPT_ENCODING == 'compact':
+        prompt_text = compact_transcript(transcription_text, Config.MOM_TIME_MARKER_MINUTES) or transcription_text
+    else:
+        prompt_text = transcription_text
+    prompt_tokens = estimate_tokens(prompt_text)
+    saved_tokens = max(0, full_tokens - prompt_tokens)
+    LLM_PROMPT_TOKENS_SAVED_TOTAL.inc(saved_tokens)
+    logger.info(f"Encoding transkripsi '{Config.MOM_PROMPT_ENCODING}': ~{full_tokens} -> ~{prompt_tokens} token "
+                f"(hemat {saved_tokens / full_tokens:.0%}).")
+    if stats is not None:
+        stats.update({
+            "prompt_encoding": Config.MOM_PROMPT_ENCODING,
+            "transcript_tokens_full": full_tokens,
+            "transcript_tokens_prompt": prompt_tokens,
+            "transcript_token_savings_pct": round(100.0 * saved_tokens / full_tokens, 1)
+        })
+    return prompt_text
+
+
+def create_mom_prompt(transcription_text):
+    """
+    Membuat prompt yang diberikan ke model LLM BytePlus untuk membuat MoM.
+    """
+    prompt = f"""
+Berdasarkan transkripsi rapat berikut, buatlah Minutes of Meeting (MoM) dalam format JSON yang terstruktur.
+
+Transkripsi:
+{transcription_text}
+
+Instruksi:
+1. Analisis transkripsi di atas.
+2. Identifikasi poin-poin penting, keputusan, dan tindakan yang perlu dilakukan.
+3. Hasilkan MoM dalam format JSON yang valid dengan struktur berikut:
+
+{MOM_JSON_SCHEMA}
+
+Berikan hanya JSON-nya, tanpa teks tambahan atau markdown.
+"""
+    return prompt
+
+
+def create_mom_extract_prompt(chunk_text, part_number, total_parts=None):
+    """
+    Prompt tahap map: ekstraksi poin MoM dari satu bagian transkripsi yang panjang.
+
+    :param total_parts: Jumlah bagian, atau None jika belum diketahui (rapat yang masih berlangsung).
+    """
+    if total_parts:
+        intro = f"Berikut adalah bagian {part_number} dari {total_parts} transkripsi sebuah rapat yang panjang."
+        label = f"bagian {part_number}/{total_parts}"
+    else:
+        intro = f"Berikut adalah bagian ke-{part_number} transkripsi sebuah rapat yang masih berlangsung."
+        label = f"bagian {part_number}"
+    prompt = f"""
+{intro}
+
+Transkripsi ({label}):
+{chunk_text}
+
+Instruksi:
+1. Analisis HANYA bagian transkripsi di atas.
+2. Catat semua agenda yang dibahas, keputusan, dan tindakan yang perlu dilakukan pada bagian ini.
+3. Isi "judul_rapat", "tanggal", "pemimpin_rapat", dan "daftar_hadir" hanya jika disebutkan di bagian ini; jika tidak, kosongkan.
+4. "kesimpulan" berisi ringkasan singkat bagian ini saja.
+5. Hasilkan JSON yang valid dengan struktur berikut:
+
+{MOM_JSON_SCHEMA}
+
+Berikan hanya JSON-nya, tanpa teks tambahan atau markdown.
+"""
+    return prompt
+
+
+def create_mom_reduce_prompt(partial_moms):
+    """
+    Prompt tahap reduce: menggabungkan beberapa MoM parsial (urut sesuai waktu) menjadi satu MoM.
+    """
+    partials_json = json.dumps(partial_moms, ensure_ascii=False, indent=1)
+    prompt = f"""
+Berikut adalah beberapa MoM parsial dari bagian-bagian berurutan sebuah rapat yang sama, dalam format JSON.
+
+MoM parsial (urut sesuai waktu):
+{partials_json}
+
+Instruksi:
+1. Gabungkan semua MoM parsial menjadi satu Minutes of Meeting (MoM) untuk keseluruhan rapat.
+2. Satukan agenda yang sama atau berkelanjutan; jangan menduplikasi agenda, keputusan, maupun tindak lanjut.
+3. Pertahankan semua keputusan dan tindak lanjut beserta penanggung jawab dan tenggat waktunya.
+4. Gabungkan daftar hadir tanpa duplikasi, dan tulis kesimpulan untuk keseluruhan rapat.
+5. Hasilkan JSON yang valid dengan struktur berikut:
+
+{MOM_JSON_SCHEMA}
+
+Berikan hanya JSON-nya, tanpa teks tambahan atau markdown.
+"""
+    return prompt
+
+
+_stats_lock = threading.Lock()
+
+def _record_llm_usage(stats, seconds, prompt_tokens, completion_tokens):
+    """Mencatat token ke metrik, dan menjumlahkan statistik permintaan ke `stats` (jika ada)."""
+    LLM_TOKENS_TOTAL.inc(prompt_tokens, kind="prompt")
+    LLM_TOKENS_TOTAL.inc(completion_tokens, kind="completion")
+    if stats is None:
+        return
+    # Tahap map menjalankan beberapa permintaan paralel yang menulis ke dict yang sama
+    with _stats_lock:
+        stats["llm_requests"] = stats.get("llm_requests", 0) + 1
+        stats["llm_seconds"] = round(stats.get("llm_seconds", 0) + seconds, 3)
+        stats["prompt_tokens"] = stats.get("prompt_tokens", 0) + prompt_tokens
+        stats["completion_tokens"] = stats.get("completion_tokens", 0) + completion_tokens
+
+
+def _chat_completion(client, model_name, prompt, on_partial=None, stats=None):
+    """
+    Mengirim satu prompt ke BytePlus LLM dan mengembalikan konten jawaban (string).
+
+    :param on_partial: Callback opsional. Jika diberikan, jawaban di-stream dan callback dipanggil
+                       dengan dict MoM parsial setiap kali ada field/agenda baru yang sudah lengkap.
+    :param stats: Dict opsional untuk menjumlahkan latensi dan jumlah token permintaan.
+    :raises MomResponseError: Jika respons tidak mengandung konten yang bisa dipakai.
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    if on_partial is not None:
+        return _call_with_retries(lambda: _stream_chat_completion(client, model_name, messages, on_partial, stats))
+    return _call_with_retries(lambda: _request_chat_completion(client, model_name, messages, stats))
+
+
+def _messages_tokens(messages):
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def _request_chat_completion(client, model_name, messages, stats=None):
+    """Satu permintaan non-streaming ke BytePlus LLM (tanpa retry)."""
+    start_time = time.perf_counter()
+    completion = client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+    )
+    seconds = time.perf_counter() - start_time
+    LLM_REQUEST_SECONDS.observe(seconds, mode="single")
+    logger.debug("Permintaan ke API BytePlus dikirim.")
+
+    # Cek apakah ada pilihan (choices) dalam respons
+    if not completion.choices:
+        logger.error(f"Respons dari BytePlus API tidak mengandung 'choices'. Respons lengkap: {completion}")
+        raise MomResponseError("Respons dari BytePlus API tidak mengandung 'choices'.")
+
+    mom_content = completion.choices[0].message.content
+    if mom_content is None:
+        raise MomResponseError("Konten pesan dalam respons dari BytePlus API adalah None.")
+
+    # Gunakan jumlah token dari API jika tersedia, selain itu perkiraan dari panjang teks
+    usage = getattr(completion, "usage", None)
+    _record_llm_usage(stats, seconds,
+                      getattr(usage, "prompt_tokens", None) or _messages_tokens(messages),
+                      getattr(usage, "completion_tokens", None) or estimate_tokens(mom_content))
+    return _check_content(mom_content)
+
+
+def _stream_chat_completion(client, model_name, messages, on_partial, stats=None):
+    """
+    Versi streaming `_chat_completion`: token dikumpulkan sambil MoM parsial diteruskan ke `on_partial`.
+    Stream yang terputus hanya di-retry jika belum ada MoM parsial yang diteruskan; setelah itu
+    error ditandai `partial_output_sent` agar pengguna tidak melihat agenda yang dibangun ulang.
+    """
+    start_time = time.perf_counter()
+    stream = client.chat.completions.create(model=model_name, messages=messages, stream=True)
+    logger.debug("Permintaan streaming ke API BytePlus dikirim.")
+
+    parts = []
+    last_partial = None
+    usage = None
+    try:
+        for chunk in stream:
+            # Sebagian server mengirim jumlah token di chunk terakhir (tanpa choices)
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if not parts:
+                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start_time)
+            parts.append(delta)
+            # Nilai JSON hanya bisa selesai saat muncul penutup string/objek/array atau pemisah
+            if any(ch in delta for ch in '"}],'):
+                partial = parse_partial_mom("".join(parts))
+                if partial and partial != last_partial:
+                    last_partial = partial
+                    try:
+                        on_partial(partial)
+                    except Exception as e:
+                        logger.warning(f"Callback MoM parsial gagal: {e}")
+    except (openai.APIError, httpx.TransportError) as e:
+        if last_partial is not None:
+            e.partial_output_sent = True
+        raise
+    seconds = time.perf_counter() - start_time
+    LLM_REQUEST_SECONDS.observe(seconds, mode="stream")
+    mom_content = "".join(parts)
+    _record_llm_usage(stats, seconds,
+                      getattr(usage, "prompt_tokens", None) or _messages_tokens(messages),
+                      getattr(usage, "completion_tokens", None) or estimate_tokens(mom_content))
+    return _check_content(mom_content)
+
+
+def _check_content(mom_content):
+    mom_content = mom_content.strip()
+    if not mom_content:
+        raise MomResponseError("Respons dari BytePlus API kosong.")
+    logger.info("Berhasil menerima respons dari BytePlus API.")
+    logger.debug(f"Konten respons (potongan awal): {mom_content[:200]}...")
+    return mom_content
+
+
+def create_mom_fix_prompt(broken_content):
+    """Prompt susulan singkat: memperbaiki jawaban yang bukan JSON valid (tanpa mengirim ulang transkripsi)."""
+    prompt = f"""
+Jawaban berikut seharusnya berupa Minutes of Meeting (MoM) dalam format JSON, tetapi JSON-nya tidak valid.
+
+Jawaban:
+{broken_content}
+
+Instruksi:
+1. Perbaiki menjadi JSON yang valid dengan struktur berikut, tanpa mengubah isinya:
+
+{MOM_JSON_SCHEMA}
+
+2. Jangan menambahkan informasi yang tidak ada di jawaban; kosongkan field yang tidak diketahui.
+
+Berikan hanya JSON-nya, tanpa teks tambahan atau markdown.
+"""
+    return prompt
+
+
+def create_mom_missing_fields_prompt(mom_json, missing_fields):
+    """Prompt susulan singkat: melengkapi field MoM yang hilang karena jawaban sebelumnya terpotong."""
+    partial_json = json.dumps(mom_json, ensure_ascii=False, indent=1)
+    prompt = f"""
+Berikut adalah MoM dalam format JSON yang terpotong sehingga field {", ".join(missing_fields)} hilang.
+
+MoM:
+{partial_json}
+
+Instruksi:
+1. Lengkapi HANYA field yang hilang ({", ".join(missing_fields)}) berdasarkan isi MoM di atas,
+   mengikuti struktur berikut:
+
+{MOM_JSON_SCHEMA}
+
+2. Jika isinya tidak bisa disimpulkan dari MoM di atas, kosongkan field tersebut.
+3. Hasilkan objek JSON yang hanya berisi field yang hilang.
 
 Berikan hanya JSON-nya, tanpa teks tambahan atau markdown.
 """
     return prompt
 
-def generate_mom_with_byteplus(transcription_text):
+
+def _request_mom_followup(client, model_name, mom_content, mom_json, missing, stats=None):
+    """
+    Satu permintaan susulan singkat untuk bagian MoM yang rusak atau hilang.
+
+    :return: Dict MoM yang sudah diperbaiki, atau None jika jawaban susulan juga tidak bisa dipakai.
+    """
+    if mom_json is None:
+        fixed, repairs = repair_mom_json(_chat_completion(client, model_name, create_mom_fix_prompt(mom_content), stats=stats))
+        if fixed is None or "truncated" in repairs:
+            return None
+        return validate_mom(fixed)[0]
+
+    content = _chat_completion(client, model_name, create_mom_missing_fields_prompt(mom_json, missing), stats=stats)
+    supplement, _ = repair_mom_json(content)
+    if supplement is None:
+        return None
+    merged = dict(mom_json)
+    merged.update({field: supplement[field] for field in missing if field in supplement})
+    return validate_mom(merged)[0]
+
+
+def _parse_mom_json(mom_content, client=None, model_name=None, stats=None):
+    """
+    Parsing konten jawaban LLM menjadi dict MoM, atau dict error jika JSON tidak bisa dipakai.
+
+    Kerusakan umum (pagar markdown, koma berlebih, jawaban terpotong) diperbaiki lokal dan tipe
+    field dirapikan sesuai skema. Hanya jika JSON tidak bisa diselamatkan, atau terpotong sampai
+    ada field yang hilang, dikirim satu permintaan susulan singkat untuk bagian itu saja
+    (tanpa mengirim ulang transkripsi; butuh `client`, bisa dimatikan dengan MOM_JSON_FOLLOWUP).
+    """
+    mom_json, repairs = repair_mom_json(mom_content)
+    missing = []
+    if mom_json is not None:
+        mom_json, missing, fixed = validate_mom(mom_json)
+        repairs += [f"schema:{field}" for field in fixed]
+    outcome = "repaired_local" if repairs else "valid"
+
+    if (mom_json is None or ("truncated" in repairs and missing)) and client is not None and Config.MOM_JSON_FOLLOWUP:
+        logger.warning(f"JSON MoM dari BytePlus rusak (perbaikan lokal: {repairs or 'gagal'}, field hilang: {missing}); "
+                       f"mengirim permintaan susulan.")
+        try:
+            followup = _request_mom_followup(client, model_name, mom_content, mom_json, missing, stats)
+        except Exception as e:
+            logger.warning(f"Permintaan susulan perbaikan JSON MoM gagal: {e}")
+            followup = None
+        if followup is not None:
+            mom_json, outcome = followup, "repaired_followup"
+
+    if mom_json is None:
+        outcome = "failed"
+    MOM_JSON_REPAIRS_TOTAL.inc(outcome=outcome)
+    if stats is not None and outcome != "valid":
+        with _stats_lock:
+            stats["json_repairs"] = stats.get("json_repairs", 0) + 1
+            if outcome == "repaired_followup":
+                stats["json_repair_followups"] = stats.get("json_repair_followups", 0) + 1
+
+    if mom_json is None:
+        error_msg = f"Gagal mem-parsing JSON MoM dari respons BytePlus. Respons (potongan awal): {mom_content[:500]}..."
+        logger.error(error_msg)
+        # Opsional: Kembalikan teks mentah jika parsing gagal untuk debugging
+        return {"error": error_msg, "raw_response": mom_content[:1000]} # Batasi panjang raw response
+    if repairs:
+        logger.info(f"MoM JSON diperbaiki ({outcome}): {', '.join(repairs)}.")
+    else:
+        logger.info("Berhasil mem-parsing MoM ke dalam format JSON.")
+    return mom_json
+
+
+def _run_prompts_concurrently(client, model_name, prompts, on_partial=None, stats=None):
+    """
+    Menjalankan beberapa prompt secara paralel; hasil dikembalikan sesuai urutan prompt.
+    `on_partial` hanya dipakai jika hanya ada satu prompt (reduce terakhir).
+    """
+    if len(prompts) == 1:
+        return [_parse_mom_json(_chat_completion(client, model_name, prompts[0], on_partial, stats), client, model_name, stats)]
+    max_workers = max(1, min(Config.MOM_MAP_CONCURRENCY, len(prompts)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        contents = list(executor.map(lambda p: _chat_completion(client, model_name, p, stats=stats), prompts))
+    return [_parse_mom_json(content, client, model_name, stats) for content in contents]
+
+
+def _generate_mom_map_reduce(client, model_name, transcription_text, on_partial=None, stats=None):
+    """
+    Membuat MoM untuk transkripsi yang melebihi budget prompt dengan pola map-reduce.
+
+    Map: setiap potongan transkripsi diekstrak menjadi MoM parsial secara paralel.
+    Reduce: MoM parsial digabung menjadi satu MoM dengan skema yang sama. Jika gabungan
+    MoM parsial masih melebihi budget, penggabungan dilakukan bertingkat.
+    """
+    chunks = chunk_transcript(transcription_text, Config.MOM_CHUNK_TOKENS)
+    logger.info(f"Transkripsi melebihi budget prompt; MoM dibuat dengan map-reduce atas {len(chunks)} bagian.")
+
+    prompts = [create_mom_extract_prompt(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1)]
+    partials = _run_prompts_concurrently(client, model_name, prompts, stats=stats)
+    for partial in partials:
+        if isinstance(partial, dict) and "error" in partial:
+            return partial
+    return _reduce_partial_moms(client, model_name, partials, on_partial, stats)
+
+
+def _reduce_partial_moms(client, model_name, partials, on_partial=None, stats=None):
+    """
+    Tahap reduce: menggabungkan MoM parsial (urut sesuai waktu) menjadi satu MoM.
+    Jika gabungan MoM parsial melebihi budget prompt, penggabungan dilakukan bertingkat.
+    """
+    # Reduce bertingkat: kelompokkan MoM parsial sampai satu prompt reduce muat dalam budget
+    while len(partials) > 1:
+        groups, current = [], []
+        for partial in partials:
+            candidate = current + [partial]
+            if current and estimate_tokens(json.dumps(candidate, ensure_ascii=False)) > Config.MOM_MAX_PROMPT_TOKENS:
+                groups.append(current)
+                current = [partial]
+            else:
+                current = candidate
+        groups.append(current)
+        if len(groups) == len(partials):
+            # Tiap MoM parsial sudah terlalu besar untuk digabung berdua; gabung semuanya sekaligus
+            groups = [partials]
+        logger.info(f"Tahap reduce: menggabungkan {len(partials)} MoM parsial menjadi {len(groups)}.")
+        partials = _run_prompts_concurrently(client, model_name, [create_mom_reduce_prompt(group) for group in groups],
+                                             on_partial=on_partial, stats=stats)
+        for partial in partials:
+            if isinstance(partial, dict) and "error" in partial:
+                return partial
+    return partials[0]
+
+
+def generate_mom_with_byteplus(transcription_text, on_partial=None, stats=None, prompt_text=None):
     """
     Menghasilkan MoM dari teks transkripsi menggunakan LLM BytePlus melalui OpenAI API.
+
+    Transkripsi yang melebihi MOM_MAX_PROMPT_TOKENS diproses dengan map-reduce:
+    ekstraksi per bagian secara paralel, lalu digabung menjadi satu MoM.
+
+    :param on_partial: Callback opsional yang menerima dict MoM parsial selama jawaban LLM
+                       di-stream (hanya jika MOM_STREAMING aktif).
+    :param stats: Dict opsional yang diisi statistik LLM (cache_hit, llm_requests, llm_seconds,
+                  prompt_tokens, completion_tokens, json_repairs, json_repair_followups),
+                  dijumlahkan dari semua permintaan.
+    :param prompt_text: Transkripsi yang sudah di-encode untuk prompt (hasil `encode_transcript_for_prompt`,
+                        mis. dari checkpoint pipeline); None berarti di-encode di sini.
     """
     logger.info("Memulai proses pembuatan MoM dengan BytePlus LLM...")
     
@@ -85,89 +616,119 @@ def generate_mom_with_byteplus(transcription_text):
         logger.warning(error_msg)
         return error_msg
 
-    prompt = create_mom_prompt(transcription_text)
-    logger.debug(f"Prompt yang dikirimkan ke LLM:\n{prompt[:500]}...") # Log sebagian prompt
+    # Cek cache berdasarkan hash transkripsi + versi prompt + model
+    cache_key = None
+    if Config.CACHE_ENABLED:
+        cache_key = make_cache_key(hash_text(transcription_text), MOM_PROMPT_VERSION, Config.BYTEPLUS_MOM_MODEL,
+                                   Config.MOM_PROMPT_ENCODING, Config.MOM_TIME_MARKER_MINUTES)
+        cached_mom = get_mom_cache().get(cache_key)
+        if cached_mom is not None:
+            logger.info("MoM untuk transkripsi ini diambil dari cache.")
+            if stats is not None:
+                stats["cache_hit"] = True
+            return cached_mom
 
     try:
         # 2. Dapatkan client yang dikonfigurasi
         client = get_byteplus_client() 
-        
-        # 3. Siapkan payload untuk API
         model_name = Config.BYTEPLUS_MOM_MODEL
         logger.info(f"Mengirim permintaan ke BytePlus LLM (Model/Endpoint ID: {model_name})...")
-        
-        # 4. Kirim permintaan ke API
-        completion = client.chat.completions.create(
-            model=model_name, 
-            messages=[
-                {"role": "system", "content": "Anda adalah asisten yang ahli dalam membuat Minutes of Meeting (MoM) yang terstruktur dari transkripsi rapat."},
-                {"role": "user", "content": prompt}
-            ],
-            # Tambahkan timeout jika perlu
-            # timeout=120 
-        )
-        logger.debug("Permintaan ke API BytePlus dikirim.")
-
-        # 5. Ekstrak jawaban dari respons
-        # Cek apakah ada pilihan (choices) dalam respons
-        if not completion.choices:
-             error_msg = "Respons dari BytePlus API tidak mengandung 'choices'."
-             logger.error(f"{error_msg} Respons lengkap: {completion}")
-             return error_msg
-
-        mom_content = completion.choices[0].message.content
-        if mom_content is None:
-             error_msg = "Konten pesan dalam respons dari BytePlus API adalah None."
-             logger.error(error_msg)
-             return error_msg
-             
-        mom_content = mom_content.strip()
-        logger.info("Berhasil menerima respons dari BytePlus API.")
-        logger.debug(f"Konten respons (potongan awal): {mom_content[:200]}...")
-
-        # 6. Coba parsing JSON untuk memastikan formatnya benar
-        if mom_content:
-            try:
-                mom_json = json.loads(mom_content)
-                logger.info("Berhasil mem-parsing MoM ke dalam format JSON.")
-                return mom_json
-            except json.JSONDecodeError as je:
-                error_msg = f"Gagal mem-parsing JSON MoM dari respons BytePlus. Error: {je}. Respons (potongan awal): {mom_content[:500]}..."
-                logger.error(error_msg)
-                # Opsional: Kembalikan teks mentah jika parsing gagal untuk debugging
-                return {"error": error_msg, "raw_response": mom_content[:1000]} # Batasi panjang raw response
+
+        if not Config.MOM_STREAMING:
+            on_partial = None
+
+        # Transkripsi diringkas dulu (paragraf, penanda waktu jarang) agar prompt lebih hemat token
+        if prompt_text is None:
+            prompt_text = encode_transcript_for_prompt(transcription_text, stats)
+
+        # 3. Kirim permintaan ke API (satu prompt, atau map-reduce untuk transkripsi panjang)
+        if estimate_tokens(prompt_text) > Config.MOM_MAX_PROMPT_TOKENS:
+            mom_result = _generate_mom_map_reduce(client, model_name, prompt_text, on_partial, stats)
         else:
-             error_msg = "Respons dari BytePlus API kosong."
-             logger.warning(error_msg)
-             return error_msg
-
-    # 7. Tangani error dari library openai
-    except ValueError as ve: 
-         error_msg = f"Konfigurasi error: {str(ve)}"
-         logger.error(error_msg)
-         return error_msg
-    except openai.AuthenticationError as auth_err:
-        error_msg = f"BytePlus API key (ARK_API_KEY) tidak valid atau tidak diotorisasi. Detail: {auth_err}"
-        logger.error(error_msg)
-        return error_msg
-    except openai.RateLimitError as rate_err:
-        error_msg = f"Quota BytePlus API telah habis atau terkena rate limit. Detail: {rate_err}"
-        logger.error(error_msg)
-        return error_msg
-    except openai.APIConnectionError as conn_err:
-         error_msg = f"Terjadi kesalahan koneksi saat menghubungi BytePlus API. Detail: {conn_err}"
-         logger.error(error_msg)
-         return error_msg
-    except openai.APIError as api_err: 
-        error_msg = f"Terjadi kesalahan dengan BytePlus API (via OpenAI library). Detail: {api_err}"
-        logger.error(error_msg)
-        return error_msg
-    # 8. Tangani error umum lainnya
+            prompt = create_mom_prompt(prompt_text)
+            logger.debug(f"Prompt yang dikirimkan ke LLM:\n{prompt[:500]}...") # Log sebagian prompt
+            mom_result = _parse_mom_json(_chat_completion(client, model_name, prompt, on_partial, stats),
+                                         client, model_name, stats)
+
+        if cache_key is not None and isinstance(mom_result, dict) and "error" not in mom_result:
+            get_mom_cache().put(cache_key, mom_result)
+        return mom_result
+
+    # 4. Tangani error dari library openai dan error umum lainnya
     except Exception as e:
-        error_msg = f"Terjadi kesalahan umum saat membuat MoM dengan BytePlus: {str(e)}"
+        return _describe_mom_error(e)
+
+
+def _describe_mom_error(error):
+    """Mencatat error pembuatan MoM dan mengembalikan pesan error yang dikembalikan ke pemanggil."""
+    if isinstance(error, MomResponseError):
+        error_msg = str(error)
+    elif isinstance(error, ValueError):
+        error_msg = f"Konfigurasi error: {str(error)}"
+    elif isinstance(error, openai.AuthenticationError):
+        error_msg = f"BytePlus API key (ARK_API_KEY) tidak valid atau tidak diotorisasi. Detail: {error}"
+    elif isinstance(error, openai.RateLimitError):
+        error_msg = f"Quota BytePlus API telah habis atau terkena rate limit. Detail: {error}"
+    elif isinstance(error, openai.APIConnectionError):
+        error_msg = f"Terjadi kesalahan koneksi saat menghubungi BytePlus API. Detail: {error}"
+    elif isinstance(error, openai.APIError):
+        error_msg = f"Terjadi kesalahan dengan BytePlus API (via OpenAI library). Detail: {error}"
+    else:
+        error_msg = f"Terjadi kesalahan umum saat membuat MoM dengan BytePlus: {str(error)}"
         logger.error(error_msg)
         logger.exception("Traceback:") # Ini akan mencetak traceback lengkap
         return error_msg
+    logger.error(error_msg)
+    return error_msg
+
+
+def extract_partial_mom(transcription_text, part_number, stats=None):
+    """
+    Tahap map untuk rapat yang masih berlangsung: ekstraksi MoM parsial dari satu bagian transkripsi.
+
+    Hasilnya nanti digabung oleh `generate_mom_from_partials` saat rapat selesai, sehingga
+    permintaan LLM terakhir hanya perlu menggabungkan MoM parsial.
+
+    :return: Dict MoM parsial, dict {"error": ...} jika JSON tidak valid, atau string error.
+    """
+    if not Config.BYTEPLUS_MOM_MODEL:
+        return "BYTEPLUS_MOM_MODEL (Endpoint ID) tidak dikonfigurasi di .env"
+    try:
+        client = get_byteplus_client()
+        prompt_text = encode_transcript_for_prompt(transcription_text, stats)
+        prompt = create_mom_extract_prompt(prompt_text, part_number)
+        return _parse_mom_json(_chat_completion(client, Config.BYTEPLUS_MOM_MODEL, prompt, stats=stats),
+                               client, Config.BYTEPLUS_MOM_MODEL, stats)
+    except Exception as e:
+        return _describe_mom_error(e)
+
+
+def generate_mom_from_partials(partial_moms, tail_text=None, on_partial=None, stats=None):
+    """
+    Menggabungkan MoM parsial (urut sesuai waktu, hasil `extract_partial_mom`) menjadi satu MoM.
+
+    :param tail_text: Sisa transkripsi yang belum diekstrak; diekstrak dulu sebagai bagian terakhir.
+    :param on_partial: Callback opsional untuk MoM parsial selama jawaban reduce di-stream.
+    :return: Dict MoM, atau string/dict error seperti `generate_mom_with_byteplus`.
+    """
+    if not Config.BYTEPLUS_MOM_MODEL:
+        return "BYTEPLUS_MOM_MODEL (Endpoint ID) tidak dikonfigurasi di .env"
+    partials = list(partial_moms or [])
+    if tail_text and tail_text.strip():
+        tail_mom = extract_partial_mom(tail_text, len(partials) + 1, stats)
+        if not isinstance(tail_mom, dict) or "error" in tail_mom:
+            return tail_mom
+        partials.append(tail_mom)
+    if not partials:
+        return "Tidak ada MoM parsial untuk digabung."
+    logger.info(f"Menggabungkan {len(partials)} MoM parsial yang sudah diekstrak selama rapat berlangsung.")
+    try:
+        client = get_byteplus_client()
+        if not Config.MOM_STREAMING:
+            on_partial = None
+        return _reduce_partial_moms(client, Config.BYTEPLUS_MOM_MODEL, partials, on_partial, stats)
+    except Exception as e:
+        return _describe_mom_error(e)
 
 # Fungsi format_mom_to_text (tetap sama)
 def format_mom_to_text(mom_dict):
@@ -0,0 +1,159 @@
+# app/cache_utils.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024  # Baca file per 1 MB saat menghitung hash
+
+
+def hash_file(file_path):
+    """Menghitung SHA-256 dari isi file secara bertahap (tanpa memuat seluruh file ke memori)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_text(text):
+    """Menghitung SHA-256 dari teks (UTF-8)."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(*parts):
+    """Menggabungkan beberapa komponen (hash konten, nama model, versi prompt, ...) menjadi satu kunci cache."""
+    return hash_text("\x1f".join(str(part) for part in parts))
+
+
+def _json_default(obj):
+    # Hasil Whisper bisa mengandung skalar/array NumPy
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Objek bertipe {type(obj).__name__} tidak bisa diserialisasi ke JSON")
+
+
+class ContentCache:
+    """
+    Cache berbasis konten yang disimpan sebagai file JSON di disk.
+
+    Setiap entri disimpan di `<directory>/<key>.json`. Urutan LRU disimpan di memori
+    dan dibangun ulang dari waktu modifikasi file saat cache pertama kali dipakai,
+    sehingga cache tetap berlaku setelah server dimulai ulang.
+    Entri paling lama tidak dipakai akan dihapus saat total ukuran melebihi
+    `max_bytes` atau jumlah entri melebihi `max_entries`.
+    """
+
+    def __init__(self, directory, max_bytes, max_entries=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._index = None  # OrderedDict key -> ukuran file (byte), urutan dari yang paling lama dipakai
+        self._total_bytes = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index_locked(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+        logger.debug(f"Cache {self.directory} dimuat: {len(self._index)} entri, {self._total_bytes} byte.")
+
+    def get(self, key):
+        """Mengembalikan nilai yang tersimpan untuk `key`, atau None jika tidak ada."""
+        with self._lock:
+            self._load_index_locked()
+            if key not in self._index:
+                return None
+            path = self._entry_path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(path)  # Perbarui waktu akses agar urutan LRU bertahan setelah restart
+            except (OSError, ValueError) as e:
+                logger.warning(f"Entri cache {key} tidak bisa dibaca, dihapus: {e}")
+                self._remove_locked(key)
+                return None
+            self._index.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Menyimpan nilai (harus bisa diserialisasi ke JSON) lalu menjalankan eviction LRU."""
+        data = json.dumps(value, ensure_ascii=False, default=_json_default).encode('utf-8')
+        if self.max_bytes and len(data) > self.max_bytes:
+            logger.info(f"Entri cache {key} ({len(data)} byte) melebihi batas cache, tidak disimpan.")
+            return
+        with self._lock:
+            self._load_index_locked()
+            path = self._entry_path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self._index and (
+            (self.max_bytes and self._total_bytes > self.max_bytes)
+            or (self.max_entries and len(self._index) > self.max_entries)
+        ):
+            oldest_key = next(iter(self._index))
+            logger.debug(f"Menghapus entri cache LRU: {oldest_key}")
+            self._remove_locked(oldest_key)
+
+    def _remove_locked(self, key):
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+
+# --- Instance cache bersama (dibuat saat pertama kali dibutuhkan) ---
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(name, max_mb):
+    with _caches_lock:
+        if name not in _caches:
+            cache_dir = Config.CACHE_DIR or os.path.join(Config.UPLOAD_FOLDER, '.cache')
+            _caches[name] = ContentCache(
+                os.path.join(cache_dir, name),
+                max_bytes=int(max_mb * 1024 * 1024),
+                max_entries=Config.CACHE_MAX_ENTRIES
+            )
+        return _caches[name]
+
+
+def get_transcript_cache():
+    """Cache hasil transkripsi Whisper, dikunci dengan hash audio + model + task."""
+    return _get_cache('transcripts', Config.TRANSCRIPT_CACHE_MAX_MB)
+
+
+def get_mom_cache():
+    """Cache hasil MoM, dikunci dengan hash transkripsi + versi prompt + model LLM."""
+    return _get_cache('mom', Config.MOM_CACHE_MAX_MB)
@@ -0,0 +1,267 @@
+# app/chunked_stt_utils.py
+import gc
+import os
+import sys
+import time
+import pickle
+import subprocess
+import logging
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.audio_utils import SAMPLE_RATE, find_silence_split_points
+
+logger = logging.getLogger(__name__)
+
+# --- State per proses worker (diisi oleh _init_worker) ---
+_WORKER_MODEL = None
+
+# Model yang sudah dimuat di proses induk, diwariskan ke worker hasil fork (token -> model).
+# Worker membaca bobot yang sama (shared memory / copy-on-write) alih-alih memuat salinan sendiri.
+_SHARED_MODELS = {}
+_shared_models_lock = threading.Lock()
+_shared_tokens = itertools.count()
+
+# gc.freeze()/gc.unfreeze() berlaku untuk seluruh proses: satu transkripsi paralel sekaligus
+_fork_lock = threading.Lock()
+
+
+def available_cpu_count():
+    """Jumlah core yang benar-benar boleh dipakai proses ini (memperhitungkan CPU affinity/cgroup)."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _init_worker(model_name, threads_per_worker, quantize=False, shared_token=None):
+    """
+    Initializer proses worker: atur jumlah thread torch, lalu pakai model dari proses induk
+    (jika diwariskan lewat fork) atau muat model Whisper sekali per proses.
+    """
+    global _WORKER_MODEL
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    # Satu thread inter-op cukup: paralelisme antar chunk sudah ditangani oleh proses
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # sudah diatur (atau pool thread sudah berjalan)
+    _WORKER_MODEL = _SHARED_MODELS.get(shared_token)
+    if _WORKER_MODEL is None:
+        from app.model_registry import load_whisper_model
+        _WORKER_MODEL = load_whisper_model(model_name, "cpu", quantize=quantize)
+
+
+def share_model_memory(model):
+    """
+    Memindahkan parameter dan buffer model ke shared memory (`Module.share_memory`).
+
+    Setelah itu proses anak hasil fork membaca storage yang sama tanpa menyalin halaman memori
+    sama sekali, bahkan ketika refcount atau metadata tensor di proses anak berubah.
+    """
+    if not getattr(model, "_mom_shared_memory", False):
+        model.share_memory()
+        model._mom_shared_memory = True
+    return model
+
+
+def _transcribe_chunk(audio_chunk, task, offset_seconds, decode_options=None):
+    """Mentranskripsi satu chunk di proses worker. Timestamp masih relatif terhadap chunk."""
+    result = _WORKER_MODEL.transcribe(audio_chunk, task=task, verbose=False, fp16=False, **(decode_options or {}))
+    return offset_seconds, result
+
+
+def _get_mp_context():
+    # fork menghindari impor ulang modul utama (run.py/app.py) di setiap worker
+    if sys.platform != "win32":
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def split_audio(audio, chunk_seconds, search_seconds=30.0):
+    """
+    Memotong audio menjadi beberapa chunk pada batas sunyi.
+
+    :return: List tuple (offset_detik, array_chunk).
+    """
+    boundaries = [0] + find_silence_split_points(audio, chunk_seconds, search_seconds) + [len(audio)]
+    return [
+        (start / SAMPLE_RATE, audio[start:end])
+        for start, end in zip(boundaries[:-1], boundaries[1:])
+        if end > start
+    ]
+
+
+def merge_chunk_results(chunk_results):
+    """
+    Menggabungkan hasil transkripsi per chunk menjadi satu dictionary seperti hasil `model.transcribe()`.
+
+    Timestamp `start`/`end` setiap segmen (dan kata, jika ada) digeser dengan offset chunk
+    sehingga relatif terhadap awal rekaman. `id` segmen dinomori ulang secara berurutan.
+
+    :param chunk_results: List tuple (offset_detik, hasil_transcribe), urut berdasarkan offset.
+    """
+    segments = []
+    texts = []
+    language = None
+    for offset, result in chunk_results:
+        if language is None:
+            language = result.get("language")
+        text = result.get("text", "").strip()
+        if text:
+            texts.append(text)
+        for segment in result.get("segments", []):
+            shifted = dict(segment)
+            shifted["id"] = len(segments)
+            shifted["start"] = segment.get("start", 0) + offset
+            shifted["end"] = segment.get("end", 0) + offset
+            if segment.get("words"):
+                shifted["words"] = [
+                    dict(word, start=word["start"] + offset, end=word["end"] + offset)
+                    for word in segment["words"]
+                ]
+            segments.append(shifted)
+    return {"text": " ".join(texts), "segments": segments, "language": language}
+
+
+def transcribe_in_chunks(audio, model_name, task="transcribe", processes=None, chunk_seconds=300, quantize=False,
+                         model=None, threads_per_worker=None, decode_options=None):
+    """
+    Mentranskripsi audio panjang secara paralel di beberapa proses CPU.
+
+    Audio dipotong pada batas sunyi, setiap chunk ditranskripsi di process pool,
+    lalu segmen digabung kembali dengan offset waktu global.
+
+    :param audio: Array float32 mono 16 kHz (hasil `whisper.load_audio`).
+    :param model_name: Nama model Whisper yang dimuat di setiap worker.
+    :param processes: Jumlah proses worker (default: setengah jumlah core).
+    :param chunk_seconds: Target panjang setiap chunk dalam detik.
+    :param quantize: Muat model int8 (kuantisasi dinamis) di setiap worker.
+    :param model: Model CPU yang sudah dimuat di proses ini. Jika diberikan (dan platform mendukung
+                  fork), bobotnya dibagikan ke semua worker sehingga memori model tidak berlipat
+                  sesuai jumlah proses.
+    :param threads_per_worker: Jumlah thread torch per proses (default: core tersedia / jumlah proses).
+    :param decode_options: Argumen decoding tambahan untuk `model.transcribe()` (bahasa, beam, suhu, ...).
+    :return: Dictionary dengan bentuk yang sama seperti hasil `model.transcribe()`.
+    """
+    cpu_count = available_cpu_count()
+    chunks = split_audio(audio, chunk_seconds)
+    processes = max(1, min(processes or max(1, cpu_count // 2), len(chunks)))
+    threads_per_worker = threads_per_worker or max(1, cpu_count // processes)
+
+    mp_context = _get_mp_context()
+    with _fork_lock:
+        shared_token = None
+        if model is not None and mp_context.get_start_method() == "fork":
+            shared_token = next(_shared_tokens)
+            with _shared_models_lock:
+                _SHARED_MODELS[shared_token] = share_model_memory(model)
+            # Objek yang sudah ada dipindah ke generasi permanen agar GC di worker tidak menyentuh
+            # (dan menyalin) halaman memori yang diwarisi dari induk
+            gc.freeze()
+
+        print(f"Transkripsi paralel: {len(chunks)} chunk, {processes} proses, {threads_per_worker} thread per proses"
+              f"{', bobot model dibagi dari proses induk' if shared_token is not None else ''}.")
+        start_time = time.time()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=mp_context,
+                initializer=_init_worker,
+                initargs=(model_name, threads_per_worker, quantize, shared_token)
+            ) as executor:
+                futures = [executor.submit(_transcribe_chunk, chunk, task, offset, decode_options)
+                           for offset, chunk in chunks]
+                chunk_results = [future.result() for future in futures]
+        finally:
+            if shared_token is not None:
+                with _shared_models_lock:
+                    _SHARED_MODELS.pop(shared_token, None)
+                gc.unfreeze()
+
+    print(f"Transkripsi paralel selesai dalam {time.time() - start_time:.2f} detik.")
+    return merge_chunk_results(sorted(chunk_results, key=lambda item: item[0]))
+
+
+# --- Proses helper transkripsi paralel ---
+# Server Flask/Streamlit punya banyak thread (scheduler, SSE, sesi live, evictor). Fork langsung dari
+# sana mewariskan lock yang sedang dipegang thread lain (logging, registry, stdout) ke worker. Worker
+# chunk karena itu di-fork dari proses helper: interpreter baru dengan satu thread yang hanya
+# menjalankan `transcribe_in_chunks` untuk satu permintaan setiap kali.
+_helper = None
+_helper_lock = threading.Lock()
+
+
+def _start_helper():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    logger.info("Menjalankan proses helper transkripsi paralel...")
+    return subprocess.Popen(
+        [sys.executable, "-c", "from app.chunked_stt_utils import helper_main; helper_main()"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env
+    )
+
+
+def transcribe_in_helper(audio, model_name, share_weights=True, **options):
+    """
+    Menjalankan `transcribe_in_chunks` di proses helper (dijalankan saat pertama kali dibutuhkan
+    dan dipakai ulang), bukan dengan mem-fork proses server.
+
+    :param share_weights: Helper memuat model sekali (disimpan antar permintaan) lalu membagikan
+                          bobotnya ke worker hasil fork, alih-alih setiap worker memuat salinan sendiri.
+    :param options: Diteruskan ke `transcribe_in_chunks` (task, processes, chunk_seconds, quantize, ...).
+    :raises RuntimeError: Jika transkripsi gagal atau proses helper berhenti.
+    """
+    global _helper
+    with _helper_lock:
+        if _helper is None or _helper.poll() is not None:
+            _helper = _start_helper()
+        try:
+            pickle.dump((audio, model_name, share_weights, options), _helper.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+            _helper.stdin.flush()
+            status, value = pickle.load(_helper.stdout)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            _helper.kill()
+            _helper.wait()
+            _helper = None
+            raise RuntimeError(f"Proses helper transkripsi paralel berhenti: {e}") from e
+    if status == "error":
+        raise RuntimeError(f"Transkripsi paralel gagal: {value}")
+    return value
+
+
+def helper_main():
+    """
+    Loop proses helper: membaca permintaan (pickle) dari stdin dan menulis hasilnya ke stdout.
+    Berhenti saat stdin ditutup (proses server berhenti).
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    requests = sys.stdin.buffer
+    responses = os.fdopen(os.dup(1), "wb")
+    # print() (mis. saat memuat model) diarahkan ke stderr agar tidak merusak stream hasil
+    os.dup2(2, 1)
+    models = {}
+    while True:
+        try:
+            audio, model_name, share_weights, options = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            model = None
+            if share_weights and _get_mp_context().get_start_method() == "fork":
+                key = (model_name, bool(options.get("quantize")))
+                if key not in models:
+                    # Hanya satu model yang disimpan agar memori helper tidak terus bertambah
+                    models.clear()
+                    from app.model_registry import load_whisper_model
+                    models[key] = load_whisper_model(model_name, "cpu", quantize=key[1])
+                model = models[key]
+            response = ("ok", transcribe_in_chunks(audio, model_name, model=model, **options))
+        except Exception as e:
+            logger.exception("Transkripsi paralel di proses helper gagal:")
+            response = ("error", f"{type(e).__name__}: {e}")
+        pickle.dump(response, responses, protocol=pickle.HIGHEST_PROTOCOL)
+        responses.flush()
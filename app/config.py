@@ -7,6 +7,8 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
+    # Data runtime server (job store, indeks artefak); terpisah dari UPLOAD_FOLDER yang dilayani /download
+    DATA_FOLDER = os.environ.get('DATA_FOLDER') or 'instance'
 
     # --- Alibaba Cloud Config (tidak digunakan lagi, bisa dihapus atau dikomentari) ---
     # ALIBABA_ACCESS_KEY_ID = os.environ.get('ALIBABA_ACCESS_KEY_ID')
@@ -17,11 +19,166 @@ class Config:
 
     # --- Whisper Config ---
     WHISPER_MODEL_NAME = os.environ.get('WHISPER_MODEL_NAME') or 'base'
+    # Model yang boleh dipilih per job, dan model yang dimuat saat warm-up
+    WHISPER_ALLOWED_MODELS = [m.strip() for m in (os.environ.get('WHISPER_ALLOWED_MODELS') or 'tiny,base,small').split(',') if m.strip()]
+    WHISPER_PRELOAD_MODELS = [m.strip() for m in (os.environ.get('WHISPER_PRELOAD_MODELS') or '').split(',') if m.strip()]
+    # Bahasa yang dipatok untuk transkripsi (kode Whisper, mis. 'id', 'en'); 'auto' = deteksi per file
+    WHISPER_LANGUAGE = (os.environ.get('WHISPER_LANGUAGE') or 'id').lower()
+    # Profil decoding default: 'fast', 'balanced', atau 'accurate' (lihat app/decoding_profiles.py);
+    # bisa dipilih per job. Gunakan 'fast' untuk throughput lebih tinggi saat jam sibuk
+    WHISPER_DECODING_PROFILE = (os.environ.get('WHISPER_DECODING_PROFILE') or 'balanced').lower()
+    # Batas total memori (MB) untuk model Whisper yang aktif sekaligus
+    WHISPER_MODEL_MEMORY_BUDGET_MB = float(os.environ.get('WHISPER_MODEL_MEMORY_BUDGET_MB') or 1024)
+    # Transkripsi paralel per chunk untuk rekaman panjang di CPU: 'auto', 'on', atau 'off'
+    WHISPER_CHUNKED_MODE = (os.environ.get('WHISPER_CHUNKED_MODE') or 'auto').lower()
+    WHISPER_CHUNK_SECONDS = int(os.environ.get('WHISPER_CHUNK_SECONDS') or 300)
+    # Mode 'auto' hanya aktif untuk audio yang lebih panjang dari ini (detik)
+    WHISPER_CHUNKED_MIN_SECONDS = int(os.environ.get('WHISPER_CHUNKED_MIN_SECONDS') or 900)
+    # Jumlah proses worker transkripsi paralel (0 = setengah jumlah core)
+    STT_PROCESSES = int(os.environ.get('STT_PROCESSES') or 0)
+    # Jumlah thread torch per proses worker transkripsi paralel (0 = core tersedia / jumlah proses)
+    STT_THREADS_PER_PROCESS = int(os.environ.get('STT_THREADS_PER_PROCESS') or 0)
+    # Muat model sekali di proses helper transkripsi paralel dan bagikan bobotnya (shared memory)
+    # ke worker hasil fork, alih-alih setiap worker memuat salinan sendiri
+    STT_SHARED_WEIGHTS = (os.environ.get('STT_SHARED_WEIGHTS') or 'true').lower() in ('1', 'true', 'yes')
+    # Backend STT: 'torch' (openai-whisper fp32/fp16), 'torch-int8' (openai-whisper dengan kuantisasi
+    # dinamis int8, CPU), atau 'ctranslate2' (faster-whisper, int8 di CPU)
+    STT_BACKEND = (os.environ.get('STT_BACKEND') or 'torch').lower()
+    # Tipe komputasi backend ctranslate2 (mis. 'int8', 'int8_float16', 'float16', 'float32')
+    STT_COMPUTE_TYPE = os.environ.get('STT_COMPUTE_TYPE') or 'int8'
+    # Jumlah thread CPU per model ctranslate2 (0 = default library)
+    STT_CPU_THREADS = int(os.environ.get('STT_CPU_THREADS') or 0)
+    # Pre-pass VAD berbasis energi: jeda panjang dibuang sebelum Whisper, timestamp dipetakan kembali
+    STT_VAD_ENABLED = (os.environ.get('STT_VAD_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    # Ambang suara: sekian dB di atas derau latar rekaman
+    STT_VAD_MARGIN_DB = float(os.environ.get('STT_VAD_MARGIN_DB') or 10)
+    # Hanya jeda minimal sepanjang ini yang dibuang; padding ditambahkan di kedua sisi setiap wilayah suara
+    STT_VAD_MIN_SILENCE_SECONDS = float(os.environ.get('STT_VAD_MIN_SILENCE_SECONDS') or 1.5)
+    STT_VAD_PADDING_SECONDS = float(os.environ.get('STT_VAD_PADDING_SECONDS') or 0.3)
+    # Jika porsi hening yang terbuang lebih kecil dari ini, audio asli dipakai apa adanya
+    STT_VAD_MIN_SAVINGS = float(os.environ.get('STT_VAD_MIN_SAVINGS') or 0.05)
 
     # --- BytePlus Config (untuk MoM dengan LLM melalui OpenAI API) ---
     ARK_API_KEY = os.environ.get('ARK_API_KEY') # Perhatikan nama variabelnya
     BYTEPLUS_BASE_URL = os.environ.get('BYTEPLUS_BASE_URL') or 'https://ark.cn-beijing.bytedanceapi.com/api/v3' # Default jika tidak diatur
     BYTEPLUS_MOM_MODEL = os.environ.get('BYTEPLUS_MOM_MODEL') # Endpoint ID     
+    # Timeout permintaan ke BytePlus (detik): total per permintaan dan untuk membuka koneksi
+    BYTEPLUS_TIMEOUT_SECONDS = float(os.environ.get('BYTEPLUS_TIMEOUT_SECONDS') or 300)
+    BYTEPLUS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('BYTEPLUS_CONNECT_TIMEOUT_SECONDS') or 10)
+    # Retry dengan exponential backoff + jitter untuk 429/5xx/timeout/error koneksi
+    BYTEPLUS_MAX_RETRIES = int(os.environ.get('BYTEPLUS_MAX_RETRIES') or 4)
+    BYTEPLUS_RETRY_BASE_SECONDS = float(os.environ.get('BYTEPLUS_RETRY_BASE_SECONDS') or 1)
+    BYTEPLUS_RETRY_MAX_SECONDS = float(os.environ.get('BYTEPLUS_RETRY_MAX_SECONDS') or 30)
+    # Maksimum permintaan LLM yang berjalan bersamaan per proses (semua job digabung)
+    BYTEPLUS_MAX_CONCURRENCY = int(os.environ.get('BYTEPLUS_MAX_CONCURRENCY') or 4)
+    # Transkripsi di atas budget ini (perkiraan token) diproses dengan map-reduce
+    MOM_MAX_PROMPT_TOKENS = int(os.environ.get('MOM_MAX_PROMPT_TOKENS') or 12000)
+    # Ukuran setiap bagian transkripsi pada tahap map (perkiraan token)
+    MOM_CHUNK_TOKENS = int(os.environ.get('MOM_CHUNK_TOKENS') or 4000)
+    # Jumlah permintaan ekstraksi paralel ke BytePlus pada tahap map/reduce
+    MOM_MAP_CONCURRENCY = int(os.environ.get('MOM_MAP_CONCURRENCY') or 4)
+    # Encoding transkripsi di prompt MoM: 'compact' (paragraf + penanda waktu jarang, tanpa
+    # filler/pengulangan) atau 'full' (setiap segmen dengan timestamp, seperti file transkripsi)
+    MOM_PROMPT_ENCODING = (os.environ.get('MOM_PROMPT_ENCODING') or 'compact').lower()
+    # Jarak penanda waktu pada encoding 'compact' (menit)
+    MOM_TIME_MARKER_MINUTES = int(os.environ.get('MOM_TIME_MARKER_MINUTES') or 5)
+    # Stream jawaban LLM agar agenda MoM bisa ditampilkan sebelum jawaban lengkap
+    MOM_STREAMING = (os.environ.get('MOM_STREAMING') or 'true').lower() in ('1', 'true', 'yes')
+    # JSON MoM yang tidak bisa diperbaiki lokal (atau terpotong sampai ada field yang hilang) diperbaiki
+    # dengan satu permintaan susulan singkat tanpa transkripsi, alih-alih job gagal
+    MOM_JSON_FOLLOWUP = (os.environ.get('MOM_JSON_FOLLOWUP') or 'true').lower() in ('1', 'true', 'yes')
+
+    # --- Job Scheduler Config ---
+    # Jumlah worker STT (ekstraksi audio + Whisper) dan worker LLM (pembuatan MoM)
+    STT_WORKERS = int(os.environ.get('STT_WORKERS') or 1)
+    LLM_WORKERS = int(os.environ.get('LLM_WORKERS') or 2)
+    # Maksimum job yang boleh menunggu worker STT sebelum upload baru ditolak (HTTP 429)
+    JOB_QUEUE_MAXSIZE = int(os.environ.get('JOB_QUEUE_MAXSIZE') or 20)
+    # Nilai minimum header Retry-After (detik) saat antrean penuh
+    JOB_RETRY_AFTER_SECONDS = int(os.environ.get('JOB_RETRY_AFTER_SECONDS') or 30)
+    # Urutan antrean STT: waktu masuk + bobot x durasi audio (detik). 0 = FIFO murni;
+    # 0.1 berarti audio 60 menit "mundur" 6 menit dibanding audio yang masuk bersamaan
+    JOB_SHORTEST_FIRST_WEIGHT = float(os.environ.get('JOB_SHORTEST_FIRST_WEIGHT') or 0.1)
+
+    # --- Batch Upload Config ---
+    # Maksimum file per batch (termasuk isi ZIP) dan total ukuran isi ZIP setelah diekstrak
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES') or 50)
+    BATCH_MAX_UNCOMPRESSED_MB = int(os.environ.get('BATCH_MAX_UNCOMPRESSED_MB') or 4096)
+
+    # --- Resumable Upload Config (/uploads, upload bertahap per potongan) ---
+    # Ukuran maksimum satu file dan satu potongan (PATCH) upload bertahap
+    UPLOAD_MAX_MB = int(os.environ.get('UPLOAD_MAX_MB') or 8192)
+    UPLOAD_CHUNK_MAX_MB = int(os.environ.get('UPLOAD_CHUNK_MAX_MB') or 64)
+    # Ukuran potongan yang disarankan ke klien (browser)
+    UPLOAD_CHUNK_MB = int(os.environ.get('UPLOAD_CHUNK_MB') or 8)
+    # Sesi upload yang tidak menerima data selama ini (detik) dihapus beserta isinya
+    UPLOAD_SESSION_TTL_SECONDS = int(os.environ.get('UPLOAD_SESSION_TTL_SECONDS') or 24 * 3600)
+    # Mulai dekode audio dari bagian yang sudah diterima selama upload berjalan (wav/mp3/ogg/flac/webm/mkv).
+    # PCM hasil dekode (~115 MB per jam audio) disimpan di memori sampai job diambil worker STT, jadi
+    # fitur ini harus diaktifkan eksplisit. Total PCM yang ditahan dibatasi UPLOAD_PREFIX_DECODE_MAX_MB;
+    # upload di atas batas itu didekode seperti biasa setelah upload selesai.
+    UPLOAD_PREFIX_DECODE = (os.environ.get('UPLOAD_PREFIX_DECODE') or 'false').lower() in ('1', 'true', 'yes')
+    UPLOAD_PREFIX_DECODE_MAX_MB = int(os.environ.get('UPLOAD_PREFIX_DECODE_MAX_MB') or 512)
+
+    # --- Live Meeting Config (/live, audio rapat dikirim bertahap selama rapat berlangsung) ---
+    # Panjang jendela transkripsi dan interval transkripsi ulang (detik audio)
+    LIVE_WINDOW_SECONDS = float(os.environ.get('LIVE_WINDOW_SECONDS') or 30)
+    LIVE_STEP_SECONDS = float(os.environ.get('LIVE_STEP_SECONDS') or 5)
+    # Segmen di ekor jendela sepanjang ini belum final (teksnya masih bisa berubah)
+    LIVE_UNSTABLE_TAIL_SECONDS = float(os.environ.get('LIVE_UNSTABLE_TAIL_SECONDS') or 5)
+    # Maksimum rapat langsung yang ditranskripsi bersamaan per proses (bersaing dengan worker STT)
+    LIVE_MAX_SESSIONS = int(os.environ.get('LIVE_MAX_SESSIONS') or 2)
+    # Sesi yang tidak menerima audio selama ini (detik) dibatalkan
+    LIVE_IDLE_TIMEOUT_SECONDS = int(os.environ.get('LIVE_IDLE_TIMEOUT_SECONDS') or 300)
+
+    # --- Artifact Config (file di folder upload: media sumber, transkripsi, MoM) ---
+    # Retensi per jenis file (detik), dihitung sejak file tidak lagi dipakai job.
+    # 0 = dihapus begitu tidak dipakai, negatif = disimpan sampai kuota disk penuh
+    ARTIFACT_SOURCE_RETENTION_SECONDS = int(os.environ.get('ARTIFACT_SOURCE_RETENTION_SECONDS') or 24 * 3600)
+    # Audio perantara (mis. *_extracted_audio.wav) dihapus begitu transkripsi selesai
+    ARTIFACT_AUDIO_RETENTION_SECONDS = int(os.environ.get('ARTIFACT_AUDIO_RETENTION_SECONDS') or 0)
+    ARTIFACT_TRANSCRIPT_RETENTION_SECONDS = int(os.environ.get('ARTIFACT_TRANSCRIPT_RETENTION_SECONDS') or 30 * 24 * 3600)
+    ARTIFACT_MOM_RETENTION_SECONDS = int(os.environ.get('ARTIFACT_MOM_RETENTION_SECONDS') or 30 * 24 * 3600)
+    # Simpan transkripsi dan MoM dengan gzip (didekompresi otomatis saat download)
+    ARTIFACT_COMPRESS = (os.environ.get('ARTIFACT_COMPRESS') or 'true').lower() in ('1', 'true', 'yes')
+    # Total ukuran maksimum semua artefak (MB); artefak terlama dihapus lebih dulu. 0 = tanpa kuota
+    ARTIFACT_DISK_QUOTA_MB = int(os.environ.get('ARTIFACT_DISK_QUOTA_MB') or 20480)
+    ARTIFACT_INDEX_PATH = os.environ.get('ARTIFACT_INDEX_PATH') # Default: <DATA_FOLDER>/artifacts.sqlite3
+    # Catat file lama yang berada langsung di folder upload (sebelum layout shard) saat startup, agar
+    # retensi dan kuota juga menghapusnya. Mati secara default: file contoh di uploads/ ikut di git
+    ARTIFACT_ADOPT_EXISTING = (os.environ.get('ARTIFACT_ADOPT_EXISTING') or 'false').lower() in ('1', 'true', 'yes')
+
+    # --- Results Config (/results dan /download) ---
+    # Lama hasil job boleh disimpan di cache browser (detik); setelahnya divalidasi ulang dengan ETag
+    RESULTS_MAX_AGE_SECONDS = int(os.environ.get('RESULTS_MAX_AGE_SECONDS') or 24 * 3600)
+    # Jumlah respons /results terkompresi yang disimpan di memori per proses
+    RESULTS_CACHE_MAX_ENTRIES = int(os.environ.get('RESULTS_CACHE_MAX_ENTRIES') or 64)
+
+    # --- Job Store Config ---
+    # 'sqlite' (default, bisa dipakai bersama oleh beberapa proses) atau 'memory'
+    JOB_STORE_BACKEND = (os.environ.get('JOB_STORE_BACKEND') or 'sqlite').lower()
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH') # Default: <DATA_FOLDER>/jobs.sqlite3
+    # Status job dihapus setelah tidak berubah selama TTL ini (detik)
+    JOB_TTL_SECONDS = int(os.environ.get('JOB_TTL_SECONDS') or 7 * 24 * 3600)
+    JOB_EVICT_INTERVAL_SECONDS = int(os.environ.get('JOB_EVICT_INTERVAL_SECONDS') or 600)
+    # Setiap proses memperbarui lease-nya sesering ini (detik); job milik proses yang lease-nya tidak
+    # diperbarui selama JOB_OWNER_LEASE_SECONDS dianggap terhenti dan dilanjutkan oleh proses lain
+    JOB_OWNER_HEARTBEAT_SECONDS = int(os.environ.get('JOB_OWNER_HEARTBEAT_SECONDS') or 15)
+    JOB_OWNER_LEASE_SECONDS = int(os.environ.get('JOB_OWNER_LEASE_SECONDS') or 60)
+    # Interval pemeriksaan ulang status oleh SSE untuk perubahan dari proses lain (detik)
+    JOB_STORE_POLL_SECONDS = float(os.environ.get('JOB_STORE_POLL_SECONDS') or 2)
+    # Interval heartbeat SSE (detik) saat status job tidak berubah
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS') or 15)
+    # Interval refresh progres job di halaman proses Streamlit (detik)
+    STREAMLIT_POLL_SECONDS = float(os.environ.get('STREAMLIT_POLL_SECONDS') or 1)
+
+
+    # --- Cache Config (transkripsi dan MoM berbasis hash konten) ---
+    CACHE_ENABLED = (os.environ.get('CACHE_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    CACHE_DIR = os.environ.get('CACHE_DIR') # Default: <UPLOAD_FOLDER>/.cache
+    TRANSCRIPT_CACHE_MAX_MB = float(os.environ.get('TRANSCRIPT_CACHE_MAX_MB') or 256)
+    MOM_CACHE_MAX_MB = float(os.environ.get('MOM_CACHE_MAX_MB') or 64)
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 10000)
 
 
     # --- Validasi Whisper Config ---
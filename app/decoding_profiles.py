@@ -0,0 +1,99 @@
+# app/decoding_profiles.py
+import json
+import hashlib
+
+from app.config import Config
+
+# Profil decoding Whisper bernama: tukar akurasi dengan kecepatan per job (mis. 'fast' saat jam sibuk).
+# - beam_size None = greedy (satu hipotesis); 5 = beam search (lebih akurat, ~2-4x lebih lambat)
+# - temperature: urutan suhu fallback; window yang gagal ambang di bawah di-decode ulang dengan suhu
+#   berikutnya. Satu suhu saja berarti tidak ada decode ulang.
+# - condition_on_previous_text: teks window sebelumnya dipakai sebagai prompt (lebih konsisten, tetapi
+#   bisa terjebak mengulang kalimat/halusinasi berantai)
+# - compression_ratio_threshold / logprob_threshold / no_speech_threshold: ambang yang memicu fallback
+#   (teks terlalu berulang / keyakinan rendah) atau menganggap window hening
+DECODING_PROFILES = {
+    'fast': {
+        'beam_size': None,
+        'best_of': None,
+        'temperature': (0.0,),
+        'condition_on_previous_text': False,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+    },
+    'balanced': {
+        'beam_size': None,
+        'best_of': 3,
+        'temperature': (0.0, 0.4, 0.8),
+        'condition_on_previous_text': False,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+    },
+    'accurate': {
+        'beam_size': 5,
+        'best_of': 5,
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'condition_on_previous_text': True,
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+    },
+}
+
+
+def resolve_decoding_profile(name=None, language=None):
+    """
+    Mengembalikan profil decoding lengkap (dict baru) beserta bahasa yang dipatok.
+
+    :param name: Nama profil; default Config.WHISPER_DECODING_PROFILE.
+    :param language: Kode bahasa Whisper (mis. 'id'); default Config.WHISPER_LANGUAGE.
+                     'auto' atau kosong berarti deteksi bahasa otomatis per file.
+    :raises ValueError: Jika nama profil tidak dikenal.
+    """
+    name = (name or Config.WHISPER_DECODING_PROFILE).lower()
+    if name not in DECODING_PROFILES:
+        raise ValueError(f"Profil decoding tidak dikenal: {name} (pilihan: {', '.join(DECODING_PROFILES)})")
+    language = (language or Config.WHISPER_LANGUAGE or '').lower()
+    profile = dict(DECODING_PROFILES[name], name=name)
+    profile['language'] = None if language in ('', 'auto') else language
+    return profile
+
+
+def profile_cache_tag(profile):
+    """Identitas profil untuk kunci cache transkripsi (nama, bahasa, dan hash semua parameter)."""
+    digest = hashlib.sha256(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    return f"{profile['name']}:{profile['language'] or 'auto'}:{digest}"
+
+
+def whisper_decode_options(profile):
+    """Argumen `transcribe()` openai-whisper untuk profil ini (di luar `task`, `verbose`, dan `fp16`)."""
+    options = {
+        'language': profile['language'],
+        'temperature': profile['temperature'],
+        'condition_on_previous_text': profile['condition_on_previous_text'],
+        'compression_ratio_threshold': profile['compression_ratio_threshold'],
+        'logprob_threshold': profile['logprob_threshold'],
+        'no_speech_threshold': profile['no_speech_threshold'],
+    }
+    # openai-whisper memakai beam_size hanya pada suhu 0 dan best_of hanya pada suhu > 0
+    if profile['beam_size']:
+        options['beam_size'] = profile['beam_size']
+    if profile['best_of'] and len(profile['temperature']) > 1:
+        options['best_of'] = profile['best_of']
+    return options
+
+
+def faster_whisper_options(profile):
+    """Argumen `WhisperModel.transcribe()` faster-whisper untuk profil ini (nama beberapa parameter berbeda)."""
+    return {
+        'language': profile['language'],
+        'beam_size': profile['beam_size'] or 1,
+        'best_of': profile['best_of'] or 1,
+        'temperature': list(profile['temperature']),
+        'condition_on_previous_text': profile['condition_on_previous_text'],
+        'compression_ratio_threshold': profile['compression_ratio_threshold'],
+        'log_prob_threshold': profile['logprob_threshold'],
+        'no_speech_threshold': profile['no_speech_threshold'],
+    }
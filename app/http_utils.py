@@ -0,0 +1,79 @@
+# app/http_utils.py
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli  # Opsional: kompresi 'br' (pip install brotli); tanpa modul ini hanya gzip
+except ImportError:
+    brotli = None
+
+
+def choose_encoding(accept_encodings):
+    """
+    Content-Encoding terbaik yang diterima klien: 'br' (jika modul brotli terpasang), 'gzip', atau None.
+
+    :param accept_encodings: `request.accept_encodings` (MIMEAccept/Accept dari werkzeug).
+    """
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_body(body, encoding, level=6):
+    """Mengompresi `body` (bytes) dengan `encoding` ('br', 'gzip', atau None = tanpa kompresi)."""
+    if encoding == 'br':
+        # Kualitas brotli 0-11; skala level gzip 1-9 dipetakan kira-kira ke kualitas yang setara
+        return brotli.compress(body, quality=min(11, level + 2))
+    if encoding == 'gzip':
+        # mtime=0 agar hasil kompresi isi yang sama selalu identik (ETag kuat tetap valid)
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return body
+
+
+def content_digest(body):
+    """Hash isi respons (belum dikompresi) untuk dasar ETag kuat."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class CompressedResponseCache:
+    """
+    Cache LRU kecil di memori untuk respons yang isinya tidak berubah (mis. hasil job yang sudah
+    selesai): isi asli dan hash-nya disimpan sekali, hasil kompresi per encoding dibuat saat
+    pertama kali diminta, sehingga halaman hasil yang dibuka ulang tidak membaca file dan
+    mengompresi ulang.
+    """
+
+    def __init__(self, max_entries=64, level=6):
+        self.max_entries = max(1, int(max_entries))
+        self.level = level
+        self._entries = OrderedDict()  # key -> {"digest": ..., None: isi asli, encoding: isi terkompresi}
+        self._lock = threading.Lock()
+
+    def get(self, key, encoding, build_body):
+        """
+        :param build_body: Fungsi tanpa argumen yang mengembalikan isi respons (bytes), atau None.
+        :return: (isi untuk `encoding`, digest isi asli), atau (None, None) jika `build_body` mengembalikan None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if encoding in entry:
+                    return entry[encoding], entry["digest"]
+        if entry is None:
+            body = build_body()
+            if body is None:
+                return None, None
+            entry = {"digest": content_digest(body), None: body}
+        encoded = compress_body(entry[None], encoding, self.level)
+        with self._lock:
+            entry[encoding] = encoded
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return encoded, entry["digest"]
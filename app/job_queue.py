@@ -0,0 +1,204 @@
+# app/job_queue.py
+import queue
+import bisect
+import itertools
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Dilempar oleh `JobScheduler.submit` saat antrean job sudah penuh."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Antrean job penuh, coba lagi dalam {retry_after} detik.")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """
+    Penjadwal job dengan antrean terbatas dan dua kelompok worker.
+
+    Setiap job melewati dua tahap:
+    1. Tahap STT (ekstraksi audio + transkripsi Whisper) dijalankan oleh `stt_workers` thread.
+    2. Tahap LLM (pembuatan MoM) dijalankan oleh `llm_workers` thread.
+
+    `stt_handler(job_id, payload)` harus mengembalikan payload untuk tahap LLM,
+    atau None jika job sudah selesai/gagal dan tidak perlu diteruskan.
+    `llm_handler(job_id, payload)` tidak perlu mengembalikan apa pun.
+    `on_queue_change(pending_job_ids)` (opsional) dipanggil setiap kali isi antrean STT berubah
+    (job masuk atau diambil worker), dengan daftar job yang menunggu sesuai urutan pengerjaan.
+
+    Urutan antrean STT ditentukan oleh `waktu masuk + shortest_first_weight * durasi audio`:
+    dengan bobot 0 antrean murni FIFO; dengan bobot > 0 file pendek yang masuk bersamaan
+    (misalnya satu batch) dikerjakan lebih dulu, tetapi file panjang tetap mendapat giliran
+    karena job yang sudah lama menunggu akhirnya berada di depan.
+    """
+
+    def __init__(self, stt_handler, llm_handler, stt_workers=1, llm_workers=2,
+                 max_queue_size=20, retry_after=30, on_queue_change=None, shortest_first_weight=0.0):
+        self.stt_handler = stt_handler
+        self.llm_handler = llm_handler
+        self.stt_workers = max(1, int(stt_workers))
+        self.llm_workers = max(1, int(llm_workers))
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.retry_after = max(1, int(retry_after))
+        self.on_queue_change = on_queue_change
+        self.shortest_first_weight = max(0.0, float(shortest_first_weight))
+
+        self._stt_queue = queue.PriorityQueue()
+        self._llm_queue = queue.Queue()
+        self._pending = []  # (kunci urutan, nomor urut, job id) yang menunggu worker STT, terurut
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._avg_stt_seconds = None  # rata-rata bergerak durasi tahap STT
+
+    def start(self):
+        """Menjalankan thread worker. Aman dipanggil lebih dari sekali."""
+        if self._threads:
+            return
+        for i in range(self.stt_workers):
+            self._spawn(self._stt_loop, f"stt-worker-{i}")
+        for i in range(self.llm_workers):
+            self._spawn(self._llm_loop, f"llm-worker-{i}")
+        logger.info(f"JobScheduler berjalan dengan {self.stt_workers} worker STT dan {self.llm_workers} worker LLM.")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # --- API Publik ---
+    def is_full(self):
+        with self._lock:
+            return len(self._pending) >= self.max_queue_size
+
+    def submit(self, job_id, payload, duration_seconds=None):
+        """
+        Memasukkan job ke antrean STT.
+
+        :param duration_seconds: Perkiraan durasi audio (untuk urutan shortest-first), opsional.
+        :return: Posisi job di antrean (dimulai dari 1).
+        :raises QueueFullError: Jika antrean sudah penuh.
+        """
+        return self.submit_many([(job_id, payload, duration_seconds)])[0]
+
+    def submit_many(self, jobs):
+        """
+        Memasukkan beberapa job sekaligus (misalnya satu batch) sebagai satu kesatuan.
+
+        Batch diterima utuh selama antrean belum penuh saat dikirim, meskipun jumlah job-nya
+        membuat antrean melewati `max_queue_size`; batch berikutnya ditolak sampai antrean turun.
+
+        :param jobs: List (job_id, payload, duration_seconds).
+        :return: List posisi setiap job di antrean, sesuai urutan `jobs`.
+        :raises QueueFullError: Jika antrean sudah penuh.
+        """
+        now = time.time()
+        entries = []
+        with self._lock:
+            if len(self._pending) >= self.max_queue_size:
+                raise QueueFullError(self._estimate_retry_after_locked())
+            for job_id, payload, duration_seconds in jobs:
+                sort_key = now + self.shortest_first_weight * (duration_seconds or 0)
+                entry = (sort_key, next(self._sequence), job_id)
+                bisect.insort(self._pending, entry)
+                entries.append(entry)
+                # Dimasukkan ke PriorityQueue di dalam lock agar urutannya sama dengan _pending
+                self._stt_queue.put((*entry, payload))
+            positions = [self._pending.index(entry) + 1 for entry in entries]
+            pending_ids = [pending_id for _, _, pending_id in self._pending]
+        for entry, position in zip(entries, positions):
+            logger.info(f"Job {entry[2]} masuk antrean STT di posisi {position}.")
+        # Job baru bisa menyalip job yang sudah menunggu, jadi posisi semua job diperbarui
+        self._notify_queue_change(pending_ids)
+        return positions
+
+    def submit_llm(self, job_id, payload):
+        """
+        Memasukkan job langsung ke antrean LLM, untuk job yang transkripsinya sudah tersedia
+        (mis. rapat langsung yang ditranskripsi selama rapat berlangsung).
+        """
+        self._llm_queue.put((job_id, payload))
+        logger.info(f"Job {job_id} masuk antrean LLM.")
+
+    def pending_count(self):
+        """Jumlah job yang sedang menunggu worker STT."""
+        with self._lock:
+            return len(self._pending)
+
+    def pending_job_ids(self):
+        """Job id yang menunggu worker STT, sesuai urutan pengerjaan."""
+        with self._lock:
+            return [job_id for _, _, job_id in self._pending]
+
+    def queue_position(self, job_id):
+        """Posisi job di antrean STT (dimulai dari 1), atau None jika tidak sedang menunggu."""
+        for position, pending_id in enumerate(self.pending_job_ids(), 1):
+            if pending_id == job_id:
+                return position
+        return None
+
+    def estimate_retry_after(self):
+        with self._lock:
+            return self._estimate_retry_after_locked()
+
+    def _estimate_retry_after_locked(self):
+        # Perkiraan waktu sampai satu slot antrean kosong, minimal `retry_after`
+        if self._avg_stt_seconds is None:
+            return self.retry_after
+        estimate = self._avg_stt_seconds / self.stt_workers
+        return max(self.retry_after, int(estimate + 0.5))
+
+    # --- Loop Worker ---
+    def _stt_loop(self):
+        while True:
+            sort_key, sequence, job_id, payload = self._stt_queue.get()
+            with self._lock:
+                entry = (sort_key, sequence, job_id)
+                index = bisect.bisect_left(self._pending, entry)
+                if index < len(self._pending) and self._pending[index] == entry:
+                    del self._pending[index]
+                still_pending = [pending_id for _, _, pending_id in self._pending]
+            self._notify_queue_change(still_pending)
+            start_time = time.time()
+            next_payload = None
+            try:
+                next_payload = self.stt_handler(job_id, payload)
+            except Exception as e:
+                logger.error(f"Tahap STT untuk job {job_id} gagal tanpa tertangani: {e}")
+                logger.exception("Traceback:")
+            finally:
+                self._record_stt_duration(time.time() - start_time)
+                self._stt_queue.task_done()
+            if next_payload is not None:
+                self._llm_queue.put((job_id, next_payload))
+
+    def _notify_queue_change(self, pending_ids):
+        if self.on_queue_change is None or not pending_ids:
+            return
+        try:
+            self.on_queue_change(pending_ids)
+        except Exception as e:
+            logger.warning(f"Callback on_queue_change gagal: {e}")
+
+    def _llm_loop(self):
+        while True:
+            job_id, payload = self._llm_queue.get()
+            try:
+                self.llm_handler(job_id, payload)
+            except Exception as e:
+                logger.error(f"Tahap LLM untuk job {job_id} gagal tanpa tertangani: {e}")
+                logger.exception("Traceback:")
+            finally:
+                self._llm_queue.task_done()
+
+    def _record_stt_duration(self, seconds):
+        with self._lock:
+            if self._avg_stt_seconds is None:
+                self._avg_stt_seconds = seconds
+            else:
+                self._avg_stt_seconds = 0.8 * self._avg_stt_seconds + 0.2 * seconds
@@ -0,0 +1,488 @@
+# app/job_store.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Status yang menandakan job sudah selesai (tidak akan berubah lagi)
+TERMINAL_STATUSES = ("completed", "error")
+
+
+class JobStore:
+    """
+    Antarmuka penyimpanan status job.
+
+    Setiap job menyimpan:
+    - `status`: dict status yang dikirim ke browser (status, message, progress, file hasil, ...)
+    - `payload`: data yang dibutuhkan untuk menjalankan ulang job (path file, model, ...)
+    - `owner`: identitas proses yang sedang mengerjakan job ("hostname:pid:id-boot"); proses pemilik
+      memperbarui lease-nya berkala (`renew_lease`), job milik proses yang lease-nya habis dipulihkan
+    - `version`: nomor yang naik setiap kali status berubah (dipakai sebagai id event SSE)
+    - checkpoint: output setiap tahap pipeline yang sudah selesai (lihat app/pipeline.py), agar job
+      yang gagal bisa dilanjutkan dari tahap terakhir; ikut terhapus bersama job-nya
+    """
+
+    # True jika store dibaca/ditulis oleh beberapa proses sekaligus (perubahan dari proses
+    # lain tidak memicu StatusNotifier lokal, jadi penonton SSE perlu memeriksa ulang berkala)
+    shared_across_processes = False
+
+    def create(self, job_id, status, payload=None, owner=None):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Dict status job, atau None jika tidak ada/kedaluwarsa."""
+        record = self.get_record(job_id)
+        return record["status"] if record else None
+
+    def get_record(self, job_id):
+        """Dict berisi status, payload, owner, version; atau None."""
+        raise NotImplementedError
+
+    def set(self, job_id, status):
+        """Mengganti seluruh status job."""
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        """Memperbarui sebagian field status job. Mengembalikan False jika job tidak ada."""
+        raise NotImplementedError
+
+    def transition(self, job_id, from_statuses, status):
+        """
+        Mengganti status job secara atomik hanya jika status saat ini ada di `from_statuses`.
+
+        :return: True jika transisi dilakukan.
+        """
+        raise NotImplementedError
+
+    def update_many(self, updates, from_statuses):
+        """
+        Memperbarui sebagian field status beberapa job dalam satu transaksi, hanya untuk job yang
+        statusnya masih di `from_statuses` dan hanya jika nilai field-nya berubah.
+
+        :param updates: Dict job_id -> dict field.
+        :return: List job id yang statusnya benar-benar diperbarui.
+        """
+        raise NotImplementedError
+
+    def claim(self, job_id, expected_owner, new_owner):
+        """Mengambil alih job secara atomik jika owner-nya masih `expected_owner`."""
+        raise NotImplementedError
+
+    def version(self, job_id):
+        record = self.get_record(job_id)
+        return record["version"] if record else None
+
+    def delete(self, job_id):
+        raise NotImplementedError
+
+    def list_by_status(self, statuses, limit=100):
+        """List (job_id, record) dengan status di `statuses`, urut dari yang paling lama."""
+        raise NotImplementedError
+
+    def evict_expired(self):
+        """Menghapus job yang sudah melewati TTL. Mengembalikan list job_id yang dihapus."""
+        raise NotImplementedError
+
+    def renew_lease(self, owner):
+        """Mencatat bahwa proses `owner` masih hidup (heartbeat)."""
+        raise NotImplementedError
+
+    def live_owners(self, lease_seconds):
+        """Set owner yang memperbarui lease-nya dalam `lease_seconds` terakhir."""
+        raise NotImplementedError
+
+    def save_checkpoint(self, job_id, stage, output):
+        """Menyimpan (atau mengganti) output tahap `stage` milik job (dict yang bisa di-JSON-kan)."""
+        raise NotImplementedError
+
+    def load_checkpoints(self, job_id):
+        """Dict nama tahap -> output untuk semua tahap job yang sudah punya checkpoint."""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """Job store di memori proses (hanya untuk satu proses; hilang saat restart)."""
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._records = {}
+        self._checkpoints = {}  # job_id -> {stage: output}
+        self._leases = {}  # owner -> waktu heartbeat terakhir
+
+    def _touch(self, record):
+        record["version"] += 1
+        record["updated_at"] = time.time()
+        record["expires_at"] = record["updated_at"] + self.ttl_seconds
+
+    def _live_record_locked(self, job_id):
+        record = self._records.get(job_id)
+        if record and record["expires_at"] < time.time():
+            del self._records[job_id]
+            self._checkpoints.pop(job_id, None)
+            return None
+        return record
+
+    def create(self, job_id, status, payload=None, owner=None):
+        with self._lock:
+            now = time.time()
+            self._records[job_id] = {
+                "status": dict(status), "payload": payload, "owner": owner, "version": 1,
+                "created_at": now, "updated_at": now, "expires_at": now + self.ttl_seconds
+            }
+
+    def get_record(self, job_id):
+        with self._lock:
+            record = self._live_record_locked(job_id)
+            if record is None:
+                return None
+            return dict(record, status=dict(record["status"]))
+
+    def set(self, job_id, status):
+        with self._lock:
+            record = self._live_record_locked(job_id)
+            if record is None:
+                now = time.time()
+                record = self._records[job_id] = {
+                    "status": {}, "payload": None, "owner": None, "version": 0,
+                    "created_at": now, "updated_at": now, "expires_at": now
+                }
+            record["status"] = dict(status)
+            self._touch(record)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            record = self._live_record_locked(job_id)
+            if record is None:
+                return False
+            record["status"] = dict(record["status"], **fields)
+            self._touch(record)
+            return True
+
+    def transition(self, job_id, from_statuses, status):
+        with self._lock:
+            record = self._live_record_locked(job_id)
+            if record is None or record["status"].get("status") not in from_statuses:
+                return False
+            record["status"] = dict(status)
+            self._touch(record)
+            return True
+
+    def update_many(self, updates, from_statuses):
+        changed = []
+        with self._lock:
+            for job_id, fields in updates.items():
+                record = self._live_record_locked(job_id)
+                if record is None or record["status"].get("status") not in from_statuses:
+                    continue
+                if all(record["status"].get(key) == value for key, value in fields.items()):
+                    continue
+                record["status"] = dict(record["status"], **fields)
+                self._touch(record)
+                changed.append(job_id)
+        return changed
+
+    def claim(self, job_id, expected_owner, new_owner):
+        with self._lock:
+            record = self._live_record_locked(job_id)
+            if record is None or record["owner"] != expected_owner:
+                return False
+            record["owner"] = new_owner
+            return True
+
+    def delete(self, job_id):
+        with self._lock:
+            self._records.pop(job_id, None)
+            self._checkpoints.pop(job_id, None)
+
+    def list_by_status(self, statuses, limit=100):
+        with self._lock:
+            matches = [
+                (job_id, dict(record, status=dict(record["status"])))
+                for job_id, record in self._records.items()
+                if record["status"].get("status") in statuses
+            ]
+        matches.sort(key=lambda item: item[1]["created_at"])
+        return matches[:limit]
+
+    def evict_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, record in self._records.items() if record["expires_at"] < now]
+            for job_id in expired:
+                del self._records[job_id]
+                self._checkpoints.pop(job_id, None)
+            for owner in [owner for owner, heartbeat_at in self._leases.items() if heartbeat_at < now - self.ttl_seconds]:
+                del self._leases[owner]
+        return expired
+
+    def renew_lease(self, owner):
+        with self._lock:
+            self._leases[owner] = time.time()
+
+    def live_owners(self, lease_seconds):
+        cutoff = time.time() - lease_seconds
+        with self._lock:
+            return {owner for owner, heartbeat_at in self._leases.items() if heartbeat_at >= cutoff}
+
+    def save_checkpoint(self, job_id, stage, output):
+        # Disalin lewat JSON agar sama dengan SQLite (output yang disimpan tidak ikut berubah)
+        data = json.loads(json.dumps(output, ensure_ascii=False))
+        with self._lock:
+            self._checkpoints.setdefault(job_id, {})[stage] = data
+
+    def load_checkpoints(self, job_id):
+        with self._lock:
+            if self._live_record_locked(job_id) is None:
+                return {}
+            return json.loads(json.dumps(self._checkpoints.get(job_id, {}), ensure_ascii=False))
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store berbasis SQLite dalam mode WAL.
+
+    Bisa dipakai bersama oleh beberapa proses (misalnya worker gunicorn) di host yang sama,
+    dan isinya bertahan setelah server dimulai ulang. Setiap thread memakai koneksinya sendiri.
+    """
+
+    shared_across_processes = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id     TEXT PRIMARY KEY,
+            status     TEXT NOT NULL,
+            data       TEXT NOT NULL,
+            payload    TEXT,
+            owner      TEXT,
+            version    INTEGER NOT NULL DEFAULT 1,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_expires_at ON jobs (expires_at);
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            job_id     TEXT NOT NULL,
+            stage      TEXT NOT NULL,
+            data       TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (job_id, stage)
+        );
+        CREATE TABLE IF NOT EXISTS owners (
+            owner        TEXT PRIMARY KEY,
+            heartbeat_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self._SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit; transaksi baca-ubah-tulis memakai BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        """Menjalankan `fn(conn)` di dalam transaksi tulis (BEGIN IMMEDIATE) yang atomik."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _to_record(row):
+        return {
+            "status": json.loads(row["data"]),
+            "payload": json.loads(row["payload"]) if row["payload"] else None,
+            "owner": row["owner"],
+            "version": row["version"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "expires_at": row["expires_at"],
+        }
+
+    def _select_live(self, conn, job_id):
+        return conn.execute(
+            "SELECT * FROM jobs WHERE job_id = ? AND expires_at >= ?", (job_id, time.time())
+        ).fetchone()
+
+    def _write_status(self, conn, job_id, status):
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = ?, data = ?, version = version + 1, updated_at = ?, expires_at = ? WHERE job_id = ?",
+            (status.get("status", ""), json.dumps(status, ensure_ascii=False), now, now + self.ttl_seconds, job_id)
+        )
+
+    def create(self, job_id, status, payload=None, owner=None):
+        now = time.time()
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, status, data, payload, owner, version, created_at, updated_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)",
+            (job_id, status.get("status", ""), json.dumps(status, ensure_ascii=False),
+             json.dumps(payload, ensure_ascii=False) if payload is not None else None,
+             owner, now, now, now + self.ttl_seconds)
+        ))
+
+    def get_record(self, job_id):
+        row = self._select_live(self._connection(), job_id)
+        return self._to_record(row) if row else None
+
+    def version(self, job_id):
+        row = self._connection().execute(
+            "SELECT version FROM jobs WHERE job_id = ? AND expires_at >= ?", (job_id, time.time())
+        ).fetchone()
+        return row["version"] if row else None
+
+    def set(self, job_id, status):
+        def fn(conn):
+            if self._select_live(conn, job_id) is None:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO jobs (job_id, status, data, version, created_at, updated_at, expires_at) "
+                    "VALUES (?, '', '{}', 0, ?, ?, ?)", (job_id, now, now, now)
+                )
+            self._write_status(conn, job_id, status)
+        self._write(fn)
+
+    def update(self, job_id, **fields):
+        def fn(conn):
+            row = self._select_live(conn, job_id)
+            if row is None:
+                return False
+            self._write_status(conn, job_id, dict(json.loads(row["data"]), **fields))
+            return True
+        return self._write(fn)
+
+    def transition(self, job_id, from_statuses, status):
+        def fn(conn):
+            row = self._select_live(conn, job_id)
+            if row is None or row["status"] not in from_statuses:
+                return False
+            self._write_status(conn, job_id, status)
+            return True
+        return self._write(fn)
+
+    def update_many(self, updates, from_statuses):
+        if not updates:
+            return []
+
+        def fn(conn):
+            changed = []
+            placeholders = ",".join("?" for _ in updates)
+            rows = conn.execute(
+                f"SELECT job_id, status, data FROM jobs WHERE job_id IN ({placeholders}) AND expires_at >= ?",
+                (*updates, time.time())
+            ).fetchall()
+            for row in rows:
+                if row["status"] not in from_statuses:
+                    continue
+                status = json.loads(row["data"])
+                fields = updates[row["job_id"]]
+                if all(status.get(key) == value for key, value in fields.items()):
+                    continue
+                self._write_status(conn, row["job_id"], dict(status, **fields))
+                changed.append(row["job_id"])
+            return changed
+        return self._write(fn)
+
+    def claim(self, job_id, expected_owner, new_owner):
+        def fn(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET owner = ? WHERE job_id = ? AND owner IS ?", (new_owner, job_id, expected_owner)
+            )
+            return cursor.rowcount == 1
+        return self._write(fn)
+
+    def delete(self, job_id):
+        def fn(conn):
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+        self._write(fn)
+
+    def list_by_status(self, statuses, limit=100):
+        placeholders = ",".join("?" for _ in statuses)
+        rows = self._connection().execute(
+            f"SELECT * FROM jobs WHERE status IN ({placeholders}) AND expires_at >= ? ORDER BY created_at LIMIT ?",
+            (*statuses, time.time(), limit)
+        ).fetchall()
+        return [(row["job_id"], self._to_record(row)) for row in rows]
+
+    def evict_expired(self):
+        def fn(conn):
+            now = time.time()
+            expired = [row["job_id"] for row in conn.execute("SELECT job_id FROM jobs WHERE expires_at < ?", (now,))]
+            conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+            conn.execute("DELETE FROM checkpoints WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+            conn.execute("DELETE FROM owners WHERE heartbeat_at < ?", (now - self.ttl_seconds,))
+            return expired
+        return self._write(fn)
+
+    def renew_lease(self, owner):
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO owners (owner, heartbeat_at) VALUES (?, ?)", (owner, time.time())
+        ))
+
+    def live_owners(self, lease_seconds):
+        rows = self._connection().execute(
+            "SELECT owner FROM owners WHERE heartbeat_at >= ?", (time.time() - lease_seconds,)
+        ).fetchall()
+        return {row["owner"] for row in rows}
+
+    def save_checkpoint(self, job_id, stage, output):
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (job_id, stage, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, stage, json.dumps(output, ensure_ascii=False), time.time())
+        ))
+
+    def load_checkpoints(self, job_id):
+        conn = self._connection()
+        if self._select_live(conn, job_id) is None:
+            return {}
+        rows = conn.execute("SELECT stage, data FROM checkpoints WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["stage"]: json.loads(row["data"]) for row in rows}
+
+
+def create_job_store(config):
+    """
+    Membuat job store sesuai konfigurasi (`JOB_STORE_BACKEND`: 'sqlite' atau 'memory').
+
+    :param config: Mapping konfigurasi (misalnya `app.config`).
+    """
+    backend = (config.get('JOB_STORE_BACKEND') or 'sqlite').lower()
+    ttl_seconds = config.get('JOB_TTL_SECONDS') or 7 * 24 * 3600
+    if backend == 'memory':
+        logger.info("Menggunakan job store di memori.")
+        return MemoryJobStore(ttl_seconds)
+    if backend == 'sqlite':
+        # Bukan di UPLOAD_FOLDER: checkpoint berisi transkripsi dan MoM semua job
+        path = config.get('JOB_STORE_PATH') or os.path.join(config.get('DATA_FOLDER', 'instance'), 'jobs.sqlite3')
+        legacy_path = os.path.join(config.get('UPLOAD_FOLDER', 'uploads'), 'jobs.sqlite3')
+        if not config.get('JOB_STORE_PATH') and os.path.exists(legacy_path) and not os.path.exists(path):
+            logger.warning(f"Job store lama ditemukan di {legacy_path} dan tidak dipakai lagi; "
+                           f"pindahkan ke {path} (atau atur JOB_STORE_PATH) untuk melanjutkan job lama.")
+        logger.info(f"Menggunakan job store SQLite di: {path}")
+        return SQLiteJobStore(path, ttl_seconds)
+    raise ValueError(f"JOB_STORE_BACKEND tidak dikenal: {backend}")
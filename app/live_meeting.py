@@ -0,0 +1,364 @@
+# app/live_meeting.py
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE, StreamDecoder
+from app.stt_backends import get_stt_backend
+from app.decoding_profiles import resolve_decoding_profile
+from app.byteplus_mom_utils import estimate_tokens, extract_partial_mom
+from app.metrics import WHISPER_SECONDS, WHISPER_RTF
+
+logger = logging.getLogger(__name__)
+
+# Sisa audio di akhir rapat yang lebih pendek dari ini tidak ditranskripsi (Whisper cenderung berhalusinasi)
+_MIN_FINAL_SECONDS = 0.5
+
+
+class LiveSessionError(Exception):
+    """Error pada sesi rapat langsung, dengan kode HTTP yang sesuai untuk route."""
+
+    def __init__(self, message, http_status=400):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+class LiveMeetingSession:
+    """
+    Satu rapat yang sedang berlangsung: audio masuk bertahap, transkripsi bergulir keluar.
+
+    Audio ditranskripsi dengan jendela geser: setiap `step_seconds` audio baru, isi buffer (paling
+    banyak `window_seconds`) ditranskripsi ulang dengan model Whisper yang sudah dimuat. Segmen yang
+    berakhir sebelum `unstable_tail_seconds` terakhir dianggap final, dicatat dengan waktu absolut
+    sejak awal rapat, lalu audionya dibuang dari buffer; segmen sisanya hanya ditampilkan sebagai
+    teks sementara dan ditranskripsi ulang bersama audio berikutnya.
+
+    Setiap kali teks final yang belum diekstrak mencapai `chunk_tokens`, bagian itu diekstrak menjadi
+    MoM parsial di latar belakang (tahap map), sehingga saat rapat selesai tinggal tahap reduce.
+
+    `on_change()` dipanggil setiap kali ada segmen final, teks sementara, atau MoM parsial baru.
+    """
+
+    def __init__(self, session_id, model_name, audio_format='pcm_s16le', window_seconds=30, step_seconds=5,
+                 unstable_tail_seconds=5, chunk_tokens=4000, on_change=None, backend=None, decoding_profile=None):
+        self.session_id = session_id
+        self.model_name = model_name
+        self.audio_format = audio_format
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.step_samples = int(step_seconds * SAMPLE_RATE)
+        # Ekor yang belum stabil harus lebih pendek dari jendela, jika tidak tidak ada segmen yang final
+        self.unstable_tail_seconds = min(unstable_tail_seconds, window_seconds / 2)
+        self.chunk_tokens = chunk_tokens
+        self.on_change = on_change
+        self.backend = get_stt_backend(backend)
+        self.decoding = resolve_decoding_profile(decoding_profile)
+
+        self.created_at = time.time()
+        self.last_activity = time.monotonic()
+        self.status = "live"  # live -> finishing -> finished / error
+        self.error = None
+        self.segments = []  # (start, end, text) final, waktu absolut dalam detik
+        self.tentative_text = ""
+
+        self._lock = threading.Lock()
+        self._audio_ready = threading.Condition(self._lock)
+        self._buffer = np.zeros(0, np.float32)
+        self._buffer_start = 0.0  # waktu absolut (detik) sampel pertama di buffer
+        self._received_samples = 0
+        self._new_samples = 0  # sampel yang masuk sejak transkripsi terakhir
+        self._closing = False
+        self._pending_lines = []  # baris transkripsi final yang belum diekstrak menjadi MoM parsial
+        self._mom_futures = []
+        # Satu worker: MoM parsial diekstrak berurutan dan urutannya sama dengan urutan bagian rapat
+        self._mom_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"live-mom-{session_id[:8]}")
+        self._decoder = StreamDecoder(self._on_audio, audio_format)
+        self._thread = None
+
+    # --- API Publik ---
+    def start(self):
+        """Menjalankan dekoder dan thread transkripsi. Mengembalikan self."""
+        self._decoder.start()
+        self._thread = threading.Thread(target=self._transcribe_loop, name=f"live-stt-{self.session_id[:8]}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def feed(self, data):
+        """
+        Menambahkan potongan audio berikutnya (format sesuai `audio_format`).
+
+        :raises LiveSessionError: Jika sesi tidak lagi menerima audio (409) atau audio tidak bisa didekode (400).
+        """
+        if self.status != "live":
+            raise LiveSessionError(f"Sesi rapat langsung sudah {self.status}.", http_status=409)
+        self.last_activity = time.monotonic()
+        try:
+            self._decoder.write(data)
+        except RuntimeError as e:
+            raise LiveSessionError(str(e)) from e
+
+    def snapshot(self, segments_from=0):
+        """State sesi untuk SSE: segmen final mulai indeks `segments_from`, teks sementara, dan progres."""
+        with self._lock:
+            done_parts = sum(1 for future in self._mom_futures if future.done())
+            return {
+                "session_id": self.session_id,
+                "status": self.status,
+                "error": self.error,
+                "duration_seconds": self.duration_seconds(),
+                "segments_total": len(self.segments),
+                "segments_from": segments_from,
+                "segments": [{"start": round(start, 2), "end": round(end, 2), "text": text}
+                             for start, end, text in self.segments[segments_from:]],
+                "tentative_text": self.tentative_text,
+                "partial_sections": done_parts,
+                "partial_sections_pending": len(self._mom_futures) - done_parts
+            }
+
+    def finish(self):
+        """
+        Menutup input audio, mentranskripsi sisa buffer, dan menunggu semua MoM parsial selesai.
+
+        Dijalankan di thread latar belakang (bisa memakan waktu satu jendela transkripsi
+        ditambah ekstraksi MoM parsial yang masih berjalan).
+
+        :return: Dict `transcription_text`, `partial_moms` (None jika ada ekstraksi yang gagal,
+                 sehingga MoM dibuat ulang dari transkripsi lengkap), `tail_text` (transkripsi
+                 yang belum diekstrak), dan `duration_seconds`.
+        :raises LiveSessionError: Jika sesi sudah ditutup sebelumnya.
+        """
+        with self._lock:
+            if self.status != "live":
+                raise LiveSessionError(f"Sesi rapat langsung sudah {self.status}.", http_status=409)
+            self.status = "finishing"
+        self._notify()
+
+        self._decoder.close()
+        with self._lock:
+            self._closing = True
+            self._audio_ready.notify_all()
+        self._thread.join()
+
+        partial_moms = [future.result() for future in self._mom_futures]
+        self._mom_executor.shutdown(wait=False)
+        if any(not isinstance(partial, dict) or "error" in partial for partial in partial_moms):
+            logger.warning(f"Sesi {self.session_id}: sebagian MoM parsial gagal, MoM dibuat dari transkripsi lengkap.")
+            partial_moms = None
+
+        with self._lock:
+            if self.status == "finishing":
+                self.status = "finished"
+            self.tentative_text = ""
+            self.last_activity = time.monotonic()
+            transcription_text = "".join(self._format_line(*segment) for segment in self.segments)
+            tail_text = "".join(self._pending_lines)
+        self._notify()
+        return {
+            "transcription_text": transcription_text,
+            "partial_moms": partial_moms,
+            "tail_text": tail_text,
+            "duration_seconds": self.duration_seconds()
+        }
+
+    def abort(self):
+        """Membatalkan sesi tanpa membuat MoM (sesi ditinggalkan atau dihapus)."""
+        with self._lock:
+            self.status = "aborted"
+            self._closing = True
+            self._buffer = np.zeros(0, np.float32)
+            self._audio_ready.notify_all()
+        self._decoder.abort()
+        self._mom_executor.shutdown(wait=False, cancel_futures=True)
+        self._notify()
+
+    def duration_seconds(self):
+        """Durasi audio yang sudah diterima (detik)."""
+        return round(self._received_samples / SAMPLE_RATE, 2)
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_activity
+
+    # --- Transkripsi jendela geser ---
+    def _on_audio(self, audio):
+        with self._lock:
+            if self.status == "aborted":
+                return
+            self._buffer = np.concatenate((self._buffer, audio))
+            self._received_samples += len(audio)
+            self._new_samples += len(audio)
+            self._audio_ready.notify_all()
+
+    def _transcribe_loop(self):
+        try:
+            while True:
+                with self._lock:
+                    self._audio_ready.wait_for(lambda: self._closing or self._new_samples >= self.step_samples
+                                               or len(self._buffer) > self.window_samples)
+                    if self.status == "aborted":
+                        return
+                    # Buffer yang lebih panjang dari jendela (transkripsi tertinggal) diproses per jendela;
+                    # hanya jendela terakhir saat rapat ditutup yang semua segmennya langsung final
+                    final = self._closing and len(self._buffer) <= self.window_samples
+                    audio = self._buffer[:self.window_samples]
+                    buffer_start = self._buffer_start
+                    self._new_samples = 0
+                if final and len(audio) < _MIN_FINAL_SECONDS * SAMPLE_RATE:
+                    return
+                self._transcribe_window(audio, buffer_start, final)
+        except Exception as e:
+            logger.error(f"Transkripsi sesi rapat langsung {self.session_id} gagal: {e}")
+            logger.exception("Traceback:")
+            with self._lock:
+                self.status = "error"
+                self.error = f"Transkripsi gagal: {e}"
+        finally:
+            self._notify()
+
+    def _transcribe_window(self, audio, buffer_start, final):
+        audio_seconds = len(audio) / SAMPLE_RATE
+        transcribe_start = time.time()
+        result = self.backend.transcribe(audio, self.model_name, decoding=self.decoding)
+        transcribe_seconds = time.time() - transcribe_start
+        WHISPER_SECONDS.observe(transcribe_seconds, model=self.model_name, backend=self.backend.name)
+        WHISPER_RTF.observe(transcribe_seconds / audio_seconds, model=self.model_name, backend=self.backend.name)
+
+        segments = [(segment.get("start", 0), min(segment.get("end", 0), audio_seconds), segment.get("text", "").strip())
+                    for segment in result.get("segments") or []]
+        window_full = len(audio) >= self.window_samples
+        if final:
+            final_count = len(segments)
+        else:
+            stable_until = audio_seconds - self.unstable_tail_seconds
+            final_count = 0
+            while final_count < len(segments) and segments[final_count][1] <= stable_until:
+                final_count += 1
+            if final_count == 0 and window_full:
+                # Tidak ada jeda yang cukup panjang dalam satu jendela penuh: segmen terakhir saja yang ditunda
+                final_count = max(1, len(segments) - 1) if segments else 0
+
+        if final_count:
+            cut_seconds = segments[final_count - 1][1]
+        elif not segments:
+            # Hening: audio di luar ekor yang belum stabil tidak perlu ditranskripsi ulang
+            cut_seconds = audio_seconds if final else max(0.0, audio_seconds - self.unstable_tail_seconds)
+        else:
+            cut_seconds = 0.0
+        cut_samples = min(len(audio), int(cut_seconds * SAMPLE_RATE))
+
+        with self._lock:
+            if self.status == "aborted":
+                return
+            for start, end, text in segments[:final_count]:
+                if text:
+                    segment = (buffer_start + start, buffer_start + end, text)
+                    self.segments.append(segment)
+                    self._pending_lines.append(self._format_line(*segment))
+            self.tentative_text = " ".join(text for _, _, text in segments[final_count:] if text)
+            self._buffer = self._buffer[cut_samples:]
+            self._buffer_start = buffer_start + cut_samples / SAMPLE_RATE
+            if final and cut_samples == 0:
+                # Tidak ada kemajuan di akhir rapat; sisa buffer dibuang agar loop berhenti
+                self._buffer = np.zeros(0, np.float32)
+            self._submit_partial_mom_locked()
+        self._notify()
+
+    @staticmethod
+    def _format_line(start, end, text):
+        # Format yang sama dengan transkripsi file upload ([mulai - selesai] teks)
+        return f"[{start:.2f} - {end:.2f}] {text}\n"
+
+    def _submit_partial_mom_locked(self):
+        pending_text = "".join(self._pending_lines)
+        if not pending_text or estimate_tokens(pending_text) < self.chunk_tokens:
+            return
+        self._pending_lines = []
+        part_number = len(self._mom_futures) + 1
+        logger.info(f"Sesi {self.session_id}: mengekstrak MoM parsial bagian {part_number} di latar belakang.")
+        future = self._mom_executor.submit(extract_partial_mom, pending_text, part_number)
+        future.add_done_callback(lambda _: self._notify())
+        self._mom_futures.append(future)
+
+    def _notify(self):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.warning(f"Callback on_change sesi {self.session_id} gagal: {e}")
+
+
+class LiveSessionManager:
+    """Sesi rapat langsung yang aktif di proses ini, dengan batas jumlah sesi dan batas waktu idle."""
+
+    def __init__(self, max_sessions=4, idle_timeout_seconds=300, **session_options):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.session_options = session_options
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, model_name, audio_format='pcm_s16le', on_change=None, decoding_profile=None):
+        """
+        Membuat dan menjalankan sesi baru.
+
+        :param on_change: Callback `on_change(session_id)` untuk setiap perubahan sesi.
+        :raises LiveSessionError: Jika jumlah sesi aktif sudah mencapai batas (503).
+        """
+        session_id = str(uuid.uuid4())
+        with self._lock:
+            active = sum(1 for session in self._sessions.values() if session.status in ("live", "finishing"))
+            if active >= self.max_sessions:
+                raise LiveSessionError("Jumlah rapat langsung yang berjalan sudah maksimum, coba lagi nanti.",
+                                       http_status=503)
+            session = LiveMeetingSession(
+                session_id, model_name, audio_format=audio_format,
+                on_change=(lambda: on_change(session_id)) if on_change else None,
+                decoding_profile=decoding_profile,
+                **self.session_options
+            )
+            self._sessions[session_id] = session
+        try:
+            session.start()
+        except RuntimeError as e:
+            self.remove(session_id)
+            raise LiveSessionError(str(e), http_status=500) from e
+        return session
+
+    def get(self, session_id):
+        """
+        :raises LiveSessionError: Jika sesi tidak ada di proses ini (404).
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise LiveSessionError("Sesi rapat langsung tidak ditemukan atau sudah kedaluwarsa.", http_status=404)
+        return session
+
+    def remove(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        """
+        Membatalkan sesi yang tidak menerima audio selama `idle_timeout_seconds`, dan menghapus sesi
+        yang sudah selesai sejak lebih lama dari itu.
+
+        :return: List session_id yang dihapus.
+        """
+        with self._lock:
+            stale = [(session_id, session) for session_id, session in self._sessions.items()
+                     if session.status != "finishing" and session.idle_seconds() > self.idle_timeout_seconds]
+            for session_id, _ in stale:
+                del self._sessions[session_id]
+        for _, session in stale:
+            if session.status == "live":
+                session.abort()
+        return [session_id for session_id, _ in stale]
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for session in self._sessions.values() if session.status in ("live", "finishing"))
@@ -0,0 +1,194 @@
+# app/metrics.py
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# Metrik dalam format teks Prometheus, tanpa dependensi tambahan.
+# Nilai disimpan per proses; jika server dijalankan dengan beberapa worker, setiap worker
+# melaporkan metriknya sendiri (scrape setiap worker atau gunakan satu proses).
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Label untuk metrik {self.name} harus {self.labelnames}, bukan {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return "\n".join(lines)
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    """Nilai yang hanya bisa naik (jumlah job, token, byte, ...)."""
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counter tidak boleh turun.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Nilai sesaat yang bisa naik dan turun (panjang antrean, jumlah model dimuat, ...)."""
+
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribusi nilai pengamatan (durasi, real-time factor, ...) dalam bucket kumulatif."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager yang mencatat durasi blok kode (detik) ke histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Kumpulan metrik yang dirender bersama oleh endpoint /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik {metric.name} sudah terdaftar.")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Content-Type standar untuk format teks Prometheus
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Metrik pipeline ---
+JOBS_TOTAL = Counter(
+    "mom_jobs_total", "Jumlah job yang selesai, per status akhir (completed/error).", ["status"])
+QUEUE_DEPTH = Gauge(
+    "mom_job_queue_depth", "Jumlah job yang sedang menunggu worker STT.")
+QUEUE_WAIT_SECONDS = Histogram(
+    "mom_job_queue_wait_seconds", "Lama job menunggu di antrean sebelum diambil worker.", ["stage"])
+STAGE_SECONDS = Histogram(
+    "mom_stage_duration_seconds", "Durasi setiap tahap job (stt, llm).", ["stage"])
+PIPELINE_STAGE_SECONDS = Histogram(
+    "mom_pipeline_stage_duration_seconds", "Durasi setiap tahap pipeline (decode, transcribe, prompt, llm, render).",
+    ["stage"])
+FFMPEG_DECODE_SECONDS = Histogram(
+    "mom_ffmpeg_decode_seconds", "Durasi dekode audio/video dengan ffmpeg.")
+WHISPER_SECONDS = Histogram(
+    "mom_whisper_transcribe_seconds", "Durasi transkripsi Whisper (tanpa dekode).", ["model", "backend"])
+STT_SILENCE_SKIPPED_SECONDS_TOTAL = Counter(
+    "mom_stt_silence_skipped_seconds_total", "Detik audio hening yang dibuang pre-pass VAD sebelum Whisper.")
+WHISPER_RTF = Histogram(
+    "mom_whisper_real_time_factor", "Real-time factor Whisper (waktu transkripsi / durasi audio).", ["model", "backend"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4))
+LLM_REQUEST_SECONDS = Histogram(
+    "mom_llm_request_duration_seconds", "Latensi satu permintaan ke BytePlus LLM.", ["mode"])
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "mom_llm_time_to_first_token_seconds", "Waktu sampai token pertama pada permintaan streaming.")
+LLM_TOKENS_TOTAL = Counter(
+    "mom_llm_tokens_total", "Jumlah token yang dikirim (prompt) dan diterima (completion) dari BytePlus.", ["kind"])
+LLM_PROMPT_TOKENS_SAVED_TOTAL = Counter(
+    "mom_llm_prompt_tokens_saved_total", "Perkiraan token transkripsi yang dihemat oleh encoding prompt ringkas.")
+MOM_JSON_REPAIRS_TOTAL = Counter(
+    "mom_llm_json_repairs_total",
+    "Hasil parsing JSON MoM dari LLM (valid/repaired_local/repaired_followup/failed).", ["outcome"])
+LLM_RETRIES_TOTAL = Counter(
+    "mom_llm_retries_total", "Jumlah percobaan ulang permintaan BytePlus karena error sementara.", ["error"])
+BYTES_WRITTEN_TOTAL = Counter(
+    "mom_upload_bytes_written_total", "Jumlah byte yang ditulis ke folder upload, per jenis file.", ["kind"])
+ARTIFACT_BYTES = Gauge(
+    "mom_artifact_bytes", "Total ukuran artefak di folder upload (media, transkripsi, MoM).")
+ARTIFACTS_EVICTED_TOTAL = Counter(
+    "mom_artifacts_evicted_total", "Jumlah artefak yang dihapus, per jenis dan alasan (expired/quota).", ["kind", "reason"])
+LIVE_SESSIONS = Gauge(
+    "mom_live_sessions", "Jumlah rapat langsung yang sedang ditranskripsi.")
@@ -0,0 +1,168 @@
+# app/model_registry.py
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Perkiraan ukuran bobot model Whisper (MB, fp32) sebelum model benar-benar dimuat
+ESTIMATED_MODEL_SIZE_MB = {
+    'tiny': 75, 'tiny.en': 75,
+    'base': 145, 'base.en': 145,
+    'small': 485, 'small.en': 485,
+    'medium': 1530, 'medium.en': 1530,
+    'turbo': 1620,
+    'large': 3090, 'large-v1': 3090, 'large-v2': 3090, 'large-v3': 3090,
+}
+
+
+def detect_device():
+    """Mendeteksi perangkat terbaik yang tersedia: 'cuda', 'mps', atau 'cpu'."""
+    import torch
+    if torch.cuda.is_available():
+        print(f"GPU CUDA terdeteksi: {torch.cuda.get_device_name(0)}")
+        return "cuda"
+    if torch.backends.mps.is_available(): # Untuk Mac dengan chip Apple Silicon
+        print("MPS (Metal Performance Shaders) terdeteksi.")
+        return "mps"
+    print("Tidak ada GPU yang terdeteksi, menggunakan CPU.")
+    return "cpu"
+
+
+def load_whisper_model(model_name, device, quantize=False):
+    """
+    Memuat model Whisper PyTorch.
+
+    :param quantize: Jika True (hanya CPU), lapisan Linear dikuantisasi dinamis ke int8 dengan
+                     `torch.quantization.quantize_dynamic`: bobot 4x lebih kecil dan inferensi CPU lebih cepat.
+    """
+    import whisper
+    print(f"Memuat model Whisper '{model_name}' ke perangkat '{device}'{' (int8)' if quantize else ''}...")
+    start_time = time.time()
+    model = whisper.load_model(model_name, device=device)
+    if quantize:
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    print(f"Model Whisper '{model_name}' berhasil dimuat di '{device}' dalam {time.time() - start_time:.2f} detik.")
+    return model
+
+
+def _model_size_mb(model):
+    total_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    total_bytes += sum(b.numel() * b.element_size() for b in model.buffers())
+    return total_bytes / (1024 * 1024)
+
+
+class ModelRegistry:
+    """
+    Registry model Whisper yang dimuat secara lazy.
+
+    Model baru dimuat saat pertama kali diminta (atau lewat `warm_up`), lalu disimpan
+    di memori. Beberapa ukuran model bisa aktif sekaligus selama total ukurannya
+    masih di bawah `memory_budget_mb`; jika terlampaui, model yang paling lama
+    tidak dipakai dilepas (LRU).
+    """
+
+    def __init__(self, memory_budget_mb, device=None, loader=None, size_of=None, size_factor=1.0):
+        """
+        :param loader: Fungsi `loader(model_name, device)` yang memuat model; default Whisper PyTorch.
+        :param size_of: Fungsi `size_of(model_name, model)` -> ukuran MB; default dihitung dari parameter torch.
+        :param size_factor: Pengali ESTIMATED_MODEL_SIZE_MB sebelum model dimuat (mis. 0.25 untuk int8).
+        """
+        self.memory_budget_mb = memory_budget_mb
+        self._device = device
+        self._loader = loader or load_whisper_model
+        self._size_of = size_of or (lambda model_name, model: _model_size_mb(model))
+        self._size_factor = size_factor
+        self._models = OrderedDict()  # nama -> (model, ukuran_mb), urutan dari yang paling lama dipakai
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._inference_locks = {}
+
+    @property
+    def device(self):
+        if self._device is None:
+            self._device = detect_device()
+        return self._device
+
+    def get(self, model_name):
+        """Mengembalikan model Whisper `model_name`, memuatnya terlebih dahulu jika belum ada."""
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                return self._models[model_name][0]
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        # Satu lock per model agar permintaan paralel untuk model yang sama hanya memuat sekali
+        with load_lock:
+            with self._lock:
+                if model_name in self._models:
+                    self._models.move_to_end(model_name)
+                    return self._models[model_name][0]
+                self._evict_locked(ESTIMATED_MODEL_SIZE_MB.get(model_name, 0) * self._size_factor)
+
+            model = self._loader(model_name, self.device)
+            size_mb = self._size_of(model_name, model)
+
+            with self._lock:
+                self._models[model_name] = (model, size_mb)
+                self._evict_locked(0, keep=model_name)
+            return model
+
+    def inference_lock(self, model_name):
+        """
+        Lock yang harus dipegang selama satu panggilan inferensi dengan model `model_name`.
+
+        openai-whisper tidak aman dipakai paralel pada objek model yang sama: `transcribe()` memasang
+        forward hook kv-cache di modul model, sehingga dua decode bersamaan (worker STT, sesi live,
+        runner Streamlit) saling merusak cache dan hasilnya.
+        """
+        with self._lock:
+            return self._inference_locks.setdefault(model_name, threading.Lock())
+
+    def _evict_locked(self, incoming_mb, keep=None):
+        used_mb = sum(size for _, size in self._models.values())
+        for name in list(self._models):
+            if used_mb + incoming_mb <= self.memory_budget_mb:
+                break
+            if name == keep:
+                continue
+            _, size_mb = self._models.pop(name)
+            used_mb -= size_mb
+            logger.info(f"Model Whisper '{name}' dilepas dari memori ({size_mb:.0f} MB) karena melebihi budget.")
+
+    def warm_up(self, model_names):
+        """Memuat daftar model terlebih dahulu agar job pertama tidak menunggu proses loading."""
+        for model_name in model_names:
+            try:
+                self.get(model_name)
+            except Exception as e:
+                logger.error(f"Gagal memuat model Whisper '{model_name}' saat warm-up: {e}")
+
+    def loaded_models(self):
+        """Daftar model yang sedang ada di memori beserta perkiraan ukurannya (MB)."""
+        with self._lock:
+            return [{"name": name, "size_mb": round(size, 1)} for name, (_, size) in self._models.items()]
+
+
+# --- Registry bersama per perangkat (dibuat saat pertama kali dibutuhkan) ---
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(device=None, kind="torch", **registry_kwargs):
+    """
+    Mengembalikan registry model bersama.
+
+    :param device: Paksa perangkat tertentu (mis. 'cpu'); None berarti deteksi otomatis.
+    :param kind: Jenis model di registry (satu registry per jenis dan perangkat), mis. 'torch' atau 'torch-int8'.
+    :param registry_kwargs: Diteruskan ke ModelRegistry saat registry pertama kali dibuat (loader, size_of, ...).
+    """
+    key = (kind, device)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = ModelRegistry(Config.WHISPER_MODEL_MEMORY_BUDGET_MB, device=device, **registry_kwargs)
+        return _registries[key]
@@ -0,0 +1,310 @@
+# app/mom_json_utils.py
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\r\n'
+
+
+def _skip_whitespace(text, i):
+    while i < len(text) and text[i] in _WHITESPACE:
+        i += 1
+    return i
+
+
+def _scan_string(text, i):
+    """`text[i]` adalah tanda kutip pembuka; kembalikan indeks setelah kutip penutup, atau None jika belum lengkap."""
+    i += 1
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '"':
+            return i + 1
+        i += 1
+    return None
+
+
+def _scan_value(text, i):
+    """
+    Mencari akhir nilai JSON yang dimulai di `text[i]`.
+
+    :return: Indeks setelah nilai, atau None jika nilai belum lengkap (teks masih terpotong).
+    """
+    ch = text[i]
+    if ch == '"':
+        return _scan_string(text, i)
+    if ch in '{[':
+        depth = 0
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                end = _scan_string(text, i)
+                if end is None:
+                    return None
+                i = end
+                continue
+            if ch in '{[':
+                depth += 1
+            elif ch in '}]':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return None
+    # Angka, true, false, null: selesai saat bertemu pemisah
+    while i < len(text) and text[i] not in ',}]' + _WHITESPACE:
+        i += 1
+    return i if i < len(text) else None
+
+
+def _complete_array_items(text, i):
+    """`text[i]` adalah '[' dari array yang mungkin belum tertutup; kembalikan elemen yang sudah lengkap."""
+    items = []
+    i += 1
+    while True:
+        i = _skip_whitespace(text, i)
+        if i >= len(text) or text[i] == ']':
+            return items
+        if text[i] == ',':
+            i += 1
+            continue
+        end = _scan_value(text, i)
+        if end is None:
+            return items
+        try:
+            items.append(json.loads(text[i:end]))
+        except ValueError:
+            return items
+        i = end
+
+
+def parse_partial_mom(text):
+    """
+    Mem-parsing JSON MoM yang masih terpotong (misalnya saat respons LLM di-stream).
+
+    Field tingkat atas yang nilainya sudah lengkap dikembalikan apa adanya. Untuk array yang
+    belum tertutup (misalnya "agenda"), hanya elemen yang sudah lengkap yang dikembalikan.
+
+    :param text: Teks JSON parsial dari LLM.
+    :return: Dictionary berisi field yang sudah bisa dipakai (bisa kosong).
+    """
+    result = {}
+    i = text.find('{')
+    if i < 0:
+        return result
+    i += 1
+    while True:
+        i = _skip_whitespace(text, i)
+        if i < len(text) and text[i] == ',':
+            i = _skip_whitespace(text, i + 1)
+        if i >= len(text) or text[i] != '"':
+            return result
+        key_end = _scan_string(text, i)
+        if key_end is None:
+            return result
+        key = json.loads(text[i:key_end])
+        i = _skip_whitespace(text, key_end)
+        if i >= len(text) or text[i] != ':':
+            return result
+        i = _skip_whitespace(text, i + 1)
+        if i >= len(text):
+            return result
+        end = _scan_value(text, i)
+        if end is None:
+            if text[i] == '[':
+                result[key] = _complete_array_items(text, i)
+            return result
+        try:
+            result[key] = json.loads(text[i:end])
+        except ValueError:
+            return result
+        i = end
+
+
+# --- Perbaikan JSON MoM yang rusak ---
+
+# Field tingkat atas MoM beserta tipe yang diharapkan (sesuai MOM_JSON_SCHEMA di byteplus_mom_utils)
+MOM_FIELDS = {
+    "judul_rapat": str,
+    "tanggal": str,
+    "pemimpin_rapat": str,
+    "daftar_hadir": list,
+    "agenda": list,
+    "kesimpulan": str,
+}
+
+# Batas jumlah titik potong yang dicoba saat menutup JSON yang terpotong
+_MAX_TRUNCATION_CANDIDATES = 200
+
+_decoder = json.JSONDecoder()
+
+
+def _strip_wrapping(text):
+    """Membuang pagar markdown (```json ... ```) dan teks sebelum '{' pertama."""
+    text = text.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline >= 0 else text[3:]
+    if text.rstrip().endswith("```"):
+        text = text.rstrip()[:-3]
+    start = text.find("{")
+    return text[start:] if start >= 0 else text
+
+
+def _remove_trailing_commas(text):
+    """Menghapus koma sebelum '}' atau ']' (di luar string)."""
+    out = []
+    i = 0
+    in_string = False
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if ch == '\\':
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ',':
+            j = _skip_whitespace(text, i + 1)
+            if j < len(text) and text[j] in '}]':
+                i += 1
+                continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _load_object(text):
+    """json.loads yang mengabaikan teks setelah objek JSON; None jika gagal atau bukan objek."""
+    try:
+        value, _ = _decoder.raw_decode(text)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _close_truncated(text):
+    """
+    Menyelamatkan JSON yang terpotong: dicoba prefiks yang berakhir di batas struktur (sebelum koma,
+    setelah '{'/'[', setelah penutup), dari yang terpanjang, lalu kurung yang masih terbuka ditutup.
+    """
+    candidates = []
+    stack = []
+    in_string = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if ch == '\\':
+                i += 2
+                continue
+            if ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            candidates.append((i + 1, tuple(stack)))
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+            candidates.append((i + 1, tuple(stack)))
+        elif ch == ',':
+            candidates.append((i, tuple(stack)))
+        i += 1
+
+    # Teks berakhir di tengah string: tutup string-nya (isi yang sudah ada ikut terselamatkan)
+    tail = text + '"' if in_string else text
+    attempts = [(tail, tuple(stack))] + [(text[:end], closers) for end, closers in reversed(candidates)]
+    for prefix, closers in attempts[:_MAX_TRUNCATION_CANDIDATES]:
+        if not closers:
+            continue
+        mom = _load_object(prefix.rstrip().rstrip(',') + "".join(reversed(closers)))
+        if mom is not None:
+            return mom
+    return None
+
+
+def repair_mom_json(text):
+    """
+    Mem-parsing jawaban LLM menjadi dict MoM, memperbaiki kerusakan umum secara lokal.
+
+    Urutan perbaikan: pagar markdown / teks pengantar dibuang, koma berlebih sebelum penutup
+    dihapus, lalu JSON yang terpotong ditutup di batas struktur terakhir yang utuh.
+
+    :return: (dict MoM atau None jika tidak bisa diselamatkan, daftar perbaikan yang dilakukan:
+             'wrapping', 'trailing_comma', 'truncated').
+    """
+    repairs = []
+    mom = _load_object(text.strip())
+    if mom is not None:
+        return mom, repairs
+
+    stripped = _strip_wrapping(text)
+    if stripped != text.strip():
+        repairs.append("wrapping")
+        mom = _load_object(stripped)
+        if mom is not None:
+            return mom, repairs
+
+    cleaned = _remove_trailing_commas(stripped)
+    if cleaned != stripped:
+        repairs.append("trailing_comma")
+        mom = _load_object(cleaned)
+        if mom is not None:
+            return mom, repairs
+
+    mom = _close_truncated(cleaned)
+    if mom is not None:
+        repairs.append("truncated")
+    return mom, repairs
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def validate_mom(mom):
+    """
+    Memeriksa dict MoM terhadap skema dan merapikan tipe yang salah di tempat (mis. "daftar_hadir"
+    berupa string, agenda/tindak lanjut berupa string atau objek tunggal, null untuk list).
+
+    :return: (dict MoM yang sudah dirapikan, list field tingkat atas yang hilang, list field yang dirapikan)
+    """
+    missing = [field for field in MOM_FIELDS if field not in mom]
+    fixed = []
+
+    for field, expected in MOM_FIELDS.items():
+        value = mom.get(field)
+        if field not in mom or isinstance(value, expected):
+            continue
+        fixed.append(field)
+        if expected is list:
+            if isinstance(value, str):
+                mom[field] = [item.strip() for item in value.split(",") if item.strip()] if field == "daftar_hadir" else [value]
+            else:
+                mom[field] = _as_list(value)
+        else:
+            mom[field] = "" if value is None else (", ".join(map(str, value)) if isinstance(value, list) else str(value))
+
+    agenda = []
+    for item in mom.get("agenda") or []:
+        if not isinstance(item, dict):
+            item = {"poin_agenda": str(item)}
+            fixed.append("agenda")
+        actions = item.get("tindak_lanjut")
+        if (actions is not None and not isinstance(actions, list)) or any(not isinstance(a, dict) for a in _as_list(actions)):
+            item["tindak_lanjut"] = [a if isinstance(a, dict) else {"deskripsi": str(a)} for a in _as_list(actions)]
+            fixed.append("agenda.tindak_lanjut")
+        agenda.append(item)
+    if "agenda" in mom:
+        mom["agenda"] = agenda
+    return mom, missing, sorted(set(fixed))
@@ -0,0 +1,256 @@
+# app/pipeline.py
+import os
+import json
+import time
+import logging
+
+from app.audio_utils import decode_audio, discard_predecoded
+from app.stt_utils import transcribe_with_whisper, format_whisper_result, is_transcription_cached
+from app.byteplus_mom_utils import (encode_transcript_for_prompt, generate_mom_with_byteplus,
+                                    generate_mom_from_partials, format_mom_to_text)
+from app.metrics import PIPELINE_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class StageError(Exception):
+    """
+    Dilempar tahap pipeline yang gagal dengan pesan untuk pengguna. Checkpoint tahap-tahap
+    sebelumnya tetap tersimpan, sehingga job bisa dilanjutkan dari tahap ini.
+    """
+
+
+class Stage:
+    """
+    Satu tahap pipeline.
+
+    :param name: Nama tahap (juga kunci checkpoint dan label metrik).
+    :param run: Fungsi `run(ctx)` yang mengembalikan dict output (bisa di-JSON-kan). Field
+                "timings" pada output digabung ke statistik job.
+    :param queue: Worker yang menjalankan tahap ini ('stt' atau 'llm', lihat JobScheduler).
+    :param message: Pesan status saat tahap dimulai.
+    :param progress: Progres (0-100) saat tahap dimulai.
+    :param checkpoint: False untuk tahap yang outputnya hanya hidup di memori (mis. audio hasil
+                       dekode); tahap seperti ini dijalankan ulang bersama tahap sesudahnya saat resume.
+    """
+
+    def __init__(self, name, run, queue, message, progress, checkpoint=True):
+        self.name = name
+        self.run = run
+        self.queue = queue
+        self.message = message
+        self.progress = progress
+        self.checkpoint = checkpoint
+
+
+class JobContext:
+    """
+    Data satu job selama pipeline berjalan.
+
+    - `payload`: payload job di job store (path file, model, profil decoding, ...)
+    - `outputs`: output per tahap, dari checkpoint atau dari tahap yang baru selesai
+    - `memory`: data antar tahap yang tidak di-checkpoint (mis. audio hasil dekode)
+    - `timings`: statistik job (gabungan field "timings" semua output)
+
+    :param report: `report(message, progress, **fields)` untuk memperbarui status job.
+    :param write_artifact: `write_artifact(filename, content, kind)` menulis file hasil, mengembalikan ukurannya.
+    :param release_source: `release_source(path)` dipanggil saat media sumber tidak dibutuhkan lagi.
+    """
+
+    def __init__(self, job_id, payload, write_artifact, report=None, release_source=None, timings=None):
+        self.job_id = job_id
+        self.payload = payload
+        self.outputs = {}
+        self.memory = {}
+        self.timings = dict(timings or {})
+        self.write_artifact = write_artifact
+        self._report = report
+        self._release_source = release_source
+
+    def report(self, message, progress, **fields):
+        if self._report is not None:
+            self._report(message, progress, **fields)
+
+    def release_source(self, path):
+        if self._release_source is not None:
+            self._release_source(path)
+
+
+class Pipeline:
+    """
+    Menjalankan tahap-tahap secara berurutan dan menyimpan output setiap tahap sebagai checkpoint
+    di job store (`save_checkpoint`/`load_checkpoints`), sehingga job yang gagal (mis. rate limit
+    LLM) dilanjutkan dari tahap pertama yang belum selesai, bukan dari dekode dan transkripsi lagi.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def resume_index(self, completed):
+        """
+        Indeks tahap pertama yang harus dijalankan, diberi nama-nama tahap yang sudah punya checkpoint.
+        Tahap tanpa checkpoint tepat sebelum tahap itu ikut dijalankan ulang karena outputnya dibutuhkan.
+        """
+        index = next((i for i, stage in enumerate(self.stages) if stage.checkpoint and stage.name not in completed),
+                     len(self.stages))
+        if index < len(self.stages):
+            while index > 0 and not self.stages[index - 1].checkpoint:
+                index -= 1
+        return index
+
+    def resume_stage(self, checkpoint_store, job_id):
+        """Tahap pertama yang belum selesai untuk job ini, atau None jika semua tahap sudah selesai."""
+        index = self.resume_index(checkpoint_store.load_checkpoints(job_id))
+        return self.stages[index] if index < len(self.stages) else None
+
+    def run(self, ctx, checkpoint_store, queue=None):
+        """
+        Menjalankan tahap yang belum selesai, mulai dari tahap pertama tanpa checkpoint.
+
+        :param queue: Jika diberikan, hanya tahap milik worker ini yang dijalankan; pipeline berhenti
+                      di tahap pertama milik worker lain.
+        :return: True jika semua tahap sudah selesai, False jika berhenti di batas worker.
+        :raises StageError: Jika sebuah tahap gagal (checkpoint sebelumnya tetap ada).
+        """
+        checkpoints = checkpoint_store.load_checkpoints(ctx.job_id)
+        for name in [stage.name for stage in self.stages if stage.name in checkpoints]:
+            ctx.outputs[name] = checkpoints[name]
+            ctx.timings.update(checkpoints[name].get("timings") or {})
+
+        for stage in self.stages[self.resume_index(checkpoints):]:
+            if queue is not None and stage.queue != queue:
+                return False
+            if stage.name in checkpoints:
+                logger.info(f"Job {ctx.job_id}: tahap '{stage.name}' dijalankan ulang.")
+            ctx.report(stage.message, stage.progress)
+            start_time = time.time()
+            output = stage.run(ctx) or {}
+            seconds = time.time() - start_time
+            PIPELINE_STAGE_SECONDS.observe(seconds, stage=stage.name)
+            timings = output.setdefault("timings", {})
+            timings[f"{stage.name}_stage_seconds"] = round(seconds, 3)
+            ctx.outputs[stage.name] = output
+            ctx.timings.update(timings)
+            if stage.checkpoint:
+                checkpoint_store.save_checkpoint(ctx.job_id, stage.name, output)
+        return True
+
+
+# --- Tahap pipeline MoM ---
+
+def _decode_stage(ctx):
+    """Dekode audio (termasuk dari video) ke memori; dilewati jika transkripsinya sudah ada di cache."""
+    payload = ctx.payload
+    if is_transcription_cached(payload["file_path"], model_name=payload.get("model_name"),
+                               content_hash=payload.get("content_hash"),
+                               decoding_profile=payload.get("decoding_profile")):
+        # Hasil dekode selama upload (jika ada) tidak akan dipakai
+        discard_predecoded(payload["file_path"])
+        return {}
+    start_time = time.time()
+    try:
+        ctx.memory["audio"] = decode_audio(payload["file_path"])
+    except RuntimeError as e:
+        ctx.release_source(payload["file_path"])
+        raise StageError(f"Dekode audio gagal: {e}") from e
+    return {"timings": {"decode_seconds": round(time.time() - start_time, 3)}}
+
+
+def _transcribe_stage(ctx):
+    """Transkripsi Whisper lalu penyimpanan file transkripsi."""
+    payload = ctx.payload
+    file_path = payload["file_path"]
+    stats = {}
+    try:
+        whisper_result = transcribe_with_whisper(file_path, model_name=payload.get("model_name"), stats=stats,
+                                                 content_hash=payload.get("content_hash"),
+                                                 decoding_profile=payload.get("decoding_profile"),
+                                                 audio=ctx.memory.pop("audio", None))
+    finally:
+        # Media sumber tidak dibutuhkan lagi: retensinya mulai dihitung
+        ctx.release_source(file_path)
+
+    if isinstance(whisper_result, str):
+        raise StageError(f"Transkripsi gagal: {whisper_result}")
+    transcription_text = format_whisper_result(whisper_result)
+    if not transcription_text or "Tidak ada teks" in transcription_text:
+        raise StageError("Transkripsi tidak menghasilkan teks.")
+
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    transcript_filename = f"{base_name}_transcription.txt"
+    stats["bytes_written"] = ctx.write_artifact(transcript_filename, transcription_text, "transcript")
+    logger.info(f"Transkripsi disimpan sebagai artefak: {transcript_filename}")
+    ctx.report("Transkripsi selesai.", 60, transcript_file=transcript_filename)
+    return {
+        "base_name": base_name,
+        "transcript_filename": transcript_filename,
+        "transcription_text": transcription_text,
+        "timings": stats
+    }
+
+
+def _prompt_stage(ctx):
+    """Encoding transkripsi untuk prompt LLM (ringkas, sesuai MOM_PROMPT_ENCODING)."""
+    transcript = ctx.outputs["transcribe"]
+    if transcript.get("partial_moms"):
+        # Rapat langsung: bagian transkripsi sudah diekstrak selama rapat, ekornya diekstrak di tahap LLM
+        return {}
+    stats = {}
+    prompt_text = encode_transcript_for_prompt(transcript["transcription_text"], stats)
+    return {"prompt_text": prompt_text, "timings": stats}
+
+
+def _llm_stage(ctx):
+    """Pembuatan MoM dengan BytePlus LLM (MoM parsial diteruskan ke status selama di-stream)."""
+    transcript = ctx.outputs["transcribe"]
+
+    def publish_partial_mom(partial_mom):
+        # Diteruskan ke browser lewat /stream_status agar agenda tampil sebelum MoM selesai
+        agenda_count = len(partial_mom.get("agenda") or [])
+        ctx.report(f"Membuat MoM dengan BytePlus LLM... ({agenda_count} agenda diterima)",
+                   min(89, 70 + 3 * agenda_count), partial_mom=partial_mom)
+
+    stats = {}
+    if transcript.get("partial_moms"):
+        # Rapat langsung: tahap map sudah dikerjakan selama rapat, tinggal ekor transkripsi dan reduce
+        mom_result = generate_mom_from_partials(transcript["partial_moms"], tail_text=transcript.get("tail_text"),
+                                                on_partial=publish_partial_mom, stats=stats)
+    else:
+        mom_result = generate_mom_with_byteplus(transcript["transcription_text"], on_partial=publish_partial_mom,
+                                                stats=stats, prompt_text=ctx.outputs["prompt"].get("prompt_text"))
+
+    if isinstance(mom_result, dict) and "error" in mom_result:
+        raise StageError(f"Pembuatan MoM gagal: {mom_result['error']}")
+    if not isinstance(mom_result, dict):
+        raise StageError(f"Pembuatan MoM gagal: {mom_result}")
+    return {"mom": mom_result, "timings": stats}
+
+
+def _render_stage(ctx):
+    """Menyimpan MoM sebagai JSON dan teks."""
+    base_name = ctx.outputs["transcribe"]["base_name"]
+    mom_result = ctx.outputs["llm"]["mom"]
+
+    mom_json_filename = f"{base_name}_mom_byteplus.json"
+    bytes_written = ctx.write_artifact(mom_json_filename, json.dumps(mom_result, indent=2, ensure_ascii=False),
+                                       "mom_json")
+    logger.info(f"MoM JSON disimpan sebagai artefak: {mom_json_filename}")
+
+    mom_txt_filename = f"{base_name}_mom_byteplus.txt"
+    bytes_written += ctx.write_artifact(mom_txt_filename, format_mom_to_text(mom_result), "mom_txt")
+    logger.info(f"MoM TXT disimpan sebagai artefak: {mom_txt_filename}")
+    return {
+        "mom_json_file": mom_json_filename,
+        "mom_txt_file": mom_txt_filename,
+        "timings": {"bytes_written": ctx.timings.get("bytes_written", 0) + bytes_written}
+    }
+
+
+# Pipeline job MoM: dekode -> transkripsi (worker STT) -> prompt -> LLM -> render (worker LLM)
+MOM_PIPELINE = Pipeline([
+    Stage("decode", _decode_stage, "stt", "Mendekode audio...", 10, checkpoint=False),
+    Stage("transcribe", _transcribe_stage, "stt", "Melakukan transkripsi dengan Whisper...", 30),
+    Stage("prompt", _prompt_stage, "llm", "Menyiapkan prompt MoM...", 68),
+    Stage("llm", _llm_stage, "llm", "Membuat Minutes of Meeting (MoM) dengan BytePlus LLM...", 70),
+    Stage("render", _render_stage, "llm", "MoM berhasil dibuat.", 90),
+])
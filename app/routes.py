@@ -4,17 +4,33 @@ import uuid
 import base64
 import json
 import time
+import socket
+import mimetypes
+import zipfile
 import threading
 import logging
-from flask import Blueprint, render_template, request, redirect, url_for, current_app, Response, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, current_app, Response, send_file, jsonify
 from werkzeug.utils import secure_filename
 
 # --- Impor fungsi dari modul lain ---
 # Pastikan fungsi-fungsi ini tidak menggunakan `current_app` secara langsung di dalam proses background
 # atau jika digunakan, sudah diperbaiki.
-from app.stt_utils import transcribe_with_whisper
-from app.video_utils import extract_audio
-from app.byteplus_mom_utils import generate_mom_with_byteplus, format_mom_to_text
+from app.stt_utils import warm_up_models, WHISPER_MODEL_NAME
+from app.stt_backends import get_stt_backend
+from app.decoding_profiles import DECODING_PROFILES, resolve_decoding_profile
+from app.pipeline import MOM_PIPELINE, JobContext, StageError
+from app.job_queue import JobScheduler, QueueFullError
+from app.status_notifier import StatusNotifier
+from app.job_store import create_job_store
+from app.audio_utils import (SAMPLE_RATE, probe_duration, PrefixDecoder, STREAMABLE_EXTENSIONS, register_predecoded,
+                             discard_predecoded, predecoded_bytes)
+from app.upload_utils import HashingUploadRequest, ResumableUploadStore, UploadError, store_uploaded_file
+from app.artifact_store import create_artifact_store, artifact_kind
+from app.live_meeting import LiveSessionManager, LiveSessionError
+from app.http_utils import CompressedResponseCache, choose_encoding
+from app.metrics import (REGISTRY, CONTENT_TYPE_LATEST, JOBS_TOTAL, QUEUE_DEPTH, QUEUE_WAIT_SECONDS,
+                         STAGE_SECONDS, BYTES_WRITTEN_TOTAL, ARTIFACT_BYTES, ARTIFACTS_EVICTED_TOTAL,
+                         LIVE_SESSIONS)
 
 # Setup logger untuk file ini
 logger = logging.getLogger(__name__)
@@ -40,170 +56,693 @@ def generate_unique_filename(original_filename):
     else:
         return encoded
 
-# --- Dictionary untuk menyimpan status proses (Untuk demo, gunakan mem cache. Untuk produksi, gunakan Redis/DB) ---
-processing_status = {}
+# --- Penyimpanan status job (dibuat di init_routes dari Config; default SQLite/WAL) ---
+job_store = None
+
+# --- Pengelola file di folder upload (layout shard, retensi, kuota; dibuat di init_routes) ---
+artifact_store = None
+
+# Identitas proses ini sebagai pemilik job yang sedang dikerjakan. Id acak per boot membuat proses
+# baru tidak tertukar dengan proses sebelum restart walaupun PID-nya sama (umum di container).
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+# --- Notifikasi perubahan status untuk SSE (push, bukan polling) ---
+status_notifier = StatusNotifier()
+
+def _count_finished_job(status):
+    if status in ("completed", "error"):
+        JOBS_TOTAL.inc(status=status)
+
+# job_id -> batch_id untuk job yang berasal dari /process_batch (agar penonton SSE batch ikut dibangunkan)
+job_batches = {}
+
+def _publish(unique_id):
+    status_notifier.publish(unique_id)
+    batch_id = job_batches.get(unique_id)
+    if batch_id:
+        status_notifier.publish(batch_id)
+
+def set_status(unique_id, status):
+    """Mengganti seluruh status job lalu memberi tahu penonton SSE."""
+    job_store.set(unique_id, status)
+    _publish(unique_id)
+    _count_finished_job(status.get("status"))
+
+def update_status(unique_id, **fields):
+    """Memperbarui sebagian field status job lalu memberi tahu penonton SSE."""
+    job_store.update(unique_id, **fields)
+    _publish(unique_id)
+    _count_finished_job(fields.get("status"))
+
+def _write_artifact(filename, content, kind):
+    """Menulis file teks hasil lewat artifact store (gzip jika diatur) dan mencatat byte-nya di metrik."""
+    size = artifact_store.write_text(filename, content, kind)
+    BYTES_WRITTEN_TOTAL.inc(size, kind=kind)
+    return size
+
+def _new_upload_path(original_filename):
+    """Path shard baru di folder upload untuk file upload dengan nama unik."""
+    return artifact_store.path_for(generate_unique_filename(original_filename), create_dirs=True)
+
+def _observe_queue_wait(stage, payload, timings):
+    # `enqueued_at` diisi saat job dimasukkan ke antrean tahap ini
+    enqueued_at = payload.get("enqueued_at")
+    if enqueued_at:
+        wait_seconds = max(0.0, time.time() - enqueued_at)
+        QUEUE_WAIT_SECONDS.observe(wait_seconds, stage=stage)
+        timings[f"{stage}_queue_wait_seconds"] = round(wait_seconds, 3)
+
+def _publish_queue_positions(pending_job_ids):
+    # Posisi antrean job yang masih menunggu berubah setiap kali ada job yang diambil worker.
+    # Posisi disimpan di job store agar terlihat juga dari proses server lain: semua posisi ditulis
+    # dalam satu transaksi, dan hanya untuk job yang masih 'queued' sehingga notifikasi yang
+    # terlambat tidak menimpa status job yang baru saja mulai dikerjakan.
+    updates = {
+        job_id: {"queue_position": position, "message": f"Menunggu antrean (posisi {position})..."}
+        for position, job_id in enumerate(pending_job_ids, 1)
+    }
+    for job_id in job_store.update_many(updates, ("queued",)):
+        _publish(job_id)
+
+# --- Penjadwal job (dibuat di init_routes) ---
+job_scheduler = None
+
+# --- Sesi upload bertahap (dibuat di init_routes) ---
+upload_store = None
+# upload_id -> PrefixDecoder yang mendekode audio selama upload berjalan (hanya di proses ini)
+upload_decoders = {}
+
+# Jenis file lama (langsung di folder upload, tidak tercatat di artifact store) yang boleh diunduh
+LEGACY_DOWNLOAD_KINDS = ("transcript", "mom_json", "mom_txt")
+
+# --- Cache respons /results untuk job yang sudah selesai (dibuat di init_routes) ---
+results_cache = None
+
+# --- Sesi rapat langsung (dibuat di init_routes; hanya ada di proses yang menerima audionya) ---
+live_sessions = None
+# Format audio yang diterima /live selain PCM mentah (didekode ffmpeg dari pipe)
+LIVE_AUDIO_FORMATS = {'pcm_s16le'} | STREAMABLE_EXTENSIONS
 
 # --- Fungsi Latar Belakang untuk Memproses File ---
-# --- PERUBAHAN: Terima upload_folder dan base_url (jika diperlukan di masa depan) sebagai argumen ---
-def background_process(file_path, unique_id, original_filename, upload_folder):
-    """Fungsi yang dijalankan di thread terpisah untuk memproses file."""
-    global processing_status
+def _job_context(unique_id, payload):
+    """JobContext pipeline untuk job ini: status, file hasil, dan media sumber lewat store milik routes."""
+    timings = dict(payload.get("timings") or {})
+
+    def report(message, progress, **fields):
+        set_status(unique_id, dict({"status": "processing", "message": message, "progress": progress,
+                                    "timings": ctx.timings}, **fields))
+
+    ctx = JobContext(unique_id, payload, write_artifact=_write_artifact, report=report,
+                     release_source=artifact_store.release, timings=timings)
+    return ctx
+
+def run_stt_stage(unique_id, payload):
+    """
+    Tahap STT yang dijalankan oleh worker STT: tahap pipeline milik worker STT (dekode audio,
+    termasuk dari video, dan transkripsi) yang belum punya checkpoint.
+
+    :return: Payload untuk tahap LLM, atau None jika proses berhenti karena error.
+    """
+    file_path = payload.get("file_path")
     try:
-        # Gunakan upload_folder yang diteruskan, bukan current_app.config['UPLOAD_FOLDER']
-        UPLOAD_FOLDER = upload_folder
-
-        processing_status[unique_id] = {"status": "started", "message": "Proses dimulai...", "progress": 0}
-
-        # --- 1. Ekstraksi Audio (jika video) ---
-        audio_file_path = file_path
-        if is_video_file(original_filename):
-            processing_status[unique_id] = {"status": "processing", "message": "Mengekstrak audio dari video...", "progress": 10}
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
-            extracted_audio_filename = f"{base_name}_extracted_audio.wav"
-            # --- GUNAKAN UPLOAD_FOLDER YANG DITERUSKAN ---
-            extracted_audio_path = os.path.join(UPLOAD_FOLDER, extracted_audio_filename)
-            
-            success = extract_audio(file_path, extracted_audio_path)
-            
-            if success:
-                processing_status[unique_id]["message"] = "Audio berhasil diekstrak."
-                processing_status[unique_id]["progress"] = 20
-                audio_file_path = extracted_audio_path
-                # Opsional: Hapus file video asli setelah ekstraksi
-                # os.remove(file_path)
-            else:
-                processing_status[unique_id]["status"] = "error"
-                processing_status[unique_id]["message"] = "Gagal mengekstrak audio dari video."
-                processing_status[unique_id]["progress"] = 0
-                return # Hentikan proses
-
-        # --- 2. Transkripsi dengan Whisper ---
-        processing_status[unique_id] = {"status": "processing", "message": "Melakukan transkripsi dengan Whisper...", "progress": 30}
-        whisper_result = transcribe_with_whisper(audio_file_path)
-        
-        # Fungsi format_whisper_result perlu didefinisikan atau diimpor
-        # Kita definisikan di sini untuk memastikan kemandirian
-        def format_whisper_result_local(whisper_result):
-             if not whisper_result or isinstance(whisper_result, str):
-                 return whisper_result if isinstance(whisper_result, str) else "Tidak ada hasil transkripsi."
-             formatted_text = ""
-             segments = whisper_result.get("segments", [])
-             if segments:
-                 for segment in segments:
-                     start_sec = segment.get("start", 0)
-                     end_sec = segment.get("end", 0)
-                     text = segment.get("text", "").strip()
-                     if text:
-                         formatted_text += f"[{start_sec:.2f} - {end_sec:.2f}] {text}\n"
-                 return formatted_text
-             else:
-                 full_text = whisper_result.get("text", "").strip()
-                 if full_text:
-                      return full_text
-                 else:
-                      return "Tidak ada teks yang dikenali dalam audio."
-
-        if isinstance(whisper_result, str) and "Terjadi kesalahan" in whisper_result:
-            processing_status[unique_id]["status"] = "error"
-            processing_status[unique_id]["message"] = f"Transkripsi gagal: {whisper_result}"
-            processing_status[unique_id]["progress"] = 0
+        # Transisi atomik: job yang sudah dikerjakan/dihapus di tempat lain tidak diproses ulang
+        if not job_store.transition(unique_id, ("queued",), {"status": "started", "message": "Proses dimulai...", "progress": 0}):
+            logger.warning(f"Job {unique_id} tidak lagi berstatus 'queued', dilewati.")
+            return None
+        _publish(unique_id)
+
+        # Waktu per tahap disimpan bersama status job (field "timings")
+        ctx = _job_context(unique_id, payload)
+        _observe_queue_wait("stt", payload, ctx.timings)
+        stage_start = time.time()
+        try:
+            MOM_PIPELINE.run(ctx, job_store, queue="stt")
+        except StageError as e:
+            update_status(unique_id, status="error", message=str(e), progress=0)
+            return None
+
+        stt_seconds = time.time() - stage_start
+        STAGE_SECONDS.observe(stt_seconds, stage="stt")
+        ctx.timings["stt_seconds"] = round(stt_seconds, 3)
+
+        # Tahap LLM dijalankan oleh worker LLM; tandai job sebagai menunggu
+        transcript_filename = ctx.outputs["transcribe"]["transcript_filename"]
+        set_status(unique_id, {
+            "status": "processing",
+            "message": "Transkripsi selesai, menunggu worker LLM...",
+            "progress": 65,
+            "transcript_file": transcript_filename,
+            "timings": ctx.timings
+        })
+        return dict(payload, timings=ctx.timings, enqueued_at=time.time())
+
+    except Exception as e:
+        error_msg = f"Terjadi kesalahan tak terduga di background_process: {str(e)}"
+        logger.error(error_msg)
+        logger.exception("Traceback:")
+        set_status(unique_id, {"status": "error", "message": error_msg, "progress": 0})
+        if file_path:
+            artifact_store.release(file_path)
+        return None
+    finally:
+        # Hasil dekode selama upload yang tidak terpakai (transkripsi dari cache, job gagal atau
+        # dihapus sebelum dekode) dilepas agar PCM-nya tidak tertahan di memori proses
+        if file_path:
+            discard_predecoded(file_path)
+
+
+def run_mom_stage(unique_id, payload):
+    """Tahap LLM yang dijalankan oleh worker LLM: tahap pipeline prompt, LLM, dan render yang belum selesai."""
+    try:
+        ctx = _job_context(unique_id, payload)
+        _observe_queue_wait("llm", payload, ctx.timings)
+        stage_start = time.time()
+        try:
+            MOM_PIPELINE.run(ctx, job_store, queue="llm")
+        except StageError as e:
+            update_status(unique_id, status="error", message=str(e), progress=0)
             return
 
-        transcription_text = format_whisper_result_local(whisper_result) # Gunakan fungsi lokal
-        if not transcription_text or "Tidak ada teks" in transcription_text:
-             processing_status[unique_id]["status"] = "error"
-             processing_status[unique_id]["message"] = "Transkripsi tidak menghasilkan teks."
-             processing_status[unique_id]["progress"] = 0
-             return
+        llm_seconds = time.time() - stage_start
+        STAGE_SECONDS.observe(llm_seconds, stage="llm")
+        ctx.timings["llm_stage_seconds"] = round(llm_seconds, 3)
+        files = ctx.outputs["render"]
 
-        processing_status[unique_id]["message"] = "Transkripsi selesai."
-        processing_status[unique_id]["progress"] = 60
-        
-        # Simpan transkripsi ke file
-        base_name_final = os.path.splitext(os.path.basename(audio_file_path))[0]
-        transcript_filename = f"{base_name_final}_transcription.txt"
-        # --- GUNAKAN UPLOAD_FOLDER YANG DITERUSKAN ---
-        transcript_path = os.path.join(UPLOAD_FOLDER, transcript_filename)
-        with open(transcript_path, 'w', encoding='utf-8') as f:
-            f.write(transcription_text)
-        processing_status[unique_id]["transcript_file"] = transcript_filename
-        logger.info(f"Transkripsi disimpan ke: {transcript_path}")
-
-        # --- 3. Buat MoM dengan BytePlus LLM ---
-        processing_status[unique_id] = {"status": "processing", "message": "Membuat Minutes of Meeting (MoM) dengan BytePlus LLM...", "progress": 70}
-        mom_result = generate_mom_with_byteplus(transcription_text)
-
-        # --- PERIKSA JUGA JIKA generate_mom_with_byteplus MENGAKSES current_app ---
-        # Jika iya, Anda perlu memperbaikinya juga dengan cara yang sama.
-        # Misalnya, oper konfigurasi yang dibutuhkan ke fungsi tersebut.
-
-        if isinstance(mom_result, str) and ("Error" in mom_result or "BYTEPLUS" in mom_result):
-            processing_status[unique_id]["status"] = "error"
-            processing_status[unique_id]["message"] = f"Pembuatan MoM gagal: {mom_result}"
-            processing_status[unique_id]["progress"] = 0
-            return # Hentikan proses
-
-        # Jika mom_result adalah dict error dari byteplus_mom_utils
-        if isinstance(mom_result, dict) and "error" in mom_result:
-             processing_status[unique_id]["status"] = "error"
-             processing_status[unique_id]["message"] = f"Pembuatan MoM gagal: {mom_result['error']}"
-             processing_status[unique_id]["progress"] = 0
-             return
-
-        processing_status[unique_id]["message"] = "MoM berhasil dibuat."
-        processing_status[unique_id]["progress"] = 90
-
-        # Simpan hasil MoM
-        mom_json_filename = f"{base_name_final}_mom_byteplus.json"
-        # --- GUNAKAN UPLOAD_FOLDER YANG DITERUSKAN ---
-        mom_json_path = os.path.join(UPLOAD_FOLDER, mom_json_filename)
-        with open(mom_json_path, 'w', encoding='utf-8') as f:
-            json.dump(mom_result, f, indent=2, ensure_ascii=False)
-        logger.info(f"MoM JSON disimpan ke: {mom_json_path}")
-        
-        mom_text_result = format_mom_to_text(mom_result) # Pastikan fungsi ini tidak akses current_app
-        mom_txt_filename = f"{base_name_final}_mom_byteplus.txt"
-        # --- GUNAKAN UPLOAD_FOLDER YANG DITERUSKAN ---
-        mom_txt_path = os.path.join(UPLOAD_FOLDER, mom_txt_filename)
-        with open(mom_txt_path, 'w', encoding='utf-8') as f:
-            f.write(mom_text_result)
-        logger.info(f"MoM TXT disimpan ke: {mom_txt_path}")
-        
-        processing_status[unique_id]["mom_json_file"] = mom_json_filename
-        processing_status[unique_id]["mom_txt_file"] = mom_txt_filename
-        
-        # --- 4. Selesai ---
-        processing_status[unique_id] = {
-            "status": "completed", 
-            "message": "Semua proses selesai!", 
+        # --- Selesai ---
+        set_status(unique_id, {
+            "status": "completed",
+            "message": "Semua proses selesai!",
             "progress": 100,
-            "transcript_file": transcript_filename,
-            "mom_json_file": mom_json_filename,
-            "mom_txt_file": mom_txt_filename
-        }
+            "transcript_file": ctx.outputs["transcribe"]["transcript_filename"],
+            "mom_json_file": files["mom_json_file"],
+            "mom_txt_file": files["mom_txt_file"],
+            # Profil decoding yang dipakai, agar trade-off akurasi/throughput bisa ditinjau per job
+            "decoding_profile": ctx.timings.get("decoding_profile"),
+            "timings": ctx.timings
+        })
         logger.info(f"Proses untuk {unique_id} selesai.")
 
     except Exception as e:
         error_msg = f"Terjadi kesalahan tak terduga di background_process: {str(e)}"
         logger.error(error_msg)
         logger.exception("Traceback:")
-        processing_status[unique_id] = {"status": "error", "message": error_msg, "progress": 0}
-    finally:
-        # Opsional: Bersihkan file sementara jika perlu
-        pass
+        set_status(unique_id, {"status": "error", "message": error_msg, "progress": 0})
+
+
+def background_process(file_path, unique_id, original_filename, upload_folder, model_name=None, decoding_profile=None):
+    """Menjalankan tahap STT dan LLM secara berurutan di thread pemanggil (tanpa antrean)."""
+    payload = {"file_path": file_path, "original_filename": original_filename, "upload_folder": upload_folder,
+               "model_name": model_name, "decoding_profile": decoding_profile}
+    mom_payload = run_stt_stage(unique_id, payload)
+    if mom_payload is not None:
+        run_mom_stage(unique_id, mom_payload)
+
+def _resume_point(job_id, payload):
+    """
+    Tahap pipeline pertama yang belum selesai untuk job ini (None jika tinggal status akhirnya),
+    beserta pesan error jika job tidak bisa dilanjutkan dari sana.
+    """
+    stage = MOM_PIPELINE.resume_stage(job_store, job_id)
+    if stage is not None and stage.queue == "stt" and not os.path.exists(payload.get("file_path") or ""):
+        return stage, "Media sumber sudah tidak tersedia, silakan upload ulang."
+    return stage, None
+
+def _resume_job(job_id, payload, stage, message):
+    """
+    Melanjutkan job dari `stage` (hasil `_resume_point`): ke antrean STT jika transkripsi belum ada,
+    ke antrean LLM jika sudah. Tahap yang sudah punya checkpoint tidak dijalankan ulang.
+
+    :raises QueueFullError: Jika job perlu masuk antrean STT yang sedang penuh.
+    """
+    payload = dict(payload, enqueued_at=time.time())
+    if stage is not None and stage.queue == "stt":
+        artifact_store.pin(payload["file_path"])
+        set_status(job_id, {"status": "queued", "message": message, "progress": 0})
+        try:
+            job_scheduler.submit(job_id, payload, payload.get("duration_seconds"))
+        except QueueFullError:
+            artifact_store.release(payload["file_path"])
+            raise
+    else:
+        set_status(job_id, {"status": "processing", "message": message, "progress": 65})
+        job_scheduler.submit_llm(job_id, payload)
+    logger.info(f"Job {job_id} dilanjutkan dari tahap '{stage.name if stage else 'selesai'}'.")
+
+def _finish_live_session(session, unique_id, upload_folder):
+    """
+    Menutup sesi rapat langsung (transkripsi sisa audio, menunggu MoM parsial) lalu meneruskan
+    transkripsi beserta MoM parsialnya ke antrean LLM.
+    """
+    try:
+        stage_start = time.time()
+        result = session.finish()
+        if session.status == "error":
+            update_status(unique_id, status="error", message=session.error, progress=0)
+            return
+        transcription_text = result["transcription_text"]
+        if not transcription_text.strip():
+            update_status(unique_id, status="error", message="Transkripsi tidak menghasilkan teks.", progress=0)
+            return
+
+        base_name_final = generate_unique_filename("live")
+        transcript_filename = f"{base_name_final}_transcription.txt"
+        timings = {
+            "audio_seconds": result["duration_seconds"],
+            "live_finish_seconds": round(time.time() - stage_start, 3),
+            "live_partial_sections": len(result["partial_moms"] or []),
+            "decoding_profile": session.decoding["name"]
+        }
+        timings["bytes_written"] = _write_artifact(transcript_filename, transcription_text, "transcript")
+        logger.info(f"Transkripsi rapat langsung {session.session_id} disimpan sebagai artefak: {transcript_filename}")
+        # Transkripsi rapat langsung menjadi checkpoint tahap transcribe: tahap pipeline berikutnya
+        # (dan /retry jika tahap LLM gagal) berjalan sama seperti job upload
+        job_store.save_checkpoint(unique_id, "transcribe", {
+            "base_name": base_name_final,
+            "transcript_filename": transcript_filename,
+            "transcription_text": transcription_text,
+            "partial_moms": result["partial_moms"],
+            "tail_text": result["tail_text"],
+            "timings": timings
+        })
+
+        set_status(unique_id, {
+            "status": "processing",
+            "message": "Transkripsi rapat selesai, menunggu worker LLM...",
+            "progress": 65,
+            "transcript_file": transcript_filename,
+            "timings": timings
+        })
+        job_scheduler.submit_llm(unique_id, {"upload_folder": upload_folder, "enqueued_at": time.time()})
+    except Exception as e:
+        error_msg = f"Terjadi kesalahan saat menutup rapat langsung: {str(e)}"
+        logger.error(error_msg)
+        logger.exception("Traceback:")
+        set_status(unique_id, {"status": "error", "message": error_msg, "progress": 0})
+
+def _heartbeat_forever(interval_seconds, lease_seconds):
+    """Loop thread latar belakang: memperbarui lease proses ini lalu memulihkan job milik proses yang lease-nya habis."""
+    while True:
+        time.sleep(interval_seconds)
+        try:
+            job_store.renew_lease(PROCESS_OWNER)
+            _recover_interrupted_jobs(lease_seconds)
+        except Exception as e:
+            logger.error(f"Gagal memperbarui lease atau memulihkan job: {e}")
+
+def _evict_expired_jobs_forever(interval_seconds):
+    """Loop thread latar belakang yang membuang status job yang melewati TTL, artefak kedaluwarsa, sesi upload yang terbengkalai, dan rapat langsung yang idle."""
+    while True:
+        time.sleep(interval_seconds)
+        try:
+            expired = job_store.evict_expired()
+            for job_id in expired:
+                job_batches.pop(job_id, None)
+                status_notifier.forget(job_id)
+            if expired:
+                logger.info(f"{len(expired)} status job kedaluwarsa dihapus.")
+        except Exception as e:
+            logger.error(f"Gagal menghapus status job kedaluwarsa: {e}")
+        try:
+            removed = artifact_store.sweep()
+            for _, kind, reason in removed:
+                ARTIFACTS_EVICTED_TOTAL.inc(kind=kind, reason=reason)
+            if removed:
+                logger.info(f"{len(removed)} artefak kedaluwarsa/melebihi kuota dihapus.")
+        except Exception as e:
+            logger.error(f"Gagal membersihkan artefak: {e}")
+        try:
+            stale = upload_store.evict_stale()
+            for upload_id in stale:
+                decoder = upload_decoders.pop(upload_id, None)
+                if decoder is not None:
+                    decoder.abort()
+            if stale:
+                logger.info(f"{len(stale)} sesi upload terbengkalai dihapus.")
+        except Exception as e:
+            logger.error(f"Gagal menghapus sesi upload terbengkalai: {e}")
+        try:
+            idle = live_sessions.evict_idle()
+            for session_id in idle:
+                status_notifier.forget(session_id)
+            if idle:
+                logger.info(f"{len(idle)} sesi rapat langsung yang idle dihapus.")
+        except Exception as e:
+            logger.error(f"Gagal menghapus sesi rapat langsung yang idle: {e}")
+
+def _recover_interrupted_jobs(lease_seconds):
+    """
+    Memasukkan ulang ke antrean job yang terhenti karena proses pemiliknya mati (misalnya restart),
+    mulai dari tahap pipeline pertama yang belum punya checkpoint. Proses dianggap mati jika lease-nya
+    tidak diperbarui selama `lease_seconds` (tidak bergantung pada hostname atau PID, yang bisa
+    berubah atau terpakai ulang setelah restart). Pengambilalihan dilakukan secara atomik, sehingga hanya satu proses yang menjalankan ulang job.
+    """
+    live_owners = job_store.live_owners(lease_seconds) | {PROCESS_OWNER}
+    for job_id, record in job_store.list_by_status(("queued", "started", "processing"), limit=1000):
+        payload = record.get("payload")
+        owner = record.get("owner")
+        if not payload or owner is None or owner in live_owners:
+            continue
+        # Dilanjutkan dari checkpoint terakhir: job yang sudah selesai ditranskripsi tidak butuh media sumber
+        stage, error = _resume_point(job_id, payload)
+        if error:
+            continue
+        if not job_store.claim(job_id, record["owner"], PROCESS_OWNER):
+            continue
+        if payload.get("batch_id"):
+            job_batches[job_id] = payload["batch_id"]
+        try:
+            _resume_job(job_id, payload, stage, "Job dilanjutkan setelah server dimulai ulang...")
+        except QueueFullError:
+            set_status(job_id, {"status": "error", "message": "Job terhenti saat server dimulai ulang dan antrean penuh. Silakan upload ulang.", "progress": 0})
+
+def _submit_upload_job(file_path, original_filename, upload_folder, model_name, content_hash=None,
+                       decoding_profile=None):
+    """
+    Membuat status job untuk file yang sudah tersimpan lalu memasukkannya ke antrean STT.
+
+    :return: ID job.
+    :raises QueueFullError: Jika antrean penuh (status job dan file upload sudah dihapus).
+    """
+    unique_id = str(uuid.uuid4())
+    payload = {
+        "file_path": file_path,
+        "original_filename": original_filename,
+        "upload_folder": upload_folder,
+        "model_name": model_name,
+        "decoding_profile": decoding_profile,
+        "content_hash": content_hash,
+        "duration_seconds": _estimate_duration(file_path),
+        "enqueued_at": time.time()
+    }
+    # Payload disimpan bersama status agar job bisa dilanjutkan setelah restart
+    job_store.create(unique_id, {"status": "queued", "message": "Menunggu antrean...", "progress": 0},
+                     payload=payload, owner=PROCESS_OWNER)
+    try:
+        # Posisi antrean ditulis ke status lewat callback on_queue_change
+        job_scheduler.submit(unique_id, payload, payload["duration_seconds"])
+    except QueueFullError:
+        job_store.delete(unique_id)
+        status_notifier.forget(unique_id)
+        discard_predecoded(file_path)
+        artifact_store.delete(os.path.basename(file_path), file_path)
+        raise
+    return unique_id
+
+def _resolve_model_name(model_name):
+    """Nama model Whisper untuk job, atau None jika tidak ada di WHISPER_ALLOWED_MODELS."""
+    model_name = model_name or WHISPER_MODEL_NAME
+    if model_name not in current_app.config.get('WHISPER_ALLOWED_MODELS', []) and model_name != WHISPER_MODEL_NAME:
+        return None
+    return model_name
+
+def _resolve_decoding_profile(profile_name):
+    """Nama profil decoding untuk job (default dari Config), atau None jika tidak dikenal."""
+    try:
+        return resolve_decoding_profile(profile_name)["name"]
+    except ValueError:
+        return None
+
+def _upload_error_response(error):
+    """Respons JSON untuk UploadError; offset saat ini dikirim agar klien bisa melanjutkan upload."""
+    body = {"error": str(error)}
+    if error.offset is not None:
+        body["offset"] = error.offset
+    response = jsonify(body)
+    response.status_code = error.http_status
+    if error.offset is not None:
+        response.headers['Upload-Offset'] = str(error.offset)
+    return response
+
+def _estimate_duration(file_path):
+    """Durasi audio untuk urutan shortest-first (tidak dibaca jika urutan antrean FIFO)."""
+    if not job_scheduler.shortest_first_weight:
+        return None
+    return probe_duration(file_path)
+
+def _save_batch_uploads(files, upload_folder, max_files, max_uncompressed_bytes):
+    """
+    Menyimpan semua file batch ke folder upload; file ZIP diekstrak (hanya file audio/video).
+
+    File ditulis per blok langsung ke disk, dan jumlah byte hasil ekstraksi dihitung dari data
+    sebenarnya (bukan header ZIP) agar ZIP bomb terhenti di batas ukuran.
+
+    :return: Tuple (list (nama_asli, path), list nama file yang dilewati).
+    :raises ValueError: Jika jumlah file atau ukuran hasil ekstraksi melebihi batas.
+    """
+    saved, skipped = [], []
+
+    def new_path(original_filename):
+        return _new_upload_path(original_filename)
+
+    try:
+        for file in files:
+            if not file or not file.filename:
+                continue
+            original_filename = secure_filename(file.filename)
+            if original_filename.lower().endswith('.zip'):
+                zip_path = new_path(original_filename)
+                store_uploaded_file(file, zip_path)
+                try:
+                    extracted_bytes = 0
+                    with zipfile.ZipFile(zip_path) as archive:
+                        for info in archive.infolist():
+                            member_name = secure_filename(os.path.basename(info.filename))
+                            if info.is_dir() or info.filename.startswith('__MACOSX/') or not member_name:
+                                continue
+                            if not allowed_file(member_name):
+                                skipped.append(info.filename)
+                                continue
+                            if len(saved) >= max_files:
+                                raise ValueError(f"Batch melebihi {max_files} file.")
+                            member_path = new_path(member_name)
+                            saved.append((member_name, member_path))
+                            with archive.open(info) as source, open(member_path, 'wb') as target:
+                                while True:
+                                    block = source.read(1024 * 1024)
+                                    if not block:
+                                        break
+                                    extracted_bytes += len(block)
+                                    if extracted_bytes > max_uncompressed_bytes:
+                                        raise ValueError("Isi ZIP melebihi batas ukuran batch setelah diekstrak.")
+                                    target.write(block)
+                except zipfile.BadZipFile:
+                    raise ValueError(f"File ZIP tidak valid: {original_filename}")
+                finally:
+                    os.remove(zip_path)
+            elif allowed_file(original_filename):
+                if len(saved) >= max_files:
+                    raise ValueError(f"Batch melebihi {max_files} file.")
+                file_path = new_path(original_filename)
+                saved.append((original_filename, file_path))
+                store_uploaded_file(file, file_path)
+            else:
+                skipped.append(original_filename)
+    except Exception:
+        for _, file_path in saved:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        raise
+
+    for _, file_path in saved:
+        BYTES_WRITTEN_TOTAL.inc(artifact_store.register(file_path, "source", pinned=True), kind="upload")
+    return saved, skipped
+
+def _batch_status(batch_id):
+    """
+    Status gabungan batch yang dihitung dari status setiap job-nya.
+
+    :return: Tuple (dict status batch, versi), atau (None, None) jika batch tidak ada.
+        Versi adalah jumlah versi status semua job, sehingga naik setiap kali ada job yang berubah.
+    """
+    record = job_store.get_record(batch_id)
+    if record is None or not record["status"].get("batch"):
+        return None, None
+    files = []
+    version = record["version"]
+    for item in record["status"]["files"]:
+        job_record = job_store.get_record(item["job_id"])
+        job_status = job_record["status"] if job_record else {"status": "error", "message": "Status job kedaluwarsa.", "progress": 0}
+        version += job_record["version"] if job_record else 0
+        files.append(dict(
+            item,
+            status=job_status.get("status"),
+            message=job_status.get("message"),
+            progress=100 if job_status.get("status") in ("completed", "error") else job_status.get("progress", 0),
+            **{key: job_status[key] for key in ("transcript_file", "mom_json_file", "mom_txt_file") if key in job_status}
+        ))
+    completed = sum(1 for f in files if f["status"] == "completed")
+    failed = sum(1 for f in files if f["status"] == "error")
+    total = len(files)
+    if completed + failed == total:
+        overall = "completed"
+        message = f"Batch selesai: {completed} berhasil, {failed} gagal dari {total} file."
+    else:
+        overall = "queued" if all(f["status"] == "queued" for f in files) else "processing"
+        message = f"{completed + failed} dari {total} file selesai diproses..."
+    return {
+        "status": overall,
+        "message": message,
+        "progress": int(sum(f["progress"] for f in files) / total) if total else 100,
+        "total": total,
+        "completed": completed,
+        "failed": failed,
+        "skipped": record["status"].get("skipped", []),
+        "files": files
+    }, version
+
+def _queue_full_response(retry_after):
+    """Respons 429 dengan header Retry-After saat antrean job penuh."""
+    response = Response(f"Server sedang sibuk, antrean penuh. Coba lagi dalam {retry_after} detik.", status=429)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def _live_error_response(error):
+    return jsonify({"error": str(error)}), error.http_status
+
+def _set_private_cache(response):
+    """Artefak dan hasil job tidak berubah setelah ditulis: boleh di-cache browser, tidak oleh proxy bersama."""
+    response.headers['Cache-Control'] = f"private, max-age={current_app.config.get('RESULTS_MAX_AGE_SECONDS', 86400)}"
+    return response
+
+def _send_compressed_artifact(path, filename):
+    """
+    Mengirim artefak gzip: apa adanya dengan Content-Encoding: gzip jika klien mendukungnya
+    (browser mendekompresi sendiri; conditional GET dan Range berlaku atas byte gzip-nya), atau
+    didekompresi per blok di server jika tidak (conditional GET saja, tanpa Range).
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if 'gzip' in request.accept_encodings:
+        response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename, conditional=True)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        stat = os.stat(path)
+        response = Response(artifact_store.iter_decompressed(path), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # ETag berbeda dari representasi gzip karena isi byte-nya berbeda
+        response.set_etag(f"{int(stat.st_mtime)}-{stat.st_size}-identity")
+        response = response.make_conditional(request)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return _set_private_cache(response)
+
+def _build_results_body(status):
+    """
+    Isi respons /results (JSON, belum dikompresi): transkripsi, MoM JSON, dan MoM teks job yang
+    sudah selesai, atau None jika semua artefaknya sudah tidak ada (dihapus oleh retensi/kuota).
+    """
+    transcript = artifact_store.read_text(status["transcript_file"]) if status.get("transcript_file") else None
+    mom_json = artifact_store.read_text(status["mom_json_file"]) if status.get("mom_json_file") else None
+    mom_text = artifact_store.read_text(status["mom_txt_file"]) if status.get("mom_txt_file") else None
+    if transcript is None and mom_json is None and mom_text is None:
+        return None
+    return json.dumps({
+        "transcript": transcript,
+        "mom": json.loads(mom_json) if mom_json is not None else None,
+        "mom_text": mom_text,
+        "files": {
+            "transcript_file": status.get("transcript_file"),
+            "mom_json_file": status.get("mom_json_file"),
+            "mom_txt_file": status.get("mom_txt_file")
+        }
+    }, ensure_ascii=False).encode('utf-8')
 
 # --- Inisialisasi Routes ---
 def init_routes(app):
+    global job_scheduler, job_store, upload_store, artifact_store, live_sessions, results_cache
     bp = Blueprint('main', __name__)
 
+    # File multipart ditulis langsung ke folder upload sambil di-hash (tanpa spool di /tmp)
+    app.request_class = HashingUploadRequest
+
+    job_store = create_job_store(app.config)
+    artifact_store = create_artifact_store(app.config)
+    if app.config.get('ARTIFACT_ADOPT_EXISTING', False):
+        adopted = artifact_store.adopt_flat_files(app.config['UPLOAD_FOLDER'])
+        if adopted:
+            logger.info(f"{adopted} file lama di folder upload dicatat di artifact store.")
+    upload_store = ResumableUploadStore(
+        app.config['UPLOAD_FOLDER'],
+        max_bytes=app.config.get('UPLOAD_MAX_MB', 8192) * 1024 * 1024,
+        ttl_seconds=app.config.get('UPLOAD_SESSION_TTL_SECONDS', 24 * 3600)
+    )
+
+    results_cache = CompressedResponseCache(max_entries=app.config.get('RESULTS_CACHE_MAX_ENTRIES', 64))
+
+    live_sessions = LiveSessionManager(
+        max_sessions=app.config.get('LIVE_MAX_SESSIONS', 2),
+        idle_timeout_seconds=app.config.get('LIVE_IDLE_TIMEOUT_SECONDS', 300),
+        window_seconds=app.config.get('LIVE_WINDOW_SECONDS', 30),
+        step_seconds=app.config.get('LIVE_STEP_SECONDS', 5),
+        unstable_tail_seconds=app.config.get('LIVE_UNSTABLE_TAIL_SECONDS', 5),
+        chunk_tokens=app.config.get('MOM_CHUNK_TOKENS', 4000)
+    )
+
+    job_scheduler = JobScheduler(
+        stt_handler=run_stt_stage,
+        llm_handler=run_mom_stage,
+        stt_workers=app.config.get('STT_WORKERS', 1),
+        llm_workers=app.config.get('LLM_WORKERS', 2),
+        max_queue_size=app.config.get('JOB_QUEUE_MAXSIZE', 20),
+        retry_after=app.config.get('JOB_RETRY_AFTER_SECONDS', 30),
+        on_queue_change=_publish_queue_positions,
+        shortest_first_weight=app.config.get('JOB_SHORTEST_FIRST_WEIGHT', 0.0)
+    )
+    job_scheduler.start()
+    lease_seconds = app.config.get('JOB_OWNER_LEASE_SECONDS', 60)
+    job_store.renew_lease(PROCESS_OWNER)
+    _recover_interrupted_jobs(lease_seconds)
+    threading.Thread(
+        target=_heartbeat_forever,
+        args=(app.config.get('JOB_OWNER_HEARTBEAT_SECONDS', 15), lease_seconds),
+        name="job-owner-heartbeat",
+        daemon=True
+    ).start()
+    threading.Thread(
+        target=_evict_expired_jobs_forever,
+        args=(app.config.get('JOB_EVICT_INTERVAL_SECONDS', 600),),
+        name="job-store-evictor",
+        daemon=True
+    ).start()
+
     @bp.route('/')
     def index():
-        return render_template('index.html')
+        return render_template('index.html',
+                               whisper_models=current_app.config.get('WHISPER_ALLOWED_MODELS', []),
+                               default_model=WHISPER_MODEL_NAME,
+                               decoding_profiles=list(DECODING_PROFILES),
+                               default_profile=resolve_decoding_profile()["name"])
+
+    @bp.route('/health')
+    def health():
+        """Health check ringan: tidak memuat model, hanya melaporkan model yang sudah ada di memori."""
+        return {
+            "status": "ok",
+            "stt_backend": get_stt_backend().cache_tag,
+            "loaded_models": get_stt_backend().loaded_models(),
+            "queue_full": job_scheduler.is_full()
+        }
+
+    @bp.route('/metrics')
+    def metrics():
+        """Metrik pipeline dalam format teks Prometheus (antrean, durasi tahap, Whisper, LLM, byte ditulis)."""
+        QUEUE_DEPTH.set(job_scheduler.pending_count())
+        ARTIFACT_BYTES.set(artifact_store.total_bytes())
+        LIVE_SESSIONS.set(live_sessions.active_count())
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE_LATEST)
+
+    @bp.route('/warmup', methods=['POST'])
+    def warmup():
+        """Memuat model Whisper di latar belakang (semua model di WHISPER_PRELOAD_MODELS, atau ?model=...)."""
+        requested = request.args.getlist('model')
+        allowed = current_app.config.get('WHISPER_ALLOWED_MODELS', [])
+        invalid = [m for m in requested if m not in allowed]
+        if invalid:
+            return f"Model tidak diizinkan: {', '.join(invalid)}", 400
+        threading.Thread(target=warm_up_models, args=(requested or None,), daemon=True).start()
+        return {"status": "warming_up", "models": requested or current_app.config.get('WHISPER_PRELOAD_MODELS') or [WHISPER_MODEL_NAME]}, 202
 
     @bp.route('/process_file', methods=['POST'])
     def process_file():
         """Route untuk menangani upload file dan memulai proses latar belakang."""
-        global processing_status
         if 'file' not in request.files:
             return "No file part in the request", 400
         
@@ -212,61 +751,579 @@ def init_routes(app):
             return "No file selected", 400
 
         if file and allowed_file(file.filename):
+            # Tolak lebih awal jika antrean penuh, sebelum file ditulis ke disk
+            if job_scheduler.is_full():
+                return _queue_full_response(job_scheduler.estimate_retry_after())
+
+            # Model Whisper bisa dipilih per job (harus ada di WHISPER_ALLOWED_MODELS)
+            model_name = _resolve_model_name(request.form.get('model'))
+            if model_name is None:
+                return f"Model Whisper '{request.form.get('model')}' tidak diizinkan", 400
+            # Profil decoding ('fast'/'balanced'/'accurate') juga bisa dipilih per job
+            decoding_profile = _resolve_decoding_profile(request.form.get('profile'))
+            if decoding_profile is None:
+                return f"Profil decoding '{request.form.get('profile')}' tidak dikenal", 400
+
             original_filename = secure_filename(file.filename)
-            unique_id = str(uuid.uuid4())
-            
-            processing_status[unique_id] = {"status": "starting", "message": "Memulai proses...", "progress": 0}
 
-            unique_filename = generate_unique_filename(original_filename)
             # --- PERUBAHAN: Dapatkan UPLOAD_FOLDER dari current_app SEBELUM memulai thread ---
             upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            file_path = os.path.join(upload_folder, unique_filename)
+            file_path = _new_upload_path(original_filename)
             
-            file.save(file_path)
+            # File multipart sudah ditulis ke folder upload (dan di-hash) saat request dibaca;
+            # di sini hanya dipindahkan ke nama akhirnya
+            content_hash = store_uploaded_file(file, file_path)
+            # Media sumber di-pin sampai transkripsi selesai agar tidak terhapus oleh kuota
+            BYTES_WRITTEN_TOTAL.inc(artifact_store.register(file_path, "source", pinned=True), kind="upload")
             logger.info(f"File diupload dan disimpan sementara di: {file_path}")
 
             # --- PERUBAHAN: Oper upload_folder sebagai argumen ---
-            thread = threading.Thread(target=background_process, args=(file_path, unique_id, original_filename, upload_folder))
-            thread.start()
+            # Job dimasukkan ke antrean terbatas, bukan satu thread per upload
+            try:
+                unique_id = _submit_upload_job(file_path, original_filename, upload_folder, model_name, content_hash,
+                                               decoding_profile)
+            except QueueFullError as qfe:
+                return _queue_full_response(qfe.retry_after)
             
             return redirect(url_for('main.mom_result', process_id=unique_id))
         else:
             return "File type not allowed", 400
 
+    @bp.route('/uploads', methods=['POST'])
+    def create_upload():
+        """
+        Memulai upload bertahap (resumable). Body JSON/form: filename, size (opsional), model (opsional).
+
+        Klien lalu mengirim isi file per potongan dengan PATCH /uploads/<id> (header Upload-Offset),
+        bisa menanyakan offset terakhir dengan HEAD /uploads/<id> setelah koneksi putus, dan
+        menutupnya dengan POST /uploads/<id>/complete untuk memulai job.
+        """
+        data = request.get_json(silent=True) or request.form
+        filename = secure_filename(data.get('filename') or '')
+        if not filename or not allowed_file(filename):
+            return jsonify({"error": "File type not allowed"}), 400
+        model_name = _resolve_model_name(data.get('model'))
+        if model_name is None:
+            return jsonify({"error": f"Model Whisper '{data.get('model')}' tidak diizinkan"}), 400
+        decoding_profile = _resolve_decoding_profile(data.get('profile'))
+        if decoding_profile is None:
+            return jsonify({"error": f"Profil decoding '{data.get('profile')}' tidak dikenal"}), 400
+        try:
+            info = upload_store.create(filename, total_size=data.get('size'),
+                                       metadata={"model_name": model_name, "decoding_profile": decoding_profile})
+        except (TypeError, ValueError):
+            return jsonify({"error": "Ukuran file tidak valid"}), 400
+        except UploadError as ue:
+            return _upload_error_response(ue)
+
+        upload_url = url_for('main.upload_chunk', upload_id=info["upload_id"])
+        response = jsonify(dict(info, upload_url=upload_url,
+                                chunk_size=current_app.config.get('UPLOAD_CHUNK_MB', 8) * 1024 * 1024))
+        response.status_code = 201
+        response.headers['Location'] = upload_url
+        response.headers['Upload-Offset'] = str(info["offset"])
+        return response
+
+    @bp.route('/uploads/<upload_id>', methods=['HEAD', 'GET', 'PATCH', 'DELETE'])
+    def upload_chunk(upload_id):
+        """
+        HEAD/GET: offset upload saat ini (header Upload-Offset). PATCH: menambahkan satu potongan
+        mentah (application/offset+octet-stream) di offset dari header Upload-Offset; body request
+        dibaca per blok langsung ke disk. DELETE: membatalkan upload.
+        """
+        try:
+            if request.method == 'DELETE':
+                upload_store.abort(upload_id)
+                decoder = upload_decoders.pop(upload_id, None)
+                if decoder is not None:
+                    decoder.abort()
+                return "", 204
+
+            if request.method in ('HEAD', 'GET'):
+                info = upload_store.info(upload_id)
+                response = jsonify(info)
+                response.headers['Upload-Offset'] = str(info["offset"])
+                if info.get("total_size") is not None:
+                    response.headers['Upload-Length'] = str(info["total_size"])
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+
+            try:
+                offset = int(request.headers.get('Upload-Offset', ''))
+            except ValueError:
+                return jsonify({"error": "Header Upload-Offset wajib diisi"}), 400
+
+            # Dekode audio dimulai bersama potongan pertama untuk format yang bisa dibaca berurutan,
+            # selama PCM yang sudah ditahan di memori belum mencapai batas
+            max_decode_bytes = current_app.config.get('UPLOAD_PREFIX_DECODE_MAX_MB', 512) * 1024 * 1024
+            if (offset == 0 and upload_id not in upload_decoders
+                    and current_app.config.get('UPLOAD_PREFIX_DECODE', False)
+                    and predecoded_bytes() < max_decode_bytes):
+                info = upload_store.info(upload_id)
+                if info["filename"].rsplit('.', 1)[-1].lower() in STREAMABLE_EXTENSIONS:
+                    upload_decoders[upload_id] = PrefixDecoder(
+                        upload_store.part_path(upload_id),
+                        idle_timeout=current_app.config.get('UPLOAD_SESSION_TTL_SECONDS', 24 * 3600),
+                        max_total_bytes=max_decode_bytes
+                    ).start()
+
+            try:
+                new_offset = upload_store.append(
+                    upload_id, offset, request.stream,
+                    max_chunk_bytes=current_app.config.get('UPLOAD_CHUNK_MAX_MB', 64) * 1024 * 1024
+                )
+            except UploadError as ue:
+                # Pengumpan dekode mungkin sudah meneruskan byte yang dipotong kembali ke ffmpeg, sehingga
+                # hasil dekodenya tidak lagi cocok dengan file; audio didekode ulang setelah upload selesai
+                if ue.truncated:
+                    decoder = upload_decoders.pop(upload_id, None)
+                    if decoder is not None:
+                        decoder.abort()
+                raise
+            BYTES_WRITTEN_TOTAL.inc(new_offset - offset, kind="upload")
+            response = jsonify({"upload_id": upload_id, "offset": new_offset})
+            response.headers['Upload-Offset'] = str(new_offset)
+            return response
+        except UploadError as ue:
+            return _upload_error_response(ue)
+
+    @bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+    def complete_upload(upload_id):
+        """
+        Menutup upload bertahap dan memasukkan file ke antrean STT.
+
+        Hash SHA-256 yang dihitung selama upload diteruskan ke job, sehingga transkripsi untuk isi
+        yang sama diambil dari cache tanpa membaca ulang file. Jika audio sudah didekode selama
+        upload, worker STT memakai hasil itu.
+        """
+        if job_scheduler.is_full():
+            return _queue_full_response(job_scheduler.estimate_retry_after())
+
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        try:
+            info = upload_store.info(upload_id)
+            file_path = _new_upload_path(info["filename"])
+            info, content_hash = upload_store.complete(upload_id, file_path)
+        except UploadError as ue:
+            return _upload_error_response(ue)
+        artifact_store.register(file_path, "source", pinned=True)
+        logger.info(f"Upload bertahap {upload_id} selesai ({info['offset']} byte), disimpan di: {file_path}")
+
+        decoder = upload_decoders.pop(upload_id, None)
+        if decoder is not None:
+            decoder.finish(info["offset"])
+            register_predecoded(file_path, decoder)
+
+        try:
+            unique_id = _submit_upload_job(file_path, info["filename"], upload_folder,
+                                           info["metadata"].get("model_name") or WHISPER_MODEL_NAME, content_hash,
+                                           info["metadata"].get("decoding_profile"))
+        except QueueFullError as qfe:
+            return _queue_full_response(qfe.retry_after)
+        return jsonify({
+            "process_id": unique_id,
+            "content_hash": content_hash,
+            "result_url": url_for('main.mom_result', process_id=unique_id)
+        }), 202
+
+    @bp.route('/live', methods=['GET'])
+    def live_page():
+        """Halaman rapat langsung: merekam mikrofon dan menampilkan transkripsi bergulir."""
+        return render_template('live.html',
+                               whisper_models=current_app.config.get('WHISPER_ALLOWED_MODELS', []),
+                               default_model=WHISPER_MODEL_NAME,
+                               decoding_profiles=list(DECODING_PROFILES),
+                               default_profile=resolve_decoding_profile()["name"])
+
+    @bp.route('/live', methods=['POST'])
+    def create_live_session():
+        """
+        Memulai rapat langsung. Body JSON/form: model (opsional), format (opsional, default
+        'pcm_s16le' = PCM 16-bit mono 16 kHz; atau format kontainer seperti 'webm'/'ogg').
+
+        Klien lalu mengirim audio dengan POST /live/<id>/audio (boleh banyak POST kecil atau satu
+        POST chunked yang panjang), mengikuti transkripsi lewat SSE /stream_live/<id>, dan menutup
+        rapat dengan POST /live/<id>/finish untuk membuat MoM.
+        """
+        data = request.get_json(silent=True) or request.form
+        audio_format = (data.get('format') or 'pcm_s16le').lower()
+        if audio_format not in LIVE_AUDIO_FORMATS:
+            return jsonify({"error": f"Format audio tidak didukung: {audio_format}"}), 400
+        model_name = _resolve_model_name(data.get('model'))
+        if model_name is None:
+            return jsonify({"error": f"Model Whisper '{data.get('model')}' tidak diizinkan"}), 400
+        decoding_profile = _resolve_decoding_profile(data.get('profile'))
+        if decoding_profile is None:
+            return jsonify({"error": f"Profil decoding '{data.get('profile')}' tidak dikenal"}), 400
+        try:
+            session = live_sessions.create(model_name, audio_format, on_change=status_notifier.publish,
+                                           decoding_profile=decoding_profile)
+        except LiveSessionError as lse:
+            return _live_error_response(lse)
+        # Model dimuat sekarang agar jendela pertama tidak menunggu model dimuat
+        threading.Thread(target=warm_up_models, args=([model_name],), daemon=True).start()
+        logger.info(f"Rapat langsung {session.session_id} dimulai (model '{model_name}', profil '{decoding_profile}', "
+                    f"format '{audio_format}').")
+        return jsonify({
+            "session_id": session.session_id,
+            "format": audio_format,
+            "sample_rate": SAMPLE_RATE,
+            "audio_url": url_for('main.live_audio', session_id=session.session_id),
+            "stream_url": url_for('main.stream_live', session_id=session.session_id),
+            "finish_url": url_for('main.finish_live_session', session_id=session.session_id)
+        }), 201
+
+    @bp.route('/live/<session_id>/audio', methods=['POST'])
+    def live_audio(session_id):
+        """Menerima audio rapat langsung; body dibaca per blok dan langsung diteruskan ke dekoder."""
+        try:
+            session = live_sessions.get(session_id)
+            received = 0
+            for block in iter(lambda: request.stream.read(64 * 1024), b''):
+                session.feed(block)
+                received += len(block)
+        except LiveSessionError as lse:
+            return _live_error_response(lse)
+        return jsonify({"session_id": session_id, "received_bytes": received,
+                        "duration_seconds": session.duration_seconds()})
+
+    @bp.route('/live/<session_id>', methods=['DELETE'])
+    def abort_live_session(session_id):
+        """Membatalkan rapat langsung tanpa membuat MoM."""
+        session = live_sessions.remove(session_id)
+        if session is None:
+            return jsonify({"error": "Sesi rapat langsung tidak ditemukan atau sudah kedaluwarsa."}), 404
+        session.abort()
+        status_notifier.forget(session_id)
+        return "", 204
+
+    @bp.route('/live/<session_id>/finish', methods=['POST'])
+    def finish_live_session(session_id):
+        """
+        Menutup rapat langsung dan membuat job MoM. Sisa audio ditranskripsi dan MoM parsial yang
+        masih berjalan ditunggu di latar belakang; hasilnya bisa diikuti di halaman hasil biasa.
+        """
+        try:
+            session = live_sessions.get(session_id)
+        except LiveSessionError as lse:
+            return _live_error_response(lse)
+        if session.status != "live":
+            return jsonify({"error": f"Sesi rapat langsung sudah {session.status}."}), 409
+
+        unique_id = str(uuid.uuid4())
+        job_store.create(unique_id, {"status": "processing", "message": "Menyelesaikan transkripsi rapat...",
+                                     "progress": 50},
+                         payload={"upload_folder": current_app.config['UPLOAD_FOLDER']}, owner=PROCESS_OWNER)
+        threading.Thread(target=_finish_live_session, args=(session, unique_id, current_app.config['UPLOAD_FOLDER']),
+                         name=f"live-finish-{session_id[:8]}", daemon=True).start()
+        return jsonify({
+            "process_id": unique_id,
+            "result_url": url_for('main.mom_result', process_id=unique_id)
+        }), 202
+
+    @bp.route('/stream_live/<session_id>')
+    def stream_live(session_id):
+        """
+        Transkripsi bergulir rapat langsung lewat SSE: setiap event membawa segmen final baru,
+        teks sementara, dan jumlah MoM parsial. `id` event adalah jumlah segmen final yang sudah
+        dikirim, sehingga browser yang tersambung ulang hanya menerima segmen yang belum ia lihat.
+        """
+        heartbeat_seconds = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+        try:
+            segments_sent = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            segments_sent = 0
+
+        def generate():
+            nonlocal segments_sent
+            yield "retry: 3000\n\n"
+            last_yield = time.monotonic()
+            last_state = None
+            while True:
+                notifier_version = status_notifier.version(session_id)
+                try:
+                    snapshot = live_sessions.get(session_id).snapshot(segments_from=segments_sent)
+                except LiveSessionError as lse:
+                    yield f"data: {json.dumps({'status': 'error', 'error': str(lse)})}\n\n"
+                    break
+
+                state = (snapshot["segments_total"], snapshot["tentative_text"], snapshot["partial_sections"],
+                         snapshot["partial_sections_pending"], snapshot["status"])
+                if state != last_state:
+                    yield f"id: {snapshot['segments_total']}\ndata: {json.dumps(snapshot)}\n\n"
+                    segments_sent = snapshot["segments_total"]
+                    last_state = state
+                    last_yield = time.monotonic()
+
+                if snapshot["status"] in ("finished", "error", "aborted"):
+                    break
+
+                status_notifier.wait_for_change(session_id, notifier_version, timeout=heartbeat_seconds)
+                if time.monotonic() - last_yield >= heartbeat_seconds:
+                    yield ": heartbeat\n\n"
+                    last_yield = time.monotonic()
+
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
     @bp.route('/mom_result')
     def mom_result():
         """Route untuk menampilkan halaman hasil dengan progress bar."""
         process_id = request.args.get('process_id')
-        if not process_id or process_id not in processing_status:
+        if not process_id or job_store.get(process_id) is None:
             return "Invalid or expired process ID", 404
         return render_template('mom_result.html', process_id=process_id)
 
+    @bp.route('/retry/<process_id>', methods=['POST'])
+    def retry_job(process_id):
+        """
+        Mengulang job yang gagal dari tahap pipeline pertama yang belum selesai: jika hanya tahap
+        LLM yang gagal (mis. rate limit), transkripsi dari checkpoint dipakai ulang tanpa dekode dan
+        transkripsi lagi.
+        """
+        record = job_store.get_record(process_id)
+        if record is None:
+            return jsonify({"error": "Process ID tidak ditemukan atau sudah kedaluwarsa."}), 404
+        if record["status"].get("status") != "error":
+            return jsonify({"error": "Hanya job yang gagal yang bisa diulang."}), 409
+        payload = record.get("payload")
+        if not payload:
+            return jsonify({"error": "Job ini tidak menyimpan data untuk diulang."}), 409
+        stage, error = _resume_point(process_id, payload)
+        if error:
+            return jsonify({"error": error}), 410
+        if stage is not None and stage.queue == "stt" and job_scheduler.is_full():
+            return _queue_full_response(job_scheduler.estimate_retry_after())
+
+        # Transisi atomik agar dua permintaan retry bersamaan tidak menjalankan job dua kali
+        failed_status = record["status"]
+        if not job_store.transition(process_id, ("error",), {"status": "queued", "message": "Menyiapkan ulang job...", "progress": 0}):
+            return jsonify({"error": "Job sedang diulang."}), 409
+        job_store.claim(process_id, record["owner"], PROCESS_OWNER)
+        if payload.get("batch_id"):
+            job_batches[process_id] = payload["batch_id"]
+        try:
+            stage_label = f"tahap '{stage.name}'" if stage else "status akhir"
+            _resume_job(process_id, payload, stage, f"Job diulang dari {stage_label}...")
+        except QueueFullError as qfe:
+            set_status(process_id, failed_status)
+            return _queue_full_response(qfe.retry_after)
+        return jsonify({
+            "process_id": process_id,
+            "resume_stage": stage.name if stage else None,
+            "result_url": url_for('main.mom_result', process_id=process_id)
+        }), 202
+
+    @bp.route('/results/<process_id>')
+    def results(process_id):
+        """
+        Semua hasil job yang sudah selesai (transkripsi, MoM JSON, dan MoM teks) dalam satu respons
+        JSON, dikompresi br/gzip sesuai Accept-Encoding, dengan ETag kuat per encoding sehingga
+        halaman hasil yang dibuka ulang cukup menerima 304 (atau langsung dari cache browser).
+        """
+        status = job_store.get(process_id)
+        if status is None:
+            return jsonify({"error": "Process ID not found or expired."}), 404
+        if status.get("status") != "completed":
+            return jsonify({"error": "Job belum selesai.", "status": status.get("status"),
+                            "message": status.get("message")}), 409
+
+        encoding = choose_encoding(request.accept_encodings)
+        body, digest = results_cache.get(process_id, encoding, lambda: _build_results_body(status))
+        if body is None:
+            return jsonify({"error": "Hasil job ini sudah dihapus dari server."}), 410
+
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(f"{digest}-{encoding or 'identity'}")
+        return _set_private_cache(response).make_conditional(request)
+
+    @bp.route('/process_batch', methods=['POST'])
+    def process_batch():
+        """
+        Route untuk upload banyak file sekaligus (beberapa file dan/atau ZIP) sebagai satu batch.
+
+        Setiap file menjadi job tersendiri di antrean STT (file pendek didahulukan jika
+        JOB_SHORTEST_FIRST_WEIGHT > 0), dengan satu halaman progres gabungan.
+        """
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files or all(not f.filename for f in files):
+            return "No files selected", 400
+
+        if job_scheduler.is_full():
+            return _queue_full_response(job_scheduler.estimate_retry_after())
+
+        model_name = _resolve_model_name(request.form.get('model'))
+        if model_name is None:
+            return f"Model Whisper '{request.form.get('model')}' tidak diizinkan", 400
+        decoding_profile = _resolve_decoding_profile(request.form.get('profile'))
+        if decoding_profile is None:
+            return f"Profil decoding '{request.form.get('profile')}' tidak dikenal", 400
+
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(upload_folder, exist_ok=True)
+        try:
+            saved, skipped = _save_batch_uploads(
+                files, upload_folder,
+                max_files=current_app.config.get('BATCH_MAX_FILES', 50),
+                max_uncompressed_bytes=current_app.config.get('BATCH_MAX_UNCOMPRESSED_MB', 4096) * 1024 * 1024
+            )
+        except ValueError as ve:
+            return str(ve), 400
+        if not saved:
+            return "Tidak ada file audio/video yang didukung di dalam batch", 400
+
+        batch_id = str(uuid.uuid4())
+        jobs = []
+        for original_filename, file_path in saved:
+            unique_id = str(uuid.uuid4())
+            payload = {
+                "file_path": file_path,
+                "original_filename": original_filename,
+                "upload_folder": upload_folder,
+                "model_name": model_name,
+                "decoding_profile": decoding_profile,
+                "batch_id": batch_id,
+                "duration_seconds": _estimate_duration(file_path),
+                "enqueued_at": time.time()
+            }
+            jobs.append((unique_id, payload, payload["duration_seconds"]))
+
+        job_store.create(batch_id, {
+            "status": "batch",
+            "batch": True,
+            "model_name": model_name,
+            "decoding_profile": decoding_profile,
+            "skipped": skipped,
+            "files": [{"job_id": unique_id, "filename": payload["original_filename"],
+                       "duration_seconds": payload["duration_seconds"]} for unique_id, payload, _ in jobs]
+        }, owner=PROCESS_OWNER)
+        for unique_id, payload, _ in jobs:
+            job_batches[unique_id] = batch_id
+            job_store.create(unique_id, {"status": "queued", "message": "Menunggu antrean...", "progress": 0},
+                             payload=payload, owner=PROCESS_OWNER)
+        try:
+            job_scheduler.submit_many(jobs)
+        except QueueFullError as qfe:
+            for unique_id, payload, _ in jobs:
+                job_batches.pop(unique_id, None)
+                job_store.delete(unique_id)
+                status_notifier.forget(unique_id)
+                artifact_store.delete(os.path.basename(payload["file_path"]), payload["file_path"])
+            job_store.delete(batch_id)
+            return _queue_full_response(qfe.retry_after)
+
+        # Model dimuat sekarang (sambil file lain menunggu) dan tetap di memori selama batch berjalan
+        threading.Thread(target=warm_up_models, args=([model_name],), daemon=True).start()
+        logger.info(f"Batch {batch_id}: {len(jobs)} file masuk antrean, {len(skipped)} file dilewati.")
+        return redirect(url_for('main.batch_result', batch_id=batch_id))
+
+    @bp.route('/batch_result')
+    def batch_result():
+        """Route untuk menampilkan halaman progres gabungan dan hasil per file sebuah batch."""
+        batch_id = request.args.get('batch_id')
+        if not batch_id or _batch_status(batch_id)[0] is None:
+            return "Invalid or expired batch ID", 404
+        return render_template('batch_result.html', batch_id=batch_id)
+
+    @bp.route('/stream_batch_status/<batch_id>')
+    def stream_batch_status(batch_id):
+        """Status gabungan batch lewat SSE; dikirim ulang setiap kali salah satu job berubah."""
+        heartbeat_seconds = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+        wait_seconds = heartbeat_seconds
+        if job_store.shared_across_processes:
+            wait_seconds = min(heartbeat_seconds, current_app.config.get('JOB_STORE_POLL_SECONDS', 2))
+        try:
+            last_sent_version = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_sent_version = None
+
+        def generate():
+            nonlocal last_sent_version
+            yield "retry: 3000\n\n"
+            last_yield = time.monotonic()
+            while True:
+                notifier_version = status_notifier.version(batch_id)
+                batch_status, version = _batch_status(batch_id)
+                if batch_status is None:
+                    yield f"data: {json.dumps({'status': 'error', 'message': 'Batch ID not found or expired.', 'progress': 0})}\n\n"
+                    break
+
+                if version != last_sent_version:
+                    yield f"id: {version}\ndata: {json.dumps(batch_status)}\n\n"
+                    last_sent_version = version
+                    last_yield = time.monotonic()
+
+                if batch_status["status"] == "completed":
+                    break
+
+                status_notifier.wait_for_change(batch_id, notifier_version, timeout=wait_seconds)
+                if time.monotonic() - last_yield >= heartbeat_seconds:
+                    yield ": heartbeat\n\n"
+                    last_yield = time.monotonic()
+
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
     @bp.route('/stream_status/<process_id>')
     def stream_status(process_id):
-        """Route untuk streaming status proses menggunakan Server-Sent Events (SSE)."""
+        """
+        Route untuk streaming status proses menggunakan Server-Sent Events (SSE).
+
+        Generator hanya bangun saat status job berubah (lewat StatusNotifier), dengan komentar
+        heartbeat berkala agar koneksi tidak diputus proxy. Setiap event membawa `id` berupa
+        versi status, sehingga browser yang tersambung ulang (header Last-Event-ID) tidak
+        menerima ulang status yang sudah ia lihat.
+        """
+        heartbeat_seconds = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+        # Perubahan dari proses server lain tidak memicu notifier lokal, jadi periksa ulang berkala
+        wait_seconds = heartbeat_seconds
+        if job_store.shared_across_processes:
+            wait_seconds = min(heartbeat_seconds, current_app.config.get('JOB_STORE_POLL_SECONDS', 2))
+        try:
+            last_sent_version = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_sent_version = None
+
         def generate():
-            global processing_status
-            last_status = None
+            nonlocal last_sent_version
+            # Browser menunggu 3 detik sebelum tersambung ulang jika koneksi terputus
+            yield "retry: 3000\n\n"
+            last_yield = time.monotonic()
             while True:
-                if process_id in processing_status:
-                    current_status = processing_status[process_id]
-                    if current_status != last_status:
-                        # Gunakan text/plain untuk kesederhanaan, atau text/event-stream untuk MIME resmi
-                        yield f"data: {json.dumps(current_status)}\n\n" 
-                        last_status = current_status
-                    
-                    if current_status.get("status") in ["completed", "error"]:
-                        # Opsional: Hapus status setelah selesai untuk demo
-                        # del processing_status[process_id] 
-                        break
-                else:
+                # Versi notifier diambil sebelum membaca store agar tidak ada perubahan yang terlewat
+                notifier_version = status_notifier.version(process_id)
+                record = job_store.get_record(process_id)
+                if record is None:
                     yield f"data: {json.dumps({'status': 'error', 'message': 'Process ID not found or expired.', 'progress': 0})}\n\n"
                     break
-                time.sleep(1) # Tunggu 1 detik sebelum cek lagi
+
+                current_status = record["status"]
+                if record["version"] != last_sent_version:
+                    # Gunakan text/plain untuk kesederhanaan, atau text/event-stream untuk MIME resmi
+                    yield f"id: {record['version']}\ndata: {json.dumps(current_status)}\n\n"
+                    last_sent_version = record["version"]
+                    last_yield = time.monotonic()
+
+                if current_status.get("status") in ["completed", "error"]:
+                    break
+
+                status_notifier.wait_for_change(process_id, notifier_version, timeout=wait_seconds)
+                if time.monotonic() - last_yield >= heartbeat_seconds:
+                    yield ": heartbeat\n\n"
+                    last_yield = time.monotonic()
 
         # --- PERUBAHAN: Gunakan mimetype text/event-stream untuk SSE ---
-        return Response(generate(), mimetype='text/event-stream')
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no' # Matikan buffering nginx agar event langsung terkirim
+        return response
 
     # --- PERUBAHAN: Fungsi download_file dengan penanganan error yang lebih baik ---
     @bp.route('/download/<filename>')
@@ -280,15 +1337,24 @@ def init_routes(app):
             upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
             logger.debug(f"Menggunakan folder upload: {upload_folder}")
 
-            # Bangun path lengkap file
-            file_path = os.path.join(upload_folder, safe_filename)
+            # Cari di artifact store (layout shard). File lama langsung di folder upload hanya dilayani
+            # untuk nama transkripsi/MoM, bukan file lain di folder itu (database, sesi upload, ...)
+            artifact = artifact_store.lookup(safe_filename)
+            if artifact is None and artifact_kind(safe_filename) not in LEGACY_DOWNLOAD_KINDS:
+                logger.warning(f"File tidak dikenal artifact store, tidak dilayani: {safe_filename}")
+                return "File not found", 404
+            file_path = artifact["path"] if artifact else os.path.join(upload_folder, safe_filename)
             logger.debug(f"Path lengkap file yang akan diunduh: {file_path}")
 
+            if artifact and artifact["compressed"]:
+                logger.info(f"File terkompresi ditemukan, mengirim file: {file_path}")
+                return _send_compressed_artifact(file_path, safe_filename)
+
             # Periksa apakah file benar-benar ada
             if os.path.exists(file_path):
                 logger.info(f"File ditemukan, mengirim file: {file_path}")
-                # Kirim file untuk diunduh
-                return send_file(file_path, as_attachment=True)
+                # Kirim file untuk diunduh (If-None-Match/If-Modified-Since -> 304, header Range -> 206)
+                return _set_private_cache(send_file(file_path, as_attachment=True, conditional=True, etag=True))
             else:
                 logger.warning(f"File tidak ditemukan di path: {file_path}")
                 # Kembalikan error 404 jika file tidak ada
@@ -0,0 +1,56 @@
+# app/status_notifier.py
+import threading
+
+
+class StatusNotifier:
+    """
+    Notifikasi perubahan status job berbasis condition variable (tanpa polling).
+
+    Setiap job punya nomor versi yang naik setiap kali statusnya berubah. Penonton
+    (misalnya koneksi SSE) menunggu sampai versi berubah, sehingga hanya bangun saat
+    ada perubahan atau saat batas waktu heartbeat tercapai.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conditions = {}  # job_id -> threading.Condition
+        self._versions = {}    # job_id -> nomor versi terakhir
+
+    def _condition(self, job_id):
+        with self._lock:
+            condition = self._conditions.get(job_id)
+            if condition is None:
+                condition = self._conditions[job_id] = threading.Condition()
+            return condition
+
+    def publish(self, job_id):
+        """Menandai status job berubah dan membangunkan semua penonton job tersebut."""
+        condition = self._condition(job_id)
+        with condition:
+            with self._lock:
+                version = self._versions.get(job_id, 0) + 1
+                self._versions[job_id] = version
+            condition.notify_all()
+        return version
+
+    def version(self, job_id):
+        with self._lock:
+            return self._versions.get(job_id, 0)
+
+    def wait_for_change(self, job_id, known_version, timeout):
+        """
+        Menunggu sampai versi status job berbeda dari `known_version`.
+
+        :return: Versi terbaru, atau None jika batas waktu habis tanpa perubahan.
+        """
+        condition = self._condition(job_id)
+        with condition:
+            changed = condition.wait_for(lambda: self.version(job_id) != known_version, timeout=timeout)
+        return self.version(job_id) if changed else None
+
+    def forget(self, job_id):
+        """Membangunkan penonton terakhir lalu menghapus state notifikasi job (dipanggil saat job dibuang)."""
+        self.publish(job_id)
+        with self._lock:
+            self._conditions.pop(job_id, None)
+            self._versions.pop(job_id, None)
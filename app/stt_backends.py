@@ -0,0 +1,237 @@
+# app/stt_backends.py
+import logging
+import threading
+from functools import partial
+
+from app.config import Config
+from app.chunked_stt_utils import transcribe_in_helper
+from app.decoding_profiles import resolve_decoding_profile, whisper_decode_options, faster_whisper_options
+from app.model_registry import ESTIMATED_MODEL_SIZE_MB, ModelRegistry, get_model_registry, load_whisper_model
+
+logger = logging.getLogger(__name__)
+
+# Perkiraan rasio ukuran bobot terhadap fp32 per tipe komputasi
+_COMPUTE_TYPE_SIZE_FACTOR = {
+    'int8': 0.25, 'int8_float32': 0.25, 'int8_float16': 0.25, 'int8_bfloat16': 0.25,
+    'float16': 0.5, 'bfloat16': 0.5, 'float32': 1.0,
+}
+
+
+class STTBackend:
+    """
+    Antarmuka mesin transkripsi.
+
+    Setiap backend mengembalikan dictionary dengan bentuk yang sama seperti hasil
+    `whisper.transcribe()`: `text`, `segments` (id, seek, start, end, text, tokens, temperature,
+    avg_logprob, compression_ratio, no_speech_prob) dan `language`, sehingga
+    `format_whisper_result`, cache, dan pipeline MoM tidak perlu tahu backend mana yang dipakai.
+    """
+
+    name = None
+
+    @property
+    def device(self):
+        raise NotImplementedError
+
+    @property
+    def cache_tag(self):
+        """Identitas backend untuk kunci cache (hasil backend berbeda tidak boleh tertukar)."""
+        return self.name
+
+    def load(self, model_name):
+        """Memuat (atau mengambil dari memori) model `model_name`."""
+        raise NotImplementedError
+
+    def transcribe(self, audio, model_name, task="transcribe", decoding=None):
+        """
+        Mentranskripsi audio yang sudah didekode.
+
+        :param audio: Array float32 mono 16 kHz.
+        :param decoding: Profil decoding dari `resolve_decoding_profile` (default profil dari Config).
+        :return: Dictionary berbentuk hasil `whisper.transcribe()`.
+        """
+        raise NotImplementedError
+
+    def warm_up(self, model_names):
+        raise NotImplementedError
+
+    def loaded_models(self):
+        raise NotImplementedError
+
+
+class TorchWhisperBackend(STTBackend):
+    """
+    Backend openai-whisper (PyTorch).
+
+    Dengan `quantize=True` model selalu dimuat di CPU dan lapisan Linear-nya dikuantisasi
+    dinamis ke int8 (`torch.quantization.quantize_dynamic`).
+    """
+
+    def __init__(self, device=None, quantize=False):
+        self.quantize = quantize
+        self.name = 'torch-int8' if quantize else 'torch'
+        if quantize:
+            # Kuantisasi dinamis torch hanya didukung di CPU
+            device = 'cpu'
+            self.registry = get_model_registry(
+                device=device, kind=self.name,
+                loader=partial(load_whisper_model, quantize=True),
+                size_of=lambda model_name, model: ESTIMATED_MODEL_SIZE_MB.get(model_name, 0) * 0.25,
+                size_factor=0.25
+            )
+        else:
+            self.registry = get_model_registry(device=device)
+
+    @property
+    def device(self):
+        return self.registry.device
+
+    def load(self, model_name):
+        return self.registry.get(model_name)
+
+    def transcribe(self, audio, model_name, task="transcribe", decoding=None):
+        from app.audio_utils import SAMPLE_RATE
+        decode_options = whisper_decode_options(decoding or resolve_decoding_profile())
+        audio_seconds = len(audio) / SAMPLE_RATE
+        use_chunked = Config.WHISPER_CHUNKED_MODE == 'on' or (
+            Config.WHISPER_CHUNKED_MODE == 'auto' and self.device == 'cpu'
+            and audio_seconds >= Config.WHISPER_CHUNKED_MIN_SECONDS
+        )
+        if use_chunked:
+            # Rekaman panjang ditranskripsi paralel per chunk di proses helper (bukan fork dari server
+            # yang punya banyak thread). Model CPU dimuat sekali di helper lalu bobotnya dibagikan ke
+            # worker hasil fork (bukan dimuat ulang di setiap worker).
+            return transcribe_in_helper(audio, model_name, share_weights=Config.STT_SHARED_WEIGHTS, task=task,
+                                        processes=Config.STT_PROCESSES or None,
+                                        chunk_seconds=Config.WHISPER_CHUNK_SECONDS,
+                                        quantize=self.quantize,
+                                        threads_per_worker=Config.STT_THREADS_PER_PROCESS or None,
+                                        decode_options=decode_options)
+        model = self.load(model_name)
+        # Satu decode sekaligus per model (lihat ModelRegistry.inference_lock).
+        # fp16 hanya di GPU: di CPU whisper selalu jatuh ke fp32 (dengan peringatan) jika fp16 diminta
+        with self.registry.inference_lock(model_name):
+            return model.transcribe(audio, task=task, verbose=False, fp16=self.device == 'cuda', **decode_options)
+
+    def warm_up(self, model_names):
+        self.registry.warm_up(model_names)
+
+    def loaded_models(self):
+        return self.registry.loaded_models()
+
+
+def _load_ctranslate2_model(model_name, device, compute_type, cpu_threads):
+    import time
+    from faster_whisper import WhisperModel
+    print(f"Memuat model faster-whisper '{model_name}' ke '{device}' ({compute_type})...")
+    start_time = time.time()
+    model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    print(f"Model faster-whisper '{model_name}' berhasil dimuat dalam {time.time() - start_time:.2f} detik.")
+    return model
+
+
+class CTranslate2Backend(STTBackend):
+    """
+    Backend faster-whisper (CTranslate2) dengan bobot terkuantisasi (default int8).
+
+    Di CPU biasanya beberapa kali lebih cepat daripada openai-whisper fp32 dengan memori jauh
+    lebih kecil. Membutuhkan paket `faster-whisper` (tidak wajib untuk backend lain).
+    """
+
+    name = 'ctranslate2'
+
+    def __init__(self, device=None, compute_type=None, cpu_threads=None):
+        self.compute_type = compute_type or Config.STT_COMPUTE_TYPE
+        self.cpu_threads = Config.STT_CPU_THREADS if cpu_threads is None else cpu_threads
+        self._device = device
+        self._registry = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_tag(self):
+        return f"{self.name}:{self.compute_type}"
+
+    @property
+    def device(self):
+        if self._device is None:
+            import ctranslate2
+            self._device = 'cuda' if ctranslate2.get_cuda_device_count() > 0 else 'cpu'
+        return self._device
+
+    @property
+    def registry(self):
+        with self._lock:
+            if self._registry is None:
+                size_factor = _COMPUTE_TYPE_SIZE_FACTOR.get(self.compute_type, 1.0)
+                self._registry = ModelRegistry(
+                    Config.WHISPER_MODEL_MEMORY_BUDGET_MB, device=self.device,
+                    loader=partial(_load_ctranslate2_model, compute_type=self.compute_type,
+                                   cpu_threads=self.cpu_threads),
+                    size_of=lambda model_name, model: ESTIMATED_MODEL_SIZE_MB.get(model_name, 0) * size_factor,
+                    size_factor=size_factor
+                )
+            return self._registry
+
+    def load(self, model_name):
+        return self.registry.get(model_name)
+
+    def transcribe(self, audio, model_name, task="transcribe", decoding=None):
+        # Tanpa inference lock: model CTranslate2 aman dipanggil dari beberapa thread sekaligus
+        options = faster_whisper_options(decoding or resolve_decoding_profile())
+        segments, info = self.load(model_name).transcribe(audio, task=task, **options)
+        result_segments = []
+        for segment in segments:  # generator: transkripsi berjalan saat diiterasi
+            result_segments.append({
+                "id": len(result_segments),
+                "seek": segment.seek,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+            })
+        return {
+            "text": "".join(segment["text"] for segment in result_segments),
+            "segments": result_segments,
+            "language": info.language,
+        }
+
+    def warm_up(self, model_names):
+        self.registry.warm_up(model_names)
+
+    def loaded_models(self):
+        # Belum ada model dimuat: jangan impor ctranslate2 hanya untuk health check
+        if self._registry is None:
+            return []
+        return self._registry.loaded_models()
+
+
+STT_BACKENDS = {
+    'torch': TorchWhisperBackend,
+    'torch-int8': partial(TorchWhisperBackend, quantize=True),
+    'ctranslate2': CTranslate2Backend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_stt_backend(name=None, device=None):
+    """
+    Mengembalikan backend STT bersama.
+
+    :param name: Nama backend ('torch', 'torch-int8', 'ctranslate2'); default Config.STT_BACKEND.
+    :param device: Paksa perangkat tertentu (mis. 'cpu'); None berarti deteksi otomatis.
+    """
+    name = (name or Config.STT_BACKEND).lower()
+    if name not in STT_BACKENDS:
+        raise ValueError(f"STT_BACKEND tidak dikenal: {name} (pilihan: {', '.join(STT_BACKENDS)})")
+    key = (name, device)
+    with _backends_lock:
+        if key not in _backends:
+            logger.info(f"Menggunakan backend STT '{name}'.")
+            _backends[key] = STT_BACKENDS[name](device=device)
+        return _backends[key]
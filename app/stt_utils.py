@@ -1,56 +1,151 @@
 # app/stt_utils.py
-import whisper
-import torch # Tambahkan import torch
 import os
 import time
+from app.config import Config
+from app.cache_utils import get_transcript_cache, hash_file, make_cache_key
+from app.audio_utils import SAMPLE_RATE, decode_audio
+from app.stt_backends import get_stt_backend
+from app.decoding_profiles import resolve_decoding_profile, profile_cache_tag
+from app.vad import strip_silence, vad_settings, vad_cache_tag
+from app.metrics import WHISPER_SECONDS, WHISPER_RTF, STT_SILENCE_SKIPPED_SECONDS_TOTAL
 
 # --- Konfigurasi Whisper ---
 WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "base")
 
-# --- Deteksi Perangkat ---
-# Periksa apakah CUDA (GPU) tersedia
-if torch.cuda.is_available():
-    DEVICE = "cuda"
-    print(f"GPU CUDA terdeteksi: {torch.cuda.get_device_name(0)}")
-elif torch.backends.mps.is_available(): # Untuk Mac dengan chip Apple Silicon
-    DEVICE = "mps"
-    print("MPS (Metal Performance Shaders) terdeteksi.")
-else:
-    DEVICE = "cpu"
-    print("Tidak ada GPU yang terdeteksi, menggunakan CPU.")
-
-# --- Muat Model Whisper ---
-print(f"Memuat model Whisper '{WHISPER_MODEL_NAME}' ke perangkat '{DEVICE}'...")
-# Muat model dan pindahkan ke perangkat yang terdeteksi
-MODEL = whisper.load_model(WHISPER_MODEL_NAME).to(DEVICE)
-print(f"Model Whisper '{WHISPER_MODEL_NAME}' berhasil dimuat di '{DEVICE}'.")
-
-def transcribe_with_whisper(audio_file_path, task="transcribe"):
+# Model tidak lagi dimuat saat impor. Backend STT (Config.STT_BACKEND) memuatnya saat pertama
+# kali dibutuhkan (atau lewat warm_up_models), dan mendeteksi perangkat saat itu juga.
+
+def warm_up_models(model_names=None, backend=None):
+    """
+    Memuat model Whisper terlebih dahulu agar job pertama tidak menunggu proses loading.
+
+    :param model_names: Daftar nama model; default Config.WHISPER_PRELOAD_MODELS
+                        atau WHISPER_MODEL_NAME jika daftar itu kosong.
+    :param backend: Nama backend STT (default Config.STT_BACKEND).
+    """
+    model_names = model_names or Config.WHISPER_PRELOAD_MODELS or [WHISPER_MODEL_NAME]
+    get_stt_backend(backend).warm_up(model_names)
+
+def _transcript_cache_key(audio_file_path, task, model_name, stt_backend, decoding, vad, content_hash):
+    """Kunci cache transkripsi: hash isi audio + model + task + backend + profil decoding + VAD."""
+    return make_cache_key(content_hash or hash_file(audio_file_path), model_name, task, stt_backend.cache_tag,
+                          profile_cache_tag(decoding), vad_cache_tag(vad))
+
+def is_transcription_cached(audio_file_path, task="transcribe", model_name=None, backend=None, device=None,
+                            content_hash=None, decoding_profile=None):
+    """
+    True jika hasil transkripsi dengan parameter yang sama sudah ada di cache, sehingga audio
+    tidak perlu didekode lebih dulu (argumen sama dengan `transcribe_with_whisper`).
+    """
+    if not Config.CACHE_ENABLED:
+        return False
+    try:
+        cache_key = _transcript_cache_key(audio_file_path, task, model_name or WHISPER_MODEL_NAME,
+                                          get_stt_backend(backend, device=device),
+                                          resolve_decoding_profile(decoding_profile), vad_settings(), content_hash)
+        return get_transcript_cache().get(cache_key) is not None
+    except Exception as e:
+        print(f"Gagal memeriksa cache transkripsi untuk {audio_file_path}: {e}")
+        return False
+
+def transcribe_with_whisper(audio_file_path, task="transcribe", model_name=None, stats=None,
+                            backend=None, device=None, content_hash=None, decoding_profile=None, audio=None):
     """
     Melakukan transkripsi audio menggunakan model Whisper.
-    Model akan berjalan di GPU jika tersedia.
+    Model akan berjalan di GPU jika tersedia (kecuali backend memaksa CPU).
 
-    :param audio_file_path: Path lengkap ke file audio lokal.
+    :param audio_file_path: Path lengkap ke file audio atau video lokal.
     :param task: Tugas yang dilakukan ('transcribe' atau 'translate').
+    :param model_name: Nama model Whisper untuk job ini (default WHISPER_MODEL_NAME).
+    :param stats: Dict opsional yang diisi statistik transkripsi (cache_hit, backend, decoding_profile,
+                  language, audio_seconds, speech_seconds, decode_seconds, vad_seconds,
+                  transcribe_seconds, real_time_factor).
+    :param backend: Nama backend STT ('torch', 'torch-int8', 'ctranslate2'); default Config.STT_BACKEND.
+    :param device: Paksa perangkat tertentu (mis. 'cpu'); None berarti deteksi otomatis.
+    :param content_hash: SHA-256 isi file jika sudah dihitung (mis. saat upload), agar file tidak di-hash ulang.
+    :param decoding_profile: Nama profil decoding ('fast', 'balanced', 'accurate'); default
+                             Config.WHISPER_DECODING_PROFILE. Bahasa dipatok ke Config.WHISPER_LANGUAGE.
+    :param audio: Audio yang sudah didekode dari file ini (float32 mono 16 kHz, mis. oleh tahap decode
+                  pipeline); None berarti file didekode di sini (setelah cek cache).
     :return: Dictionary hasil transkripsi dari Whisper, atau string error.
     """
+    model_name = model_name or WHISPER_MODEL_NAME
     try:
-        print(f"Memulai transkripsi file: {audio_file_path} menggunakan model '{WHISPER_MODEL_NAME}' di '{DEVICE}'...")
+        stt_backend = get_stt_backend(backend, device=device)
+        decoding = resolve_decoding_profile(decoding_profile)
+        vad = vad_settings()
+        if stats is not None:
+            stats["backend"] = stt_backend.cache_tag
+            stats["decoding_profile"] = decoding["name"]
+
+        # --- Cek cache berdasarkan hash isi audio + model + task + backend + profil decoding + VAD ---
+        cache_key = None
+        if Config.CACHE_ENABLED:
+            cache_key = _transcript_cache_key(audio_file_path, task, model_name, stt_backend, decoding, vad, content_hash)
+            cached_result = get_transcript_cache().get(cache_key)
+            if cached_result is not None:
+                print(f"Hasil transkripsi untuk {audio_file_path} diambil dari cache.")
+                if stats is not None:
+                    stats["cache_hit"] = True
+                    stats["language"] = cached_result.get("language")
+                return cached_result
+
+        print(f"Memulai transkripsi file: {audio_file_path} menggunakan model '{model_name}' "
+              f"(backend '{stt_backend.name}', profil '{decoding['name']}', bahasa '{decoding['language'] or 'auto'}') "
+              f"di '{stt_backend.device}'...")
         start_time = time.time()
 
-        # --- Jalankan model Whisper ---
-        # HAPUS device=DEVICE dari baris di bawah ini
-        result = MODEL.transcribe(audio_file_path, task=task, verbose=False)
+        # Dekode sekali lewat pipe ffmpeg -> NumPy (termasuk video, tanpa file WAV sementara)
+        predecoded = audio is not None
+        if not predecoded:
+            audio = decode_audio(audio_file_path)
+        audio_seconds = len(audio) / SAMPLE_RATE
+        decode_seconds = time.time() - start_time
+
+        # Pre-pass VAD: hanya wilayah suara yang diberikan ke Whisper (jeda panjang, hening, dan
+        # bagian sangat pelan dibuang), lalu timestamp dipetakan kembali ke timeline asli
+        timeline = None
+        if vad is not None:
+            vad_start = time.time()
+            audio, timeline = strip_silence(audio, SAMPLE_RATE, **vad)
+        speech_seconds = timeline.speech_seconds if timeline is not None else audio_seconds
+        transcribe_start = time.time()
+
+        # --- Jalankan model Whisper lewat backend ---
+        result = stt_backend.transcribe(audio, model_name, task=task, decoding=decoding)
         # -----------------------------
+        if timeline is not None:
+            result = timeline.remap_result(result)
+            STT_SILENCE_SKIPPED_SECONDS_TOTAL.inc(audio_seconds - speech_seconds)
 
         end_time = time.time()
         duration = end_time - start_time
-        print(f"Transkripsi selesai dalam {duration:.2f} detik di '{DEVICE}'.")
+        transcribe_seconds = end_time - transcribe_start
+        WHISPER_SECONDS.observe(transcribe_seconds, model=model_name, backend=stt_backend.name)
+        if audio_seconds > 0:
+            WHISPER_RTF.observe(transcribe_seconds / audio_seconds, model=model_name, backend=stt_backend.name)
+        if stats is not None:
+            stats.update({
+                "cache_hit": False,
+                "language": result.get("language"),
+                "audio_seconds": round(audio_seconds, 2),
+                "speech_seconds": round(speech_seconds, 2),
+                "vad_seconds": round(transcribe_start - vad_start, 3) if vad is not None else None,
+                "transcribe_seconds": round(transcribe_seconds, 3),
+                "real_time_factor": round(transcribe_seconds / audio_seconds, 4) if audio_seconds > 0 else None
+            })
+            # Audio yang sudah didekode di luar fungsi ini dicatat waktu dekodenya oleh pemanggil
+            if not predecoded:
+                stats["decode_seconds"] = round(decode_seconds, 3)
+        print(f"Transkripsi selesai dalam {duration:.2f} detik di '{stt_backend.device}'.")
+
+        if cache_key is not None:
+            get_transcript_cache().put(cache_key, result)
 
         return result
 
     except Exception as e:
-        error_msg = f"Terjadi kesalahan saat transkripsi dengan Whisper di '{DEVICE}': {str(e)}"
+        error_msg = f"Terjadi kesalahan saat transkripsi dengan Whisper: {str(e)}"
         print(error_msg)
         import traceback
         traceback.print_exc()
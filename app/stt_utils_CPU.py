@@ -1,7 +1,7 @@
-# app/stt_utils.py
-import whisper
+# app/stt_utils_CPU.py
 import os
-import time
+from app import stt_utils
+from app.stt_utils import format_whisper_result  # noqa: F401 (diekspor ulang untuk kompatibilitas)
 
 # --- Konfigurasi Whisper ---
 # Pilih model Whisper. Pilihan umum:
@@ -10,68 +10,23 @@ import time
 # 'large' paling akurat tapi paling lambat dan butuh resource besar
 WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "base") # Gunakan 'base' sebagai default
 
-# Muat model Whisper sekali saja saat aplikasi dimulai untuk efisiensi
-# Ini akan memakan waktu beberapa detik hingga menit tergantung model dan hardware
-print(f"Memuat model Whisper '{WHISPER_MODEL_NAME}'...")
-MODEL = whisper.load_model(WHISPER_MODEL_NAME)
-print(f"Model Whisper '{WHISPER_MODEL_NAME}' berhasil dimuat.")
+# Varian CPU dari stt_utils: logika transkripsi ada di stt_utils dan app/stt_backends.py,
+# modul ini hanya memaksa perangkat CPU.
 
-def transcribe_with_whisper(audio_file_path, task="transcribe"):
+def transcribe_with_whisper(audio_file_path, task="transcribe", model_name=None, stats=None, backend=None,
+                            decoding_profile=None):
     """
-    Melakukan transkripsi audio menggunakan model Whisper.
+    Melakukan transkripsi audio menggunakan model Whisper, selalu di CPU.
 
-    :param audio_file_path: Path lengkap ke file audio lokal.
+    :param audio_file_path: Path lengkap ke file audio atau video lokal.
     :param task: Tugas yang dilakukan ('transcribe' atau 'translate').
                      'translate' menerjemahkan ke teks Inggris.
+    :param model_name: Nama model Whisper untuk job ini (default WHISPER_MODEL_NAME).
+    :param stats: Dict opsional yang diisi statistik transkripsi.
+    :param backend: Nama backend STT (default Config.STT_BACKEND).
+    :param decoding_profile: Nama profil decoding (default Config.WHISPER_DECODING_PROFILE).
     :return: Dictionary hasil transkripsi dari Whisper, atau string error.
     """
-    try:
-        print(f"Memulai transkripsi file: {audio_file_path} menggunakan model '{WHISPER_MODEL_NAME}'...")
-        start_time = time.time()
-
-        # --- Jalankan model Whisper ---
-        # `task` bisa 'transcribe' (default) atau 'translate'
-        result = MODEL.transcribe(audio_file_path, task=task, verbose=False)
-
-        end_time = time.time()
-        duration = end_time - start_time
-        print(f"Transkripsi selesai dalam {duration:.2f} detik.")
-
-        return result
-
-    except Exception as e:
-        error_msg = f"Terjadi kesalahan saat transkripsi dengan Whisper: {str(e)}"
-        print(error_msg)
-        return error_msg
-
-def format_whisper_result(whisper_result):
-    """
-    Memformat hasil dari model Whisper menjadi teks dengan timestamp.
-
-    :param whisper_result: Dictionary hasil dari `model.transcribe()`.
-    :return: String teks yang diformat.
-    """
-    if not whisper_result or isinstance(whisper_result, str): # Jika error
-        return whisper_result if isinstance(whisper_result, str) else "Tidak ada hasil transkripsi."
-
-    formatted_text = ""
-    segments = whisper_result.get("segments", [])
-    
-    if segments:
-        for segment in segments:
-            # Waktu dalam detik dari Whisper
-            start_sec = segment.get("start", 0)
-            end_sec = segment.get("end", 0)
-            text = segment.get("text", "").strip()
-
-            # Hanya tambahkan baris jika ada teks
-            if text:
-                formatted_text += f"[{start_sec:.2f} - {end_sec:.2f}] {text}\n"
-        return formatted_text
-    else:
-        # Jika tidak ada segments, gunakan teks penuh
-        full_text = whisper_result.get("text", "").strip()
-        if full_text:
-             return full_text
-        else:
-             return "Tidak ada teks yang dikenali dalam audio."
+    return stt_utils.transcribe_with_whisper(audio_file_path, task=task, model_name=model_name or WHISPER_MODEL_NAME,
+                                             stats=stats, backend=backend, device="cpu",
+                                             decoding_profile=decoding_profile)
@@ -0,0 +1,150 @@
+# app/transcript_utils.py
+import re
+
+# Baris transkripsi hasil format_whisper_result: "[12.34 - 15.67] teks"
+_SEGMENT_LINE = re.compile(r'^\[(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\]\s*(.*)$')
+
+# Kata pengisi (filler) yang tidak membawa informasi untuk MoM
+FILLER_WORDS = {
+    'eh', 'ehm', 'em', 'emm', 'hmm', 'hm', 'mm', 'uh', 'uhm', 'um', 'umm', 'ah', 'eee', 'ee', 'anu',
+}
+
+# Halusinasi Whisper yang sering muncul di bagian sunyi/musik (dibandingkan setelah dinormalisasi)
+HALLUCINATION_PHRASES = {
+    'terima kasih telah menonton',
+    'terima kasih sudah menonton',
+    'jangan lupa like dan subscribe',
+    'thank you for watching',
+    'thanks for watching',
+    'subtitles by the amara org community',
+}
+
+# Segmen dengan jeda lebih dari ini dianggap awal paragraf baru
+PARAGRAPH_GAP_SECONDS = 2.0
+# Panjang maksimum satu paragraf (karakter) agar pemotongan map-reduce per baris tetap rapi
+PARAGRAPH_MAX_CHARS = 800
+
+_FILLER_PATTERN = re.compile(
+    r'(?<!\w)(?:' + '|'.join(sorted(map(re.escape, FILLER_WORDS), key=len, reverse=True)) + r')(?!\w)[,.]?\s*',
+    re.IGNORECASE
+)
+
+
+def _normalize(text):
+    return re.sub(r'[^\w\s]', '', text.lower()).strip()
+
+
+def parse_timestamped_transcript(transcription_text):
+    """
+    Mem-parsing transkripsi berformat "[mulai - akhir] teks" menjadi list (mulai, akhir, teks).
+
+    :return: List segmen, atau None jika teks tidak berformat timestamp (misalnya teks penuh tanpa segmen).
+    """
+    segments = []
+    for line in transcription_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _SEGMENT_LINE.match(line)
+        if not match:
+            return None
+        segments.append((float(match.group(1)), float(match.group(2)), match.group(3).strip()))
+    return segments or None
+
+
+def collapse_repeated_phrases(text, min_repeats=3, max_ngram=8):
+    """
+    Meringkas frasa yang diulang berturut-turut (pola halusinasi Whisper, misalnya
+    "oke oke oke oke" atau kalimat yang sama berulang) menjadi satu kemunculan.
+    """
+    words = text.split()
+    if len(words) < min_repeats:
+        return text
+    result = []
+    i = 0
+    while i < len(words):
+        collapsed = False
+        for n in range(min(max_ngram, (len(words) - i) // min_repeats), 0, -1):
+            phrase = [_normalize(w) for w in words[i:i + n]]
+            repeats = 1
+            while words[i + repeats * n:i + (repeats + 1) * n] and \
+                    [_normalize(w) for w in words[i + repeats * n:i + (repeats + 1) * n]] == phrase:
+                repeats += 1
+            if repeats >= min_repeats:
+                result.extend(words[i:i + n])
+                i += repeats * n
+                collapsed = True
+                break
+        if not collapsed:
+            result.append(words[i])
+            i += 1
+    return " ".join(result)
+
+
+def remove_filler_words(text):
+    """Menghapus kata pengisi (eh, ehm, hmm, ...) yang berdiri sendiri."""
+    cleaned = _FILLER_PATTERN.sub('', text)
+    return re.sub(r'\s{2,}', ' ', cleaned).strip(' ,')
+
+
+def _format_marker(seconds):
+    minutes = int(seconds // 60)
+    return f"[{minutes // 60:d}:{minutes % 60:02d}:00]" if minutes >= 60 else f"[{minutes:02d}:00]"
+
+
+def compact_transcript(transcription_text, marker_minutes=5):
+    """
+    Mengubah transkripsi bertimestamp menjadi teks ringkas untuk prompt MoM.
+
+    - Segmen berdekatan digabung menjadi paragraf (dipisah saat ada jeda panjang).
+    - Timestamp per segmen diganti penanda waktu jarang (setiap `marker_minutes` menit).
+    - Segmen duplikat berturut-turut, frasa berulang, halusinasi umum Whisper, dan kata
+      pengisi dibuang.
+
+    Transkripsi yang tidak berformat timestamp hanya dibersihkan (tanpa penanda waktu).
+
+    :param transcription_text: Transkripsi hasil format_whisper_result.
+    :param marker_minutes: Jarak antar penanda waktu dalam menit.
+    :return: String transkripsi ringkas.
+    """
+    segments = parse_timestamped_transcript(transcription_text)
+    if segments is None:
+        return remove_filler_words(collapse_repeated_phrases(transcription_text.strip()))
+
+    marker_seconds = max(1, marker_minutes) * 60
+    paragraphs = []
+    current = []
+    current_len = 0
+    marker = None  # penanda waktu yang ditulis di depan paragraf berikutnya
+    next_marker_at = 0.0
+    last_end = None
+    last_normalized = None
+
+    def flush():
+        nonlocal marker, current_len
+        if current:
+            paragraph = " ".join(current)
+            paragraphs.append(f"{marker} {paragraph}" if marker else paragraph)
+            marker = None
+            current.clear()
+        current_len = 0
+
+    for start, end, text in segments:
+        text = remove_filler_words(collapse_repeated_phrases(text))
+        normalized = _normalize(text)
+        if not normalized or normalized in HALLUCINATION_PHRASES or normalized == last_normalized:
+            continue
+        if start >= next_marker_at:
+            flush()
+            marker_start = start - start % marker_seconds
+            marker = _format_marker(marker_start)
+            next_marker_at = marker_start + marker_seconds
+        elif (last_end is not None and start - last_end > PARAGRAPH_GAP_SECONDS) or \
+                current_len + len(text) > PARAGRAPH_MAX_CHARS:
+            flush()
+        current.append(text)
+        current_len += len(text) + 1
+        last_end = end
+        last_normalized = normalized
+    flush()
+    return "\n".join(paragraphs) + "\n" if paragraphs else ""
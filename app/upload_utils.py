@@ -0,0 +1,372 @@
+# app/upload_utils.py
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: kunci antar-proses tidak tersedia, hanya kunci antar-thread
+    fcntl = None
+
+from flask import Request, current_app
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_SIZE = 1024 * 1024  # Tulis/hash per 1 MB
+
+
+class UploadError(Exception):
+    """
+    Error pada sesi upload bertahap, dengan kode HTTP yang sesuai untuk route.
+
+    `truncated` bernilai True jika sebagian potongan sempat ditulis lalu dipotong kembali dari file.
+    """
+
+    def __init__(self, message, http_status=400, offset=None, truncated=False):
+        super().__init__(message)
+        self.http_status = http_status
+        self.offset = offset
+        self.truncated = truncated
+
+
+def copy_stream_hashed(source, target, max_bytes=None, digest=None, on_block=None):
+    """
+    Menyalin stream ke file per blok sambil menghitung SHA-256, tanpa memuat seluruh isi ke memori.
+
+    :param source: Objek dengan method `read(n)`.
+    :param target: File biner yang sudah dibuka untuk ditulis.
+    :param max_bytes: Batas jumlah byte yang disalin; lebih dari ini melempar UploadError (413).
+    :param digest: Objek hash yang dilanjutkan (default SHA-256 baru).
+    :param on_block: Callback opsional `on_block(block)` setelah setiap blok ditulis.
+    :return: Tuple (jumlah byte yang ditulis, objek digest).
+    """
+    digest = digest or hashlib.sha256()
+    written = 0
+    while True:
+        block = source.read(_BLOCK_SIZE)
+        if not block:
+            break
+        written += len(block)
+        if max_bytes is not None and written > max_bytes:
+            raise UploadError("Potongan upload melebihi batas ukuran.", http_status=413)
+        target.write(block)
+        digest.update(block)
+        if on_block:
+            on_block(block)
+    return written, digest
+
+
+class HashingSpoolFile:
+    """
+    File sementara di folder upload yang menghitung SHA-256 selama Werkzeug menulis isi multipart.
+
+    Dipakai oleh HashingUploadRequest sebagai stream file multipart, sehingga file upload biasa
+    tidak di-spool ke /tmp lalu disalin lagi: `store_uploaded_file` cukup memindahkannya (rename)
+    ke path akhir.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='.spool-', suffix='.part', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self._hashed_up_to = 0
+
+    def write(self, data):
+        # Werkzeug menulis secara berurutan; seek() hanya dipakai setelah seluruh isi diterima
+        if self._file.tell() == self._hashed_up_to:
+            self._digest.update(data)
+            self._hashed_up_to += len(data)
+        else:
+            self._digest = None
+        return self._file.write(data)
+
+    def hexdigest(self):
+        """SHA-256 isi file, atau None jika file tidak ditulis berurutan."""
+        return self._digest.hexdigest() if self._digest is not None else None
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def discard(self):
+        """Menutup dan menghapus file spool (tidak berpengaruh jika sudah dipindahkan)."""
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class HashingUploadRequest(Request):
+    """
+    Request Flask yang menulis file multipart langsung ke HashingSpoolFile di folder upload.
+
+    Spool yang tidak dipindahkan oleh `store_uploaded_file` (mis. upload ditolak) dihapus saat
+    request ditutup.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = HashingSpoolFile(os.path.join(current_app.config['UPLOAD_FOLDER'], '.uploads'))
+        self.__dict__.setdefault('_hashing_spools', []).append(spool)
+        return spool
+
+    def close(self):
+        super().close()
+        for spool in self.__dict__.get('_hashing_spools', ()):
+            spool.discard()
+
+
+def store_uploaded_file(file_storage, file_path):
+    """
+    Menyimpan FileStorage Werkzeug ke `file_path` dan mengembalikan SHA-256 isinya.
+
+    File yang sudah di-spool oleh HashingSpoolFile dipindahkan dengan rename (tanpa salin ulang,
+    hash sudah dihitung saat upload). Stream lain disalin per blok sambil dihitung hash-nya.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, HashingSpoolFile) and stream.hexdigest() is not None:
+        stream.flush()
+        os.replace(stream.path, file_path)
+        stream.close()
+        return stream.hexdigest()
+    stream.seek(0)
+    with open(file_path, 'wb') as target:
+        _, digest = copy_stream_hashed(stream, target)
+    return digest.hexdigest()
+
+
+class ResumableUploadStore:
+    """
+    Sesi upload bertahap (chunked) yang bisa dilanjutkan setelah koneksi terputus.
+
+    Setiap sesi disimpan di `<upload_folder>/.uploads/`:
+    - `<upload_id>.json`: metadata (nama file asli, ukuran total, model, waktu dibuat)
+    - `<upload_id>.part`: isi yang sudah diterima; ukurannya adalah offset upload saat ini
+
+    Karena offset dibaca dari ukuran file di disk, sesi bisa dilanjutkan oleh proses server mana pun
+    dan setelah restart. Potongan ditulis dengan kunci file eksklusif (fcntl) agar dua permintaan
+    untuk sesi yang sama tidak menulis bersamaan. Hash SHA-256 dihitung sambil menulis; jika proses
+    ini belum punya state hash untuk offset sesi (sesi dimulai di proses lain atau sebelum restart),
+    prefix yang sudah ada di disk di-hash ulang sekali.
+    """
+
+    def __init__(self, upload_folder, max_bytes=None, ttl_seconds=24 * 3600):
+        self.upload_folder = upload_folder
+        self.directory = os.path.join(upload_folder, '.uploads')
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._digests = {}  # upload_id -> (offset, objek sha256) untuk proses ini
+        self._busy = set()  # upload_id yang sedang ditulis oleh thread di proses ini
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def part_path(self, upload_id):
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def create(self, filename, total_size=None, metadata=None):
+        """
+        Membuat sesi upload baru.
+
+        :param filename: Nama file asli (dibersihkan dengan secure_filename).
+        :param total_size: Ukuran file total (byte) jika diketahui klien.
+        :param metadata: Dict tambahan yang disimpan bersama sesi (mis. model Whisper).
+        :return: Dict info sesi (lihat `info`).
+        """
+        if total_size is not None:
+            total_size = int(total_size)
+            if total_size < 0 or (self.max_bytes and total_size > self.max_bytes):
+                raise UploadError("Ukuran file melebihi batas upload.", http_status=413)
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "upload_id": upload_id,
+            "filename": secure_filename(filename),
+            "total_size": total_size,
+            "metadata": metadata or {},
+            "created_at": time.time()
+        }
+        open(self.part_path(upload_id), 'wb').close()
+        tmp_path = f"{self._meta_path(upload_id)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(upload_id))
+        with self._lock:
+            self._digests[upload_id] = (0, hashlib.sha256())
+        return self.info(upload_id)
+
+    def _load_meta(self, upload_id):
+        # upload_id dibuat dari uuid4().hex; tolak nilai lain agar tidak bisa keluar dari folder
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            raise UploadError("Upload ID tidak valid.", http_status=404)
+        try:
+            with open(self._meta_path(upload_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Upload ID tidak ditemukan atau sudah kedaluwarsa.", http_status=404)
+
+    def info(self, upload_id):
+        """Dict berisi upload_id, filename, total_size, offset (byte diterima), dan metadata."""
+        meta = self._load_meta(upload_id)
+        try:
+            offset = os.path.getsize(self.part_path(upload_id))
+        except FileNotFoundError:
+            raise UploadError("Upload ID tidak ditemukan atau sudah kedaluwarsa.", http_status=404)
+        return dict(meta, offset=offset)
+
+    def _acquire(self, upload_id, part_file):
+        with self._lock:
+            if upload_id in self._busy:
+                return False
+            self._busy.add(upload_id)
+        if fcntl is not None:
+            try:
+                fcntl.flock(part_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                with self._lock:
+                    self._busy.discard(upload_id)
+                return False
+        return True
+
+    def _release(self, upload_id, part_file):
+        if fcntl is not None:
+            fcntl.flock(part_file.fileno(), fcntl.LOCK_UN)
+        with self._lock:
+            self._busy.discard(upload_id)
+
+    def _digest_at(self, upload_id, part_file, offset):
+        """State hash untuk `offset` byte pertama, dihitung ulang dari disk jika tidak ada di proses ini."""
+        with self._lock:
+            cached = self._digests.pop(upload_id, None)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        digest = hashlib.sha256()
+        part_file.seek(0)
+        remaining = offset
+        while remaining:
+            block = part_file.read(min(_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+        return digest
+
+    def append(self, upload_id, offset, stream, max_chunk_bytes=None, on_block=None):
+        """
+        Menambahkan satu potongan dari `stream` ke sesi, dimulai dari `offset`.
+
+        `offset` harus sama dengan jumlah byte yang sudah diterima; jika tidak, klien harus
+        menanyakan offset terbaru (UploadError 409 membawa offset tersebut). Jika koneksi terputus
+        di tengah potongan, byte yang sudah tertulis tetap tersimpan dan offset ikut maju.
+
+        :return: Offset baru (jumlah byte yang sudah diterima).
+        """
+        meta = self._load_meta(upload_id)
+        with open(self.part_path(upload_id), 'r+b') as part_file:
+            if not self._acquire(upload_id, part_file):
+                raise UploadError("Potongan lain untuk upload ini sedang ditulis.", http_status=409)
+            try:
+                current = os.fstat(part_file.fileno()).st_size
+                if offset != current:
+                    raise UploadError(f"Offset tidak cocok: server sudah menerima {current} byte.",
+                                      http_status=409, offset=current)
+                limit = self.max_bytes
+                if meta.get("total_size") is not None:
+                    limit = meta["total_size"]
+                max_bytes = None if limit is None else limit - current
+                if max_chunk_bytes is not None:
+                    max_bytes = max_chunk_bytes if max_bytes is None else min(max_bytes, max_chunk_bytes)
+
+                digest = self._digest_at(upload_id, part_file, current)
+                part_file.seek(current)
+                written = 0
+                try:
+                    written, digest = copy_stream_hashed(stream, part_file, max_bytes=max_bytes,
+                                                         digest=digest, on_block=on_block)
+                    part_file.flush()
+                except UploadError as ue:
+                    # Potongan yang melebihi batas dibuang seluruhnya
+                    part_file.truncate(current)
+                    ue.offset = current
+                    ue.truncated = True
+                    digest = self._digest_at(upload_id, part_file, current)
+                    with self._lock:
+                        self._digests[upload_id] = (current, digest)
+                    raise
+                with self._lock:
+                    self._digests[upload_id] = (current + written, digest)
+                return current + written
+            finally:
+                self._release(upload_id, part_file)
+
+    def complete(self, upload_id, file_path):
+        """
+        Menyelesaikan sesi: memindahkan isi upload ke `file_path` dan menghapus metadata sesi.
+
+        :return: Tuple (info sesi, SHA-256 isi file).
+        :raises UploadError: Jika upload belum lengkap (409) atau sedang ditulis.
+        """
+        info = self.info(upload_id)
+        if info.get("total_size") is not None and info["offset"] != info["total_size"]:
+            raise UploadError(f"Upload belum lengkap: {info['offset']} dari {info['total_size']} byte diterima.",
+                              http_status=409, offset=info["offset"])
+        if info["offset"] == 0:
+            raise UploadError("Upload kosong.", http_status=400, offset=0)
+        with open(self.part_path(upload_id), 'r+b') as part_file:
+            if not self._acquire(upload_id, part_file):
+                raise UploadError("Potongan lain untuk upload ini sedang ditulis.", http_status=409)
+            try:
+                digest = self._digest_at(upload_id, part_file, info["offset"])
+                os.replace(self.part_path(upload_id), file_path)
+            finally:
+                self._release(upload_id, part_file)
+        os.remove(self._meta_path(upload_id))
+        return info, digest.hexdigest()
+
+    def abort(self, upload_id):
+        """Menghapus sesi beserta isi yang sudah diterima."""
+        self._load_meta(upload_id)
+        with self._lock:
+            self._digests.pop(upload_id, None)
+        for path in (self.part_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict_stale(self):
+        """Menghapus sesi yang tidak menerima data selama `ttl_seconds`. Mengembalikan list upload_id."""
+        now = time.time()
+        stale = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-len('.json')]
+            try:
+                last_activity = max(os.path.getmtime(os.path.join(self.directory, name)),
+                                    os.path.getmtime(self.part_path(upload_id)))
+            except FileNotFoundError:
+                last_activity = 0
+            if now - last_activity > self.ttl_seconds:
+                stale.append(upload_id)
+                self.abort(upload_id)
+        # Spool multipart yang tertinggal (mis. proses mati di tengah request)
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.spool-'):
+                try:
+                    if now - os.path.getmtime(path) > self.ttl_seconds:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return stale
@@ -0,0 +1,165 @@
+# app/vad.py
+import logging
+
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE, frame_energy_db
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Energi frame di bawah ini selalu dianggap hening (dBFS), berapa pun tingkat derau rekamannya
+_ABSOLUTE_FLOOR_DB = -60.0
+
+
+def _runs(mask):
+    """Awal (inklusif) dan akhir (eksklusif) setiap deretan True berurutan di `mask`."""
+    padded = np.concatenate(([False], mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return changes[0::2], changes[1::2]
+
+
+def _merge_close(starts, ends, min_gap):
+    """Menggabungkan wilayah yang jaraknya kurang dari `min_gap` frame (tanpa loop Python)."""
+    if len(starts) < 2:
+        return starts, ends
+    keep_gap = (starts[1:] - ends[:-1]) >= min_gap
+    return (np.concatenate((starts[:1], starts[1:][keep_gap])),
+            np.concatenate((ends[:-1][keep_gap], ends[-1:])))
+
+
+def detect_speech_regions(audio, sample_rate=SAMPLE_RATE, frame_seconds=0.03, margin_db=10.0,
+                          min_speech_seconds=0.25, min_silence_seconds=1.5, padding_seconds=0.3):
+    """
+    Mencari wilayah berisi suara dengan VAD berbasis energi yang sepenuhnya divektorisasi.
+
+    Ambang dihitung adaptif per rekaman: `margin_db` di atas derau latar (persentil ke-10 energi
+    frame), tetapi tidak lebih dari 25 dB di bawah bagian yang keras (persentil ke-95), agar ucapan
+    pelan pada rekaman yang hampir tanpa jeda tidak ikut terbuang. Jeda yang lebih pendek dari
+    `min_silence_seconds` tidak dibuang (Whisper butuh jeda alami antarkalimat), letupan yang lebih
+    pendek dari `min_speech_seconds` diabaikan, dan setiap wilayah diberi `padding_seconds` di
+    kedua sisi agar awal/akhir kata tidak terpotong.
+
+    :return: List (sampel_awal, sampel_akhir) urut dan tidak tumpang tindih; kosong jika tidak ada suara.
+    """
+    frame_length = max(1, int(frame_seconds * sample_rate))
+    energy = frame_energy_db(audio, frame_length)
+    if len(energy) == 0:
+        return []
+
+    noise_floor, loud_level = np.percentile(energy, [10, 95])
+    threshold = max(_ABSOLUTE_FLOOR_DB, min(noise_floor + margin_db, loud_level - 25.0))
+    starts, ends = _runs(energy > threshold)
+    if len(starts) == 0:
+        return []
+
+    starts, ends = _merge_close(starts, ends, int(min_silence_seconds / frame_seconds))
+    long_enough = (ends - starts) >= max(1, int(min_speech_seconds / frame_seconds))
+    starts, ends = starts[long_enough], ends[long_enough]
+    if len(starts) == 0:
+        return []
+
+    padding = int(padding_seconds / frame_seconds)
+    starts = np.maximum(0, starts - padding)
+    ends = np.minimum(len(energy), ends + padding)
+    # Padding bisa membuat wilayah bersebelahan saling tumpang tindih
+    starts, ends = _merge_close(starts, ends, 1)
+
+    regions = [(int(start) * frame_length, int(end) * frame_length) for start, end in zip(starts, ends)]
+    # Sisa sampel setelah frame terakhir ikut wilayah terakhir jika wilayah itu sampai ke akhir
+    if ends[-1] == len(energy):
+        regions[-1] = (regions[-1][0], len(audio))
+    return regions
+
+
+class SpeechTimeline:
+    """
+    Pemetaan waktu antara audio ringkas (hanya wilayah suara yang disambung) dan rekaman asli.
+    """
+
+    def __init__(self, regions, sample_rate=SAMPLE_RATE):
+        bounds = np.asarray(regions, dtype=np.float64).reshape(-1, 2) / sample_rate
+        self.original_starts = bounds[:, 0]
+        self.lengths = bounds[:, 1] - bounds[:, 0]
+        self.compact_starts = np.concatenate(([0.0], np.cumsum(self.lengths)[:-1]))
+
+    @property
+    def speech_seconds(self):
+        return float(self.lengths.sum())
+
+    def to_original(self, times, is_end=False):
+        """
+        Memetakan waktu (detik, skalar atau array) di audio ringkas ke waktu di rekaman asli.
+
+        Waktu yang tepat di sambungan dua wilayah dipetakan ke akhir wilayah sebelumnya jika
+        `is_end` (akhir segmen), dan ke awal wilayah berikutnya jika bukan.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        side = 'left' if is_end else 'right'
+        index = np.clip(np.searchsorted(self.compact_starts, times, side=side) - 1, 0, len(self.lengths) - 1)
+        offset = np.clip(times - self.compact_starts[index], 0.0, self.lengths[index])
+        return self.original_starts[index] + offset
+
+    def remap_result(self, result):
+        """Mengembalikan salinan hasil transkripsi dengan timestamp segmen (dan kata) di timeline asli."""
+        segments = result.get("segments") or []
+        if not segments:
+            return result
+        starts = self.to_original([segment.get("start", 0) for segment in segments])
+        ends = self.to_original([segment.get("end", 0) for segment in segments], is_end=True)
+        remapped = []
+        for segment, start, end in zip(segments, starts, ends):
+            shifted = dict(segment, start=float(start), end=float(end))
+            if segment.get("words"):
+                word_starts = self.to_original([word["start"] for word in segment["words"]])
+                word_ends = self.to_original([word["end"] for word in segment["words"]], is_end=True)
+                shifted["words"] = [dict(word, start=float(ws), end=float(we))
+                                    for word, ws, we in zip(segment["words"], word_starts, word_ends)]
+            remapped.append(shifted)
+        return dict(result, segments=remapped)
+
+
+def strip_silence(audio, sample_rate=SAMPLE_RATE, min_savings=0.05, **vad_options):
+    """
+    Membuang jeda panjang dari audio sebelum Whisper.
+
+    :param min_savings: Jika porsi audio yang terbuang kurang dari ini, audio asli dipakai apa adanya.
+    :param vad_options: Diteruskan ke `detect_speech_regions`.
+    :return: (audio ringkas, SpeechTimeline), atau (audio asli, None) jika pre-pass tidak dipakai
+             (hemat terlalu kecil, atau tidak ada suara yang terdeteksi sehingga lebih aman
+             mentranskripsi seluruh rekaman).
+    """
+    if len(audio) == 0:
+        return audio, None
+    regions = detect_speech_regions(audio, sample_rate, **vad_options)
+    if not regions:
+        logger.info("VAD tidak menemukan suara; seluruh audio ditranskripsi.")
+        return audio, None
+    timeline = SpeechTimeline(regions, sample_rate)
+    total_seconds = len(audio) / sample_rate
+    removed_fraction = 1.0 - timeline.speech_seconds / total_seconds
+    if removed_fraction < min_savings:
+        return audio, None
+    compact = np.concatenate([audio[start:end] for start, end in regions])
+    logger.info(f"VAD: {len(regions)} wilayah suara, {timeline.speech_seconds:.1f} dari {total_seconds:.1f} detik "
+                f"({removed_fraction:.0%} hening dibuang).")
+    return compact, timeline
+
+
+def vad_settings():
+    """Pengaturan pre-pass VAD dari Config, atau None jika dimatikan (STT_VAD_ENABLED)."""
+    if not Config.STT_VAD_ENABLED:
+        return None
+    return {
+        'margin_db': Config.STT_VAD_MARGIN_DB,
+        'min_silence_seconds': Config.STT_VAD_MIN_SILENCE_SECONDS,
+        'padding_seconds': Config.STT_VAD_PADDING_SECONDS,
+        'min_savings': Config.STT_VAD_MIN_SAVINGS,
+    }
+
+
+def vad_cache_tag(settings):
+    """Identitas pengaturan VAD untuk kunci cache transkripsi (hasil berbeda jika pengaturan berbeda)."""
+    if settings is None:
+        return "vad:off"
+    return "vad:" + ":".join(f"{key}={settings[key]}" for key in sorted(settings))
@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Benchmark pipeline end-to-end (dekode audio, Whisper, MoM BytePlus, format teks).
+# Jalankan dengan: python -m benchmarks.run_benchmarks --help
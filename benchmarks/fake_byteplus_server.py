@@ -0,0 +1,189 @@
+# benchmarks/fake_byteplus_server.py
+"""
+Server lokal yang meniru endpoint chat completions BytePlus (kompatibel OpenAI).
+
+Mengembalikan MoM JSON tetap dengan latensi yang bisa diatur, sehingga tahap MoM bisa
+di-benchmark tanpa koneksi internet dan tanpa biaya API. Mendukung respons biasa
+maupun streaming (`stream: true`), serta injeksi error 429 untuk menguji retry.
+
+Jalankan terpisah:  python -m benchmarks.fake_byteplus_server --port 8765 --latency 2
+lalu set BYTEPLUS_BASE_URL=http://127.0.0.1:8765/api/v3
+"""
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+CANNED_MOM = {
+    "judul_rapat": "Rapat Koordinasi Migrasi CDN",
+    "tanggal": "-",
+    "pemimpin_rapat": "-",
+    "daftar_hadir": ["Budi", "Sari", "Andi"],
+    "agenda": [
+        {
+            "poin_agenda": "Progres migrasi CDN ke BytePlus",
+            "pembahasan": "Sekitar 60% trafik statis sudah dipindahkan; kendala di konfigurasi cache video.",
+            "keputusan": "Target migrasi selesai akhir bulan ini.",
+            "tindak_lanjut": [
+                {"deskripsi": "Menyiapkan dokumen konfigurasi cache", "penanggung_jawab": "Budi", "tenggat_waktu": "Jumat"}
+            ]
+        },
+        {
+            "poin_agenda": "Evaluasi biaya bandwidth kuartal ini",
+            "pembahasan": "Biaya turun sekitar 15% dibanding kuartal lalu.",
+            "keputusan": "-",
+            "tindak_lanjut": [
+                {"deskripsi": "Membuat laporan perbandingan biaya", "penanggung_jawab": "Sari", "tenggat_waktu": "-"}
+            ]
+        },
+        {
+            "poin_agenda": "Monitoring latensi pengguna",
+            "pembahasan": "Dashboard latensi per wilayah dibutuhkan sebelum migrasi penuh.",
+            "keputusan": "Dashboard dibuat sebelum migrasi penuh.",
+            "tindak_lanjut": [
+                {"deskripsi": "Menyiapkan dashboard latensi per wilayah", "penanggung_jawab": "Andi", "tenggat_waktu": "Minggu depan"}
+            ]
+        }
+    ],
+    "kesimpulan": "Migrasi CDN berjalan sesuai rencana dengan beberapa tindak lanjut konfigurasi dan monitoring."
+}
+
+
+class FakeByteplusHandler(BaseHTTPRequestHandler):
+    """Handler `POST .../chat/completions`. Pengaturan dibaca dari atribut server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+            return
+
+        server = self.server
+        with server.stats_lock:
+            server.request_count += 1
+            server.prompt_chars += sum(len(m.get("content") or "") for m in body.get("messages", []))
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(429, {"error": {"message": "Rate limit (simulasi)", "type": "rate_limit_error"}},
+                            extra_headers={"Retry-After": "0"})
+            return
+
+        time.sleep(server.latency)
+        content = json.dumps(server.mom, ensure_ascii=False, indent=2)
+        model = body.get("model", "fake-mom")
+        if body.get("stream"):
+            self._send_stream(model, content)
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+
+    def _send_json(self, status, payload, extra_headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        chunk_chars = self.server.chunk_chars
+        delay = chunk_chars / self.server.chars_per_second if self.server.chars_per_second else 0
+        event({"role": "assistant", "content": ""})
+        for i in range(0, len(content), chunk_chars):
+            event({"content": content[i:i + chunk_chars]})
+            if delay:
+                time.sleep(delay)
+        event({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_fake_server(host='127.0.0.1', port=0, latency=1.0, chars_per_second=2000, chunk_chars=16,
+                      error_rate=0.0, mom=None):
+    """
+    Menjalankan server palsu di thread latar belakang.
+
+    :param port: 0 untuk memilih port kosong secara otomatis.
+    :param latency: Jeda (detik) sebelum respons/token pertama dikirim.
+    :param chars_per_second: Kecepatan streaming (0 = tanpa jeda antar chunk).
+    :param error_rate: Peluang (0-1) sebuah permintaan dijawab 429.
+    :return: Tuple (server, base_url). Hentikan dengan `server.shutdown()`.
+    """
+    server = ThreadingHTTPServer((host, port), FakeByteplusHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.chars_per_second = chars_per_second
+    server.chunk_chars = max(1, chunk_chars)
+    server.error_rate = error_rate
+    server.mom = mom or CANNED_MOM
+    server.stats_lock = threading.Lock()
+    server.request_count = 0
+    server.prompt_chars = 0
+    threading.Thread(target=server.serve_forever, name="fake-byteplus", daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/api/v3"
+    logger.info(f"Server BytePlus palsu berjalan di {base_url}")
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server BytePlus (OpenAI-compatible) palsu untuk benchmark.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=1.0, help="Jeda sebelum respons pertama (detik)")
+    parser.add_argument('--chars-per-second', type=float, default=2000, help="Kecepatan streaming (0 = tanpa jeda)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Peluang respons 429 (0-1)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server, base_url = start_fake_server(args.host, args.port, args.latency, args.chars_per_second,
+                                         error_rate=args.error_rate)
+    print(f"BYTEPLUS_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/fixtures.py
+import os
+import wave
+import logging
+import subprocess
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Durasi fixture standar (menit)
+DEFAULT_DURATIONS_MINUTES = (1, 10, 60)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.fixtures')
+
+# Kalimat rapat untuk membangun transkripsi sintetis (input tahap MoM)
+_TRANSCRIPT_SENTENCES = [
+    "Selamat pagi semuanya, mari kita mulai rapat koordinasi mingguan.",
+    "Agenda pertama adalah progres migrasi CDN ke BytePlus.",
+    "Tim infrastruktur sudah memindahkan sekitar enam puluh persen trafik statis.",
+    "Kendala utama ada di konfigurasi cache untuk konten video.",
+    "Kita sepakat target migrasi selesai akhir bulan ini.",
+    "Budi akan menyiapkan dokumen konfigurasi cache paling lambat hari Jumat.",
+    "Agenda berikutnya adalah evaluasi biaya bandwidth kuartal ini.",
+    "Biaya turun sekitar lima belas persen dibanding kuartal lalu.",
+    "Sari diminta membuat laporan perbandingan biaya untuk manajemen.",
+    "Ada pertanyaan terkait monitoring latensi dari sisi pengguna.",
+    "Kita perlu dashboard latensi per wilayah sebelum migrasi penuh.",
+    "Andi bertanggung jawab menyiapkan dashboard tersebut minggu depan.",
+]
+
+# Perkiraan kecepatan bicara dalam rapat (segmen Whisper per menit)
+SEGMENTS_PER_MINUTE = 12
+
+
+def _speech_like_block(rng, n_samples, sample_rate=SAMPLE_RATE):
+    """
+    Membuat blok audio mirip ucapan: suku kata bernada (harmonik dengan pitch bervariasi,
+    dimodulasi ~4 Hz) yang diselingi jeda, ditambah noise latar.
+    """
+    audio = np.zeros(n_samples, dtype=np.float32)
+    t_syllable = np.arange(int(0.25 * sample_rate), dtype=np.float32) / sample_rate
+    envelope = np.sin(np.pi * t_syllable / t_syllable[-1]).astype(np.float32)
+    i = 0
+    while i < n_samples:
+        # Ujaran 1-6 detik, lalu jeda 0.2-1.5 detik
+        utterance_end = min(n_samples, i + int(rng.uniform(1.0, 6.0) * sample_rate))
+        base_pitch = rng.uniform(100, 220)
+        while i + len(t_syllable) <= utterance_end:
+            pitch = base_pitch * rng.uniform(0.85, 1.15)
+            syllable = sum(
+                (0.6 / h) * np.sin(2 * np.pi * pitch * h * t_syllable + rng.uniform(0, 2 * np.pi))
+                for h in range(1, 6)
+            )
+            audio[i:i + len(t_syllable)] += (0.3 * envelope * syllable).astype(np.float32)
+            i += len(t_syllable)
+        i = utterance_end + int(rng.uniform(0.2, 1.5) * sample_rate)
+    audio += rng.normal(0, 0.01, n_samples).astype(np.float32)
+    return np.clip(audio, -1.0, 1.0)
+
+
+def generate_speech_wav(path, duration_seconds, seed=0, sample_rate=SAMPLE_RATE):
+    """
+    Menulis WAV mono 16-bit berisi audio sintetis mirip ucapan + noise.
+
+    Audio dibuat per blok satu menit agar fixture 60 menit tidak perlu disimpan utuh di memori.
+    """
+    rng = np.random.default_rng(seed)
+    block_samples = 60 * sample_rate
+    remaining = int(duration_seconds * sample_rate)
+    tmp_path = f"{path}.tmp"
+    with wave.open(tmp_path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        while remaining > 0:
+            n = min(block_samples, remaining)
+            block = _speech_like_block(rng, n, sample_rate)
+            wav_file.writeframes((block * 32767).astype('<i2').tobytes())
+            remaining -= n
+    os.replace(tmp_path, path)
+    return path
+
+
+def generate_video(path, audio_path):
+    """
+    Membungkus WAV fixture menjadi video MP4 (layar hitam) untuk benchmark ekstraksi audio.
+
+    :raises RuntimeError: Jika ffmpeg gagal atau tidak ditemukan.
+    """
+    command = [
+        'ffmpeg', '-y', '-nostdin',
+        '-f', 'lavfi', '-i', 'color=c=black:s=160x120:r=2',
+        '-i', audio_path,
+        '-shortest',
+        '-c:v', 'mpeg4', '-c:a', 'aac',
+        path
+    ]
+    try:
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except FileNotFoundError as e:
+        raise RuntimeError("ffmpeg tidak ditemukan; fixture video tidak bisa dibuat.") from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg gagal membuat fixture video: {e.stderr.decode(errors='replace')}") from e
+    return path
+
+
+def generate_transcript(duration_seconds, seed=0):
+    """Transkripsi sintetis berformat seperti output `format_whisper_result` ([mulai - akhir] teks)."""
+    rng = np.random.default_rng(seed)
+    n_segments = max(1, int(duration_seconds / 60 * SEGMENTS_PER_MINUTE))
+    segment_seconds = duration_seconds / n_segments
+    lines = []
+    for i in range(n_segments):
+        sentence = _TRANSCRIPT_SENTENCES[int(rng.integers(len(_TRANSCRIPT_SENTENCES)))]
+        lines.append(f"[{i * segment_seconds:.2f} - {(i + 1) * segment_seconds:.2f}] {sentence}")
+    return "\n".join(lines) + "\n"
+
+
+def get_fixture(duration_minutes, kind='audio', directory=FIXTURES_DIR):
+    """
+    Mengembalikan path fixture (dibuat sekali lalu dipakai ulang).
+
+    :param duration_minutes: Durasi fixture dalam menit.
+    :param kind: 'audio' (WAV), 'video' (MP4), atau 'transcript' (TXT).
+    """
+    os.makedirs(directory, exist_ok=True)
+    seconds = duration_minutes * 60
+    audio_path = os.path.join(directory, f"speech_{duration_minutes}min.wav")
+    if kind in ('audio', 'video') and not os.path.exists(audio_path):
+        logger.info(f"Membuat fixture audio {duration_minutes} menit: {audio_path}")
+        generate_speech_wav(audio_path, seconds, seed=duration_minutes)
+    if kind == 'audio':
+        return audio_path
+    if kind == 'video':
+        video_path = os.path.join(directory, f"speech_{duration_minutes}min.mp4")
+        if not os.path.exists(video_path):
+            logger.info(f"Membuat fixture video {duration_minutes} menit: {video_path}")
+            generate_video(video_path, audio_path)
+        return video_path
+    if kind == 'transcript':
+        transcript_path = os.path.join(directory, f"transcript_{duration_minutes}min.txt")
+        if not os.path.exists(transcript_path):
+            with open(transcript_path, 'w', encoding='utf-8') as f:
+                f.write(generate_transcript(seconds, seed=duration_minutes))
+        return transcript_path
+    raise ValueError(f"Jenis fixture tidak dikenal: {kind}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    for minutes in DEFAULT_DURATIONS_MINUTES:
+        for fixture_kind in ('audio', 'transcript'):
+            print(get_fixture(minutes, fixture_kind))
@@ -0,0 +1,261 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark pipeline end-to-end yang berjalan sepenuhnya offline.
+
+Untuk setiap kombinasi tahap x durasi fixture x model Whisper, tahap dijalankan di proses
+baru (spawn) agar peak RSS yang dilaporkan hanya milik tahap itu. Hasil ditulis sebagai JSON:
+wall time, real-time factor (wall time / durasi rapat), dan peak RSS.
+
+Contoh:
+    python -m benchmarks.run_benchmarks --durations 1 10 --models tiny base
+    python -m benchmarks.run_benchmarks --stages generate_mom_with_byteplus --llm-latency 3
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/main.json --output branch.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fixtures import DEFAULT_DURATIONS_MINUTES, get_fixture
+from benchmarks.fake_byteplus_server import start_fake_server
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Urutan tahap sesuai pipeline; tahap yang memakai model Whisper diulang untuk setiap model
+STAGES = ('extract_audio', 'decode_audio', 'transcribe_with_whisper', 'generate_mom_with_byteplus', 'format_mom_to_text')
+WHISPER_STAGES = ('transcribe_with_whisper',)
+
+# Jenis fixture yang menjadi input setiap tahap
+STAGE_FIXTURE_KIND = {
+    'extract_audio': 'video',
+    'decode_audio': 'audio',
+    'transcribe_with_whisper': 'audio',
+    'generate_mom_with_byteplus': 'transcript',
+    'format_mom_to_text': None,
+}
+
+
+def _peak_rss_mb(who):
+    """Peak RSS (MB) dari getrusage; ru_maxrss dalam KB di Linux dan byte di macOS."""
+    import resource
+    maxrss = resource.getrusage(who).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(maxrss / divisor, 1)
+
+
+def _run_stage(stage, fixture_path, model_name, work_dir):
+    """
+    Dijalankan di proses anak: menjalankan satu tahap dan mengukurnya.
+
+    Import modul aplikasi dilakukan sebelum pengukuran, sehingga `baseline_rss_mb` adalah
+    memori proses setelah import dan `peak_rss_mb` mencakup kerja tahap itu sendiri.
+    """
+    import resource
+    extra = {}
+    if stage == 'extract_audio':
+        from app.video_utils import extract_audio
+        output_path = os.path.join(work_dir, f"extract_{os.getpid()}.wav")
+        run = lambda: extract_audio(fixture_path, output_path)
+        check = lambda result: None if result else "extract_audio mengembalikan False"
+    elif stage == 'decode_audio':
+        from app.audio_utils import decode_audio
+        run = lambda: decode_audio(fixture_path)
+        check = lambda result: None
+    elif stage == 'transcribe_with_whisper':
+        from app.stt_utils import transcribe_with_whisper
+        from app.stt_backends import get_stt_backend
+        # Waktu muat model dilaporkan terpisah dari waktu transkripsi
+        load_start = time.perf_counter()
+        get_stt_backend().load(model_name)
+        extra['stt_backend'] = get_stt_backend().cache_tag
+        extra['model_load_seconds'] = round(time.perf_counter() - load_start, 3)
+        run = lambda: transcribe_with_whisper(fixture_path, model_name=model_name)
+        check = lambda result: result if isinstance(result, str) else None
+    elif stage == 'generate_mom_with_byteplus':
+        from app.byteplus_mom_utils import generate_mom_with_byteplus
+        with open(fixture_path, encoding='utf-8') as f:
+            transcription_text = f.read()
+        run = lambda: generate_mom_with_byteplus(transcription_text)
+        check = lambda result: (result if isinstance(result, str)
+                                else result.get('error') if isinstance(result, dict) else None)
+    elif stage == 'format_mom_to_text':
+        from app.byteplus_mom_utils import format_mom_to_text
+        from benchmarks.fake_byteplus_server import CANNED_MOM
+        # Tahap ini sangat cepat, jadi diulang agar waktunya terukur
+        run = lambda: [format_mom_to_text(CANNED_MOM) for _ in range(1000)]
+        check = lambda result: None
+        extra['iterations'] = 1000
+    else:
+        raise ValueError(f"Tahap tidak dikenal: {stage}")
+
+    baseline_rss_mb = _peak_rss_mb(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    result = run()
+    wall_seconds = time.perf_counter() - start
+    return dict(extra,
+                wall_seconds=round(wall_seconds, 3),
+                baseline_rss_mb=baseline_rss_mb,
+                peak_rss_mb=_peak_rss_mb(resource.RUSAGE_SELF),
+                peak_children_rss_mb=_peak_rss_mb(resource.RUSAGE_CHILDREN),
+                error=check(result))
+
+
+def measure(stage, fixture_path, model_name, work_dir):
+    """Menjalankan `_run_stage` di proses spawn baru (peak RSS tidak tercampur tahap lain)."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_run_stage, stage, fixture_path, model_name, work_dir).result()
+
+
+def _git_info():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=REPO_ROOT, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git('rev-parse', 'HEAD'), "branch": git('rev-parse', '--abbrev-ref', 'HEAD'),
+            "dirty": bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def run_benchmarks(durations, models, stages, repeat=1, llm_latency=1.0, llm_chars_per_second=2000):
+    """
+    Menjalankan semua kombinasi benchmark.
+
+    :return: Dict laporan berisi `meta` (mesin, git, parameter) dan `results` (satu entri per kombinasi).
+    """
+    server, base_url = start_fake_server(latency=llm_latency, chars_per_second=llm_chars_per_second)
+    # Proses anak (spawn) mewarisi environment ini saat mengimpor app.config
+    os.environ.update({
+        'BYTEPLUS_BASE_URL': base_url,
+        'ARK_API_KEY': 'benchmark',
+        'BYTEPLUS_MOM_MODEL': 'fake-mom',
+        'CACHE_ENABLED': 'false',
+        'BYTEPLUS_MAX_RETRIES': '0',
+    })
+    work_dir = os.path.join(RESULTS_DIR, '.work')
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = []
+    try:
+        for minutes in durations:
+            for stage in stages:
+                kind = STAGE_FIXTURE_KIND[stage]
+                try:
+                    fixture_path = get_fixture(minutes, kind) if kind else None
+                except RuntimeError as e:
+                    logger.warning(f"Tahap {stage} ({minutes} menit) dilewati: {e}")
+                    results.append({"stage": stage, "duration_minutes": minutes, "model": None, "error": str(e)})
+                    continue
+                for model_name in (models if stage in WHISPER_STAGES else [None]):
+                    runs = []
+                    for i in range(repeat):
+                        logger.info(f"Benchmark {stage} | {minutes} menit | model={model_name} | run {i + 1}/{repeat}")
+                        try:
+                            runs.append(measure(stage, fixture_path, model_name or '', work_dir))
+                        except Exception as e:
+                            runs.append({"error": f"{type(e).__name__}: {e}"})
+                    results.append(_summarize(stage, minutes, model_name, runs))
+    finally:
+        server.shutdown()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "git": _git_info(),
+            "params": {"durations_minutes": list(durations), "models": list(models), "stages": list(stages),
+                       "repeat": repeat, "llm_latency": llm_latency, "llm_chars_per_second": llm_chars_per_second},
+            "llm_requests": server.request_count,
+        },
+        "results": results,
+    }
+
+
+def _summarize(stage, minutes, model_name, runs):
+    """Median wall time dan maksimum peak RSS dari beberapa run satu kombinasi."""
+    ok_runs = [r for r in runs if not r.get("error")]
+    entry = {"stage": stage, "duration_minutes": minutes, "model": model_name, "runs": runs,
+             "error": None if ok_runs else runs[-1].get("error")}
+    if ok_runs:
+        wall = statistics.median(r["wall_seconds"] for r in ok_runs)
+        entry.update({
+            "wall_seconds": round(wall, 3),
+            "rtf": round(wall / (minutes * 60), 5),
+            "peak_rss_mb": max(r["peak_rss_mb"] for r in ok_runs),
+            "peak_children_rss_mb": max(r["peak_children_rss_mb"] for r in ok_runs),
+        })
+    return entry
+
+
+def _result_key(entry):
+    return entry["stage"], entry["duration_minutes"], entry["model"]
+
+
+def print_report(report, baseline=None):
+    """Mencetak ringkasan tabel; jika `baseline` diberikan, tambahkan perubahan wall time (%)."""
+    baseline_index = {_result_key(e): e for e in (baseline or {}).get("results", [])}
+    header = f"{'tahap':<28} {'menit':>5} {'model':<8} {'wall (s)':>10} {'RTF':>9} {'peak RSS':>10}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for entry in report["results"]:
+        prefix = f"{entry['stage']:<28} {entry['duration_minutes']:>5} {entry['model'] or '-':<8}"
+        if entry.get("wall_seconds") is None:
+            print(f"{prefix} ERROR: {entry.get('error')}")
+            continue
+        line = f"{prefix} {entry['wall_seconds']:>10.3f} {entry['rtf']:>9.4f} {entry['peak_rss_mb']:>8.1f}MB"
+        base_entry = baseline_index.get(_result_key(entry))
+        if base_entry and base_entry.get("wall_seconds"):
+            change = (entry["wall_seconds"] - base_entry["wall_seconds"]) / base_entry["wall_seconds"] * 100
+            line += f" {change:>+8.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline MoM (offline).")
+    parser.add_argument('--durations', type=int, nargs='+', default=list(DEFAULT_DURATIONS_MINUTES),
+                        help="Durasi fixture dalam menit (default: 1 10 60)")
+    parser.add_argument('--models', nargs='+', default=[os.getenv("WHISPER_MODEL_NAME", "base")],
+                        help="Model Whisper yang dibandingkan")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=1, help="Jumlah run per kombinasi (dilaporkan median)")
+    parser.add_argument('--llm-latency', type=float, default=1.0, help="Latensi server BytePlus palsu (detik)")
+    parser.add_argument('--llm-chars-per-second', type=float, default=2000,
+                        help="Kecepatan streaming server palsu (0 = tanpa jeda)")
+    parser.add_argument('--output', help="Path file JSON hasil (default: benchmarks/results/<waktu>.json)")
+    parser.add_argument('--compare', help="File JSON hasil sebelumnya sebagai pembanding")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    report = run_benchmarks(args.durations, args.models, args.stages, max(1, args.repeat),
+                            args.llm_latency, args.llm_chars_per_second)
+
+    output_path = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nHasil disimpan ke: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Jalankan dari root repo dengan: python -m pytest
+# Semua test berjalan tanpa ffmpeg, model Whisper, maupun koneksi ke BytePlus.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
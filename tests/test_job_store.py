@@ -0,0 +1,98 @@
+# tests/test_job_store.py
+import types
+
+import pytest
+
+import app.job_store as job_store_module
+from app.job_store import MemoryJobStore, SQLiteJobStore
+
+TTL_SECONDS = 60
+
+
+class FakeClock:
+    """Pengganti `time` di app.job_store agar TTL bisa diuji tanpa menunggu."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(job_store_module, "time", types.SimpleNamespace(time=fake.time))
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryJobStore(TTL_SECONDS)
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), TTL_SECONDS)
+
+
+def test_transition_only_from_expected_status(store):
+    store.create("job-1", {"status": "queued", "progress": 0})
+
+    assert store.transition("job-1", ("queued",), {"status": "started", "progress": 5})
+    assert store.get("job-1") == {"status": "started", "progress": 5}
+
+    # Status sudah bukan 'queued': transisi kedua ditolak dan status tidak berubah
+    assert not store.transition("job-1", ("queued",), {"status": "cancelled"})
+    assert store.get("job-1")["status"] == "started"
+
+
+def test_transition_unknown_job(store):
+    assert not store.transition("missing", ("queued",), {"status": "started"})
+    assert store.get("missing") is None
+
+
+def test_transition_bumps_version(store):
+    store.create("job-1", {"status": "queued"})
+    version = store.version("job-1")
+    store.transition("job-1", ("queued",), {"status": "started"})
+    assert store.version("job-1") == version + 1
+
+
+def test_expired_job_is_hidden_and_evicted(store, clock):
+    store.create("old", {"status": "completed"})
+    store.save_checkpoint("old", "transcribe", {"text": "halo"})
+    clock.now += TTL_SECONDS / 2
+    store.create("new", {"status": "queued"})
+
+    clock.now += TTL_SECONDS / 2 + 1
+    assert store.evict_expired() == ["old"]
+    assert store.evict_expired() == []
+    assert store.get("old") is None
+    assert store.load_checkpoints("old") == {}
+    assert store.get("new") == {"status": "queued"}
+
+
+def test_expired_job_is_hidden_before_eviction(store, clock):
+    store.create("old", {"status": "completed"})
+    clock.now += TTL_SECONDS + 1
+    assert store.get("old") is None
+    assert not store.transition("old", ("completed",), {"status": "queued"})
+    assert store.list_by_status(("completed",)) == []
+
+
+def test_update_extends_ttl(store, clock):
+    store.create("job-1", {"status": "processing", "progress": 10})
+    clock.now += TTL_SECONDS - 1
+    store.update("job-1", progress=50)
+
+    clock.now += TTL_SECONDS - 1
+    assert store.get("job-1") == {"status": "processing", "progress": 50}
+    assert store.evict_expired() == []
+
+
+def test_expired_owner_lease(store, clock):
+    store.renew_lease("host:1:a")
+    clock.now += 30
+    store.renew_lease("host:1:b")
+
+    clock.now += 20
+    assert store.live_owners(40) == {"host:1:b"}
+    assert store.live_owners(60) == {"host:1:a", "host:1:b"}